@@ -0,0 +1,132 @@
+"""
+Benchmarks for the OpenQASM 2.0 import and export in tequila.circuit.qasm
+
+Run as a script to print the throughput of the import and of a templated export/import round trip
+"""
+from tequila import TequilaException
+from tequila.circuit import QCircuit
+from tequila.circuit.qasm import compile_open_qasm_2_template, convert_to_open_qasm_2, parse_from_open_qasm_2, \
+    parse_open_qasm_2_stream
+import tequila.circuit.gates as gates
+from numpy import pi
+import io
+import time
+
+
+def random_open_qasm_2(n_qubits: int = 10, n_gates: int = 1000, seed: int = None) -> str:
+    """
+    Random OpenQASM 2.0 code (h, cx, rz, u3 and a custom gate) used for benchmarking
+
+    Args:
+        n_qubits: number of qubits
+        n_gates: number of gate commands
+        seed: seed for the random number generator
+
+    Returns:
+        str: OpenQASM code
+    """
+    import random
+    rng = random.Random(seed)
+    lines = ["OPENQASM 2.0;", "include \"qelib1.inc\";", "gate bell a,b", "{", "h a;", "cx a,b;", "}",
+             "qreg q[{}];".format(n_qubits), "creg c[{}];".format(n_qubits)]
+    for _ in range(n_gates):
+        choice = rng.randrange(5)
+        if choice == 0 or n_qubits < 2:
+            lines.append("h q[{}];".format(rng.randrange(n_qubits)))
+        elif choice == 1:
+            lines.append("rz({}) q[{}];".format(rng.uniform(-pi, pi), rng.randrange(n_qubits)))
+        elif choice == 2:
+            lines.append("u3({},{},{}) q[{}]; // three angles".format(rng.uniform(-pi, pi), rng.uniform(-pi, pi),
+                                                                      rng.uniform(-pi, pi), rng.randrange(n_qubits)))
+        else:
+            a, b = rng.sample(range(n_qubits), 2)
+            lines.append("{} q[{}],q[{}];".format("cx" if choice == 3 else "bell", a, b))
+    lines.append("measure q -> c;")
+    return "\n".join(lines) + "\n"
+
+
+def benchmark_open_qasm_import(n_qubits: int = 10, n_gates: int = 100000, repetitions: int = 1,
+                               seed: int = None) -> dict:
+    """
+    Measure the throughput of the OpenQASM 2.0 import
+
+    Args:
+        n_qubits: number of qubits of the benchmark circuit
+        n_gates: number of gate commands in the benchmark code
+        repetitions: number of timed imports (the best one is reported)
+        seed: seed for the random benchmark circuit
+
+    Returns:
+        dict: with number of commands, number of tequila gates, best time in seconds and commands per second
+    """
+    qasm_code = random_open_qasm_2(n_qubits=n_qubits, n_gates=n_gates, seed=seed)
+    best = None
+    circuit = None
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        circuit = parse_open_qasm_2_stream(stream=io.StringIO(qasm_code))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {"commands": n_gates, "gates": len(circuit.gates), "time": best, "commands_per_second": n_gates / best}
+
+
+def benchmark_open_qasm_round_trip(n_qubits: int = 10, n_layers: int = 10, n_assignments: int = 100,
+                                   seed: int = None) -> dict:
+    """
+    Measure export (templated and direct) and import of OpenQASM 2.0 for a parameter sweep
+    over a layered hardware-efficient circuit
+
+    Args:
+        n_qubits: number of qubits of the benchmark circuit
+        n_layers: number of Ry/CNOT layers
+        n_assignments: number of variable assignments in the sweep
+        seed: seed for the random variable assignments
+
+    Returns:
+        dict: with timings in seconds and throughput for the individual stages
+    """
+    import random
+    rng = random.Random(seed)
+    circuit = QCircuit()
+    for layer in range(n_layers):
+        for q in range(n_qubits):
+            circuit += gates.Ry(angle=(layer, q), target=q)
+        for q in range(0, n_qubits - 1):
+            circuit += gates.CNOT(control=q, target=q + 1)
+    variables = circuit.extract_variables()
+    sweep = [{v: rng.uniform(-pi, pi) for v in variables} for _ in range(n_assignments)]
+
+    start = time.perf_counter()
+    template = compile_open_qasm_2_template(circuit=circuit)
+    time_compile = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exported = list(template.render_many(variables=sweep))
+    time_render = time.perf_counter() - start
+
+    start = time.perf_counter()
+    direct = convert_to_open_qasm_2(circuit=circuit, variables=sweep[0])
+    time_direct = time.perf_counter() - start
+    if direct != exported[0]:
+        raise TequilaException("templated and direct OpenQASM export do not agree")
+
+    start = time.perf_counter()
+    imported = [parse_from_open_qasm_2(qasm_code=code) for code in exported]
+    time_import = time.perf_counter() - start
+
+    n_gates = len(imported[0].gates)
+    return {"assignments": n_assignments,
+            "gates": n_gates,
+            "time_compile": time_compile,
+            "time_render": time_render,
+            "time_direct_export": time_direct,
+            "time_import": time_import,
+            "exports_per_second": n_assignments / time_render,
+            "direct_exports_per_second": 1.0 / time_direct,
+            "imported_gates_per_second": n_assignments * n_gates / time_import}
+
+
+if __name__ == "__main__":
+    print("import:", benchmark_open_qasm_import(seed=0))
+    print("round trip:", benchmark_open_qasm_round_trip(seed=0))
@@ -801,11 +801,13 @@ def U(theta, phi, lambd, target: typing.Union[list, int], control: typing.Union[
     lambd = assign_variable(lambd)
     pi_half = assign_variable(np.pi / 2)
 
-    return Rz(angle=lambd, target=target, control=control) + \
-           Rx(angle=pi_half, target=target, control=control) + \
-           Rz(angle=theta, target=target, control=control) + \
-           Rx(angle=-pi_half, target=target, control=control) + \
-           Rz(angle=phi, target=target, control=control)
+    # collect the gates directly, concatenating circuits would copy them at every step
+    target = list_assignment(target)
+    gates = []
+    for axis, angle in ((2, lambd), (0, pi_half), (2, theta), (0, -pi_half), (2, phi)):
+        gates += [impl.RotationGateImpl(axis=axis, angle=angle, target=q, control=control) for q in target]
+
+    return QCircuit(gates=gates)
 
 
 def u1(lambd, target: typing.Union[list, int], control: typing.Union[list, int] = None) -> QCircuit:
@@ -89,6 +89,13 @@ class QuantumNoise:
             assert sum(probs)<=1.
         self.probs=list_assignment(probs)
 
+    @property
+    def key(self) -> tuple:
+        """
+        hashable identifier of the noise: (name, probs, level)
+        """
+        return (self.name, tuple(self.probs), self.level)
+
     def __str__(self):
         back=self.name
         back+=' on ' + str(self._level) + ' qubit gates'
@@ -153,6 +160,35 @@ class NoiseModel():
             self.noises.extend(copy.copy(other.noises))
         return self
 
+    @property
+    def key(self) -> tuple:
+        """
+        hashable identifier of the noise model: the keys of all its noises
+        """
+        return tuple(noise.key for noise in self.noises)
+
+    def resolve_levels(self, levels: typing.Iterable[int]=None) -> typing.Dict[int, typing.List[QuantumNoise]]:
+        """
+        sort the noises by the number of qubits of the gates they act upon.
+
+        Parameters
+        ----------
+        levels: optional:
+            the gate sizes (number of qubits) occurring in a circuit, default are all levels of the noises.
+
+        Returns
+        -------
+        dict:
+            level: list of the noises acting on gates with that number of qubits, in order of the model.
+        """
+        if levels is None:
+            levels = [noise.level for noise in self.noises]
+        resolved = {int(level): [] for level in levels}
+        for noise in self.noises:
+            if noise.level in resolved:
+                resolved[noise.level].append(noise)
+        return resolved
+
     def without_noise_on_level(self, level):
         new = NoiseModel()
         for noise in self.noises:
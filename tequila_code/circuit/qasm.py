@@ -8,10 +8,13 @@ https://arxiv.org/pdf/1707.03429v2.pdf
 from tequila import TequilaException
 from tequila.circuit import QCircuit
 from tequila.circuit.compiler import CircuitCompiler
+from tequila.objective.objective import Variable, FixedVariable
 import tequila.circuit.gates as gates
 from numpy import pi
 from typing import Dict
 import typing
+import io
+import re
 
 
 def export_open_qasm(circuit: QCircuit, variables=None, version: str = "2.0", filename: str = None, zx_calculus: bool = False) -> str:
@@ -79,11 +82,14 @@ def import_open_qasm_from_file(filename: str, version: str = "2.0", rigorous: bo
         QCircuit: equivalent to the OpenQASM code received
     """
 
+    if version != "2.0":
+        return "Unsupported OpenQASM version : " + version
+
+    # the file is streamed line by line, it is never held in memory as a whole
     with open(filename, "r") as file:
-        qasm_code = file.read()
-        file.close()
+        result = parse_open_qasm_2_stream(stream=file, rigorous=rigorous)
 
-    return import_open_qasm(qasm_code, version=version, rigorous=rigorous)
+    return result
 
 
 def convert_to_open_qasm_2(circuit: QCircuit, variables=None, zx_calculus: bool = False) -> str:
@@ -104,6 +110,81 @@ def convert_to_open_qasm_2(circuit: QCircuit, variables=None, zx_calculus: bool
             "You called export_open_qasm for a parametrized type but forgot to pass down the variables: {}".format(
                 circuit.extract_variables()))
 
+    return compile_open_qasm_2_template(circuit=circuit, zx_calculus=zx_calculus).render(variables=variables)
+
+
+class OpenQASMTemplate:
+    """
+    OpenQASM 2.0 export of a circuit structure that can be rendered for many variable assignments
+    The circuit is compiled and formatted only once, rendering only evaluates the (unique) parameters
+
+    Use compile_open_qasm_2_template to create
+    """
+
+    def __init__(self, template: str, parameters: list, variables: list):
+        """
+        Args:
+            template: OpenQASM code as format string with one positional field per parameter
+            parameters: the parametrized gate parameters (one per field in the template)
+            variables: the variables the parameters depend on
+        """
+        self.template = template
+        self.parameters = parameters
+        self.variables = variables
+
+    def render(self, variables=None) -> str:
+        """
+        Args:
+            variables: dictionary with values for the variables
+
+        Returns:
+            str: OpenQASM string
+        """
+        if variables is None and len(self.variables) > 0:
+            raise TequilaException(
+                "You called export_open_qasm for a parametrized type but forgot to pass down the variables: {}".format(
+                    self.variables))
+        return self.template.format(*[str(p(variables)) for p in self.parameters])
+
+    def render_many(self, variables: typing.Iterable[dict], filenames: typing.Iterable[str] = None) -> typing.Iterator[str]:
+        """
+        Render the template for a sequence of variable assignments
+        The results are produced lazily, so long sweeps can be streamed to files
+
+        Args:
+            variables: iterable over dictionaries with values for the variables
+            filenames: optional iterable of file names (one per assignment) the results are written to
+
+        Returns:
+            iterator over the OpenQASM strings
+        """
+        if filenames is None:
+            for v in variables:
+                yield self.render(variables=v)
+        else:
+            for v, filename in zip(variables, filenames):
+                result = self.render(variables=v)
+                with open(filename, "w") as file:
+                    file.write(result)
+                yield result
+
+    def __str__(self):
+        return "OpenQASMTemplate with {} parameters depending on {}".format(len(self.parameters), self.variables)
+
+
+def compile_open_qasm_2_template(circuit: QCircuit, zx_calculus: bool = False) -> OpenQASMTemplate:
+    """
+    Compile the circuit structure into an OpenQASM 2.0 template
+    Parameters that do not depend on variables are directly formatted into the template
+
+    Args:
+        circuit: to be exported to OpenQASM
+        zx_calculus: indicate if y-gates must be transformed to xz equivalents
+
+    Returns:
+        OpenQASMTemplate: render with variables to get the OpenQASM string
+    """
+
     compiler = CircuitCompiler(multitarget=True,
                                multicontrol=False,
                                trotterized=True,
@@ -127,15 +208,26 @@ def convert_to_open_qasm_2(circuit: QCircuit, variables=None, zx_calculus: bool
 
     compiled = compiler(circuit, variables=None)
 
-    result = "OPENQASM 2.0;\ninclude \"qelib1.inc\";\n"
+    result = ["OPENQASM 2.0;\ninclude \"qelib1.inc\";\n"]
 
     qubits_names: Dict[int, str] = {}
     for q in compiled.qubits:
         name = "q[" + str(q) + "]"
         qubits_names[q] = name
 
-    result += "qreg q[" + str(compiled.n_qubits) + "];\n"
-    result += "creg c[" + str(compiled.n_qubits) + "];\n"
+    result.append("qreg q[" + str(compiled.n_qubits) + "];\n")
+    result.append("creg c[" + str(compiled.n_qubits) + "];\n")
+
+    # unique parameters get one field in the template
+    parameters = []
+    fields = {}
+
+    def field(parameter):
+        key = parameter if isinstance(parameter, Variable) else id(parameter)
+        if key not in fields:
+            fields[key] = len(parameters)
+            parameters.append(parameter)
+        return "{" + str(fields[key]) + "}"
 
     for g in compiled.gates:
 
@@ -149,23 +241,22 @@ def convert_to_open_qasm_2(circuit: QCircuit, variables=None, zx_calculus: bool
             controls = list(map(lambda c: qubits_names[c], g.control))
             control_str = ','.join(controls) + ','
 
-        gate_name = name_and_params(g, variables)
+        gate_name = name_and_params(g, variables=None, field=field)
         for t in g.target:
-            result += gate_name
-            result += control_str
-            result += qubits_names[t]
-            result += ";\n"
+            result.append(gate_name + control_str + qubits_names[t] + ";\n")
 
-    return result
+    return OpenQASMTemplate(template="".join(result), parameters=parameters, variables=compiled.extract_variables())
 
 
-def name_and_params(g, variables):
+def name_and_params(g, variables, field: typing.Callable = None):
     """
     Determines the quantum gate name and its parameters if applicable
 
     Args:
         g: gate to get its name
         variables: dictionary with values for variables
+        field: optional function giving the template field for a parameter that depends on variables
+            (parameters without variables are always formatted directly)
 
     Returns:
         str: name (and parameter) to the gate specified
@@ -179,7 +270,11 @@ def name_and_params(g, variables):
     res += g.name.lower()
 
     if hasattr(g, "parameter") and g.parameter is not None:
-        res += "(" + str(g.parameter(variables)) + ")"
+        if field is not None and not (isinstance(g.parameter, FixedVariable)
+                                      or len(g.parameter.extract_variables()) == 0):
+            res += "(" + field(g.parameter) + ")"
+        else:
+            res += "(" + str(g.parameter(variables)) + ")"
 
     res += " "
 
@@ -187,51 +282,131 @@ def name_and_params(g, variables):
 
 
 def parse_from_open_qasm_2(qasm_code: str, rigorous: bool = True) -> QCircuit:
+    """
+    Parse OpenQASM 2.0 code
+
+    Args:
+        qasm_code: string with the OpenQASM code
+        rigorous: indicates whether the QASM code should be read rigorously
+
+    Returns:
+        QCircuit: equivalent to the OpenQASM code received
+    """
+    return parse_open_qasm_2_stream(stream=io.StringIO(qasm_code), rigorous=rigorous)
+
+
+def parse_open_qasm_2_stream(stream: typing.Iterable[str], rigorous: bool = True) -> QCircuit:
+    """
+    Parse OpenQASM 2.0 code in a single pass from a stream of lines (e.g. an open file handle)
+    The gates are collected in one list and the circuit is only constructed once at the end
+
+    Args:
+        stream: iterable over lines of OpenQASM code (file handle, io.StringIO, list of lines)
+        rigorous: indicates whether the QASM code should be read rigorously
+
+    Returns:
+        QCircuit: equivalent to the OpenQASM code received
+    """
 
-    lines = qasm_code.splitlines()
-    clean_code = []
-    # ignore comments
-    for line in lines:
-        if line.find("//") != -1:
-            clean_line = line[0:line.find("//")].strip()
-        else:
-            clean_line = line.strip()
-        if clean_line:
-            clean_code.append(clean_line)
-
-    if clean_code[0].startswith("OPENQASM"):
-        clean_code.pop(0)
-    elif rigorous:
-        raise TequilaException("File must start with the 'OPENQASM' directive")
-
-    if clean_code[0].startswith('include "qelib1.inc";'):
-        clean_code.pop(0)
-    elif rigorous:
-        raise TequilaException("File must import standard library (qelib1.inc)")
-
-    code_circuit = "\n".join(clean_code)
-    # separate the custom command definitions from the normal commands
     custom_gates_map: Dict[str, QCircuit] = {}
-    while True:
-        i = code_circuit.find("gate ")
-        if i == -1:
-            break
-        j = code_circuit.find("}", i)
-        custom_name, custom_circuit = parse_custom_gate(code_circuit[i:j + 1], custom_gates_map=custom_gates_map)
-        custom_gates_map[custom_name] = custom_circuit
-        code_circuit = code_circuit[:i] + code_circuit[j + 1:]
-
-    # parse regular commands
-    commands = [s.strip() for s in code_circuit.split(";") if s.strip()]
     qregisters: Dict[str, int] = {}
+    qregister_names: Dict[str, list] = {}
+    gate_list = []
+
+    statements = tokenize_open_qasm_2(stream)
+
+    # the header: version and standard library
+    header = ("OPENQASM", 'include "qelib1.inc"')
+    errors = ("File must start with the 'OPENQASM' directive", "File must import standard library (qelib1.inc)")
+    # each directive is checked on its own: a statement that is not the expected directive
+    # is kept and checked against the next one (e.g. only the include without the version)
+    pending = []
+    for directive, error in zip(header, errors):
+        statement = pending.pop() if pending else next(statements, None)
+        if statement is not None and statement[0] == "command" and statement[1].startswith(directive):
+            continue
+        if rigorous:
+            raise TequilaException(error)
+        if statement is not None:
+            pending.append(statement)
+
+    def all_statements():
+        yield from pending
+        yield from statements
+
+    for statement in all_statements():
+        if statement[0] == "gate":
+            custom_name, custom_circuit = parse_custom_gate_definition(header=statement[1], commands=statement[2],
+                                                                       custom_gates_map=custom_gates_map)
+            custom_gates_map[custom_name] = custom_circuit
+        else:
+            partial_circuit = parse_command(command=statement[1], custom_gates_map=custom_gates_map,
+                                            qregisters=qregisters, qregister_names=qregister_names)
+            if partial_circuit is not None:
+                gate_list += partial_circuit.gates
 
-    circuit = QCircuit()
-    for c in commands:
-        partial_circuit = parse_command(command=c, custom_gates_map=custom_gates_map, qregisters=qregisters)
-        if partial_circuit is not None:
-            circuit += partial_circuit
+    return QCircuit(gates=gate_list)
+
+
+_qasm_delimiters = re.compile(r"([;{}])")
 
-    return circuit
+
+def tokenize_open_qasm_2(stream: typing.Iterable[str]) -> typing.Iterator[tuple]:
+    """
+    Single pass tokenizer for OpenQASM 2.0 code
+    Comments are removed and the code is split into statements
+
+    Args:
+        stream: iterable over lines of OpenQASM code
+
+    Yields:
+        ("command", statement) for regular statements
+        ("gate", header, [statements]) for custom gate definitions
+    """
+    buffer = []
+    gate_header = None
+    gate_body = None
+    for line in stream:
+        i = line.find("//")
+        if i != -1:
+            line = line[:i]
+        line = line.strip()
+        if not line:
+            continue
+        for token in _qasm_delimiters.split(line):
+            if token == ";":
+                statement = " ".join(buffer).strip()
+                buffer = []
+                if not statement:
+                    continue
+                if gate_body is not None:
+                    gate_body.append(statement)
+                else:
+                    yield ("command", statement)
+            elif token == "{":
+                gate_header = " ".join(buffer).strip()
+                buffer = []
+                gate_body = []
+                if not gate_header.startswith("gate "):
+                    raise TequilaException("Unsupported block {}".format(gate_header))
+            elif token == "}":
+                if gate_body is None:
+                    raise TequilaException("Unmatched '}' in OpenQASM code")
+                statement = " ".join(buffer).strip()
+                buffer = []
+                if statement:
+                    gate_body.append(statement)
+                yield ("gate", gate_header, gate_body)
+                gate_header = None
+                gate_body = None
+            elif token.strip():
+                buffer.append(token.strip())
+
+    if gate_body is not None:
+        raise TequilaException("Unterminated gate definition {}".format(gate_header))
+    statement = " ".join(buffer).strip()
+    if statement:
+        yield ("command", statement)
 
 
 def parse_custom_gate(gate_custom: str, custom_gates_map: Dict[str, QCircuit]) -> (str, QCircuit):
@@ -241,8 +416,25 @@ def parse_custom_gate(gate_custom: str, custom_gates_map: Dict[str, QCircuit]) -
     Args:
         gate_custom: code with custom gates
     """
-    gate_custom = gate_custom[5:]
     spec, body = gate_custom.split("{", 1)
+    body = body.strip()
+    if body.endswith("}"):
+        body = body[:-1]
+    commands = [s.strip() for s in body.split(";") if s.strip()]
+    return parse_custom_gate_definition(header=spec, commands=commands, custom_gates_map=custom_gates_map)
+
+
+def parse_custom_gate_definition(header: str, commands: typing.List[str],
+                                 custom_gates_map: Dict[str, QCircuit]) -> (str, QCircuit):
+    """
+    Parse a tokenized custom gate definition
+
+    Args:
+        header: the gate specification e.g. 'gate name a,b'
+        commands: list of the statements in the body of the gate
+        custom_gates_map: map with previously defined custom gates
+    """
+    spec = header.strip()[5:]
 
     if "(" in spec:
         i = spec.find("(")
@@ -262,27 +454,28 @@ def parse_custom_gate(gate_custom: str, custom_gates_map: Dict[str, QCircuit]) -
 
     custom_qregisters: Dict[str, int] = {}
     for qarg in qargs.split(','):
-        custom_qregisters[qarg] = len(custom_qregisters)
-
-    body = body[:-1].strip()
-    commands = [s.strip() for s in body.split(";") if s.strip()]
+        custom_qregisters[qarg.strip()] = len(custom_qregisters)
 
-    custom_circuit = QCircuit()
+    gate_list = []
     for c in commands:
         partial_circuit = parse_command(command=c, custom_gates_map=custom_gates_map, qregisters=custom_qregisters)
         if partial_circuit is not None:
-            custom_circuit += partial_circuit
+            gate_list += partial_circuit.gates
 
-    return name, custom_circuit
+    return name, QCircuit(gates=gate_list)
 
 
-def parse_command(command: str, custom_gates_map: Dict[str, QCircuit], qregisters: Dict[str, int]) -> QCircuit:
+def parse_command(command: str, custom_gates_map: Dict[str, QCircuit], qregisters: Dict[str, int],
+                  qregister_names: Dict[str, list] = None) -> QCircuit:
     """
     Parse qasm code command
 
     Args:
         command: open qasm code to be parsed
         custom_gates_map: map with custom gates
+        qregisters: map from single qubit registers (e.g. 'q[0]') to qubits, updated by 'qreg' commands
+        qregister_names: optional map from register names (e.g. 'q') to their qubits, updated by 'qreg' commands
+            avoids searching through all registers for every command
     """
 
     name, rest = command.split(" ", 1)
@@ -299,33 +492,40 @@ def parse_command(command: str, custom_gates_map: Dict[str, QCircuit], qregister
         size = int(sizep[:-1])
         for i in range(size):
             qregisters[regname + "[" + str(i) + "]"] = len(qregisters)
+            if qregister_names is not None:
+                qregister_names.setdefault(regname, []).append(qregisters[regname + "[" + str(i) + "]"])
         return None
 
+    if qregister_names is None:
+        qregister_names = {}
+        for key, value in qregisters.items():
+            qregister_names.setdefault(key.split("[", 1)[0], []).append(value)
+
     for arg in args:
-        if not (arg in qregisters or arg in [key.split("[",1)[0] for key in qregisters.keys()]):
+        if not (arg in qregisters or arg in qregister_names):
             raise TequilaException("Invalid register {}".format(arg))
 
     if name in custom_gates_map:
         custom_circuit = custom_gates_map[name]
         qregisters_values = []
         for a in args:
-            qregisters_values.append(get_qregister(a, qregisters))
+            qregisters_values.append(get_qregister(a, qregisters, qregister_names))
         return apply_custom_gate(custom_circuit=custom_circuit, qregisters_values=qregisters_values)
 
     if name in ("x", "y", "z", "h", "cx", "cy", "cz", "ch"):
-        target = get_qregister(args[0], qregisters)
+        target = get_qregister(args[0], qregisters, qregister_names)
         control = None
         if name[0].lower() == 'c':
-            control = get_qregister(args[0], qregisters)
-            target = get_qregister(args[1], qregisters)
+            control = get_qregister(args[0], qregisters, qregister_names)
+            target = get_qregister(args[1], qregisters, qregister_names)
             name = name[1]
         G = getattr(gates, name.upper())
         return G(control=control, target=target)
 
     if name in ("ccx", "ccy", "ccz"):
         G = getattr(gates, name[2].upper())
-        control = [get_qregister(args[0], qregisters), get_qregister(args[1], qregisters)]
-        target = get_qregister(args[2], qregisters)
+        control = [get_qregister(args[0], qregisters, qregister_names), get_qregister(args[1], qregisters, qregister_names)]
+        target = get_qregister(args[2], qregisters, qregister_names)
         return G(control=control, target=target)
 
     if name.startswith("rx(") or name.startswith("ry(") or name.startswith("rz(") or \
@@ -338,64 +538,66 @@ def parse_command(command: str, custom_gates_map: Dict[str, QCircuit], qregister
         name[-1] = name[-1].lower()
         name = "".join(name)
         G = getattr(gates, name)
-        return G(angle=angle,control=get_qregister(args[0], qregisters) if name[0] == 'C' else None,target=get_qregister(args[1 if name[0] == 'C' else 0], qregisters))
+        return G(angle=angle,control=get_qregister(args[0], qregisters, qregister_names) if name[0] == 'C' else None,target=get_qregister(args[1 if name[0] == 'C' else 0], qregisters, qregister_names))
             
     if name.startswith("U("):
         angles = get_angle(name)
         return gates.U(theta=angles[0], phi=angles[1], lambd=angles[2],
                  control=None,
-                 target=get_qregister(args[0], qregisters))
+                 target=get_qregister(args[0], qregisters, qregister_names))
     if name.startswith("u1("):
         angles = get_angle(name)
         return gates.u1(lambd=angles[0],
                   control=None,
-                  target=get_qregister(args[0], qregisters))
+                  target=get_qregister(args[0], qregisters, qregister_names))
     if name.startswith("u2("):
         angles = get_angle(name)
         return gates.u2(phi=angles[0], lambd=angles[1],
                   control=None,
-                  target=get_qregister(args[0], qregisters))
+                  target=get_qregister(args[0], qregisters, qregister_names))
     if name.startswith("u3("):
         angles = get_angle(name)
         return gates.u3(theta=angles[0], phi=angles[1], lambd=angles[2],
                   control=None,
-                  target=get_qregister(args[0], qregisters))
+                  target=get_qregister(args[0], qregisters, qregister_names))
     if name.startswith("cu1("):
         angles = get_angle(name)
         return gates.u1(lambd=angles[0],
-                  control=get_qregister(args[0], qregisters),
-                  target=get_qregister(args[1], qregisters))
+                  control=get_qregister(args[0], qregisters, qregister_names),
+                  target=get_qregister(args[1], qregisters, qregister_names))
     if name.startswith("cu2("):
         angles = get_angle(name)
         return gates.u2(phi=angles[0], lambd=angles[1],
-                  control=get_qregister(args[0], qregisters),
-                  target=get_qregister(args[1], qregisters))
+                  control=get_qregister(args[0], qregisters, qregister_names),
+                  target=get_qregister(args[1], qregisters, qregister_names))
     if name.startswith("cu3("):
         angles = get_angle(name)
         return gates.u3(theta=angles[0], phi=angles[1], lambd=angles[2],
-                  control=get_qregister(args[0], qregisters),
-                  target=get_qregister(args[1], qregisters))
+                  control=get_qregister(args[0], qregisters, qregister_names),
+                  target=get_qregister(args[1], qregisters, qregister_names))
     if name in ("s", "t", "sdg", "tdg"):
         g = gates.Phase(angle=pi / (2 if name.startswith("s") else 4),
                      control=None,
-                     target=get_qregister(args[0], qregisters))
+                     target=get_qregister(args[0], qregisters, qregister_names))
         if name.find("dg") != -1:
             g = g.dagger()
         return g
 
 
 def apply_custom_gate(custom_circuit: QCircuit, qregisters_values: list) -> QCircuit:
-    applied_custom_circuit = QCircuit()
+    gate_list = []
     for gate in custom_circuit.gates:
         g = gate.copy()
         g._target = tuple([qregisters_values[i] for i in gate._target])
         g._control = tuple([qregisters_values[i] for i in gate._control]) if gate.is_controlled() else gate._control
-        applied_custom_circuit += g
-    return applied_custom_circuit
+        gate_list.append(g)
+    return QCircuit(gates=gate_list)
 
 
-def get_qregister(qreg: str, qregisters: Dict[str, int]) -> typing.Union[list, int]:
+def get_qregister(qreg: str, qregisters: Dict[str, int], qregister_names: Dict[str, list] = None) -> typing.Union[list, int]:
     if qreg == qreg.split("[", 1)[0]:
+        if qregister_names is not None:
+            return list(qregister_names[qreg])
         qreg_tequila = [qregisters[key] for key in qregisters.keys() if qreg == key.split("[", 1)[0]]
     else:
         qreg_tequila = qregisters[qreg]
@@ -27,6 +27,29 @@ pauli_matrices = {
     'Y': numpy.array([[0, -1j], [1j, 0]], dtype=numpy.complex)
 }
 
+# integer codes of the primitive paulis used in the array representation of Hamiltonians
+pauli_codes = {'I': 0, 'X': 1, 'Y': 2, 'Z': 3}
+
+
+def trace_factors(state) -> numpy.ndarray:
+    """
+    Expectation values of the primitive paulis in a single qubit state :math:`a|0> + b|1>`
+
+    Parameters
+    ----------
+    state :
+        tuple with the a,b coefficients
+
+    Returns
+    -------
+        array with the factors for I,X,Y,Z (ordered as in pauli_codes), identity is always 1
+    """
+    # <psi|op|psi> = |a|**2<0|op|0> + (a*)*b<0|op|1> + (b*)*a<1|op|0> + |b|**2<1|op|1>
+    a, b = state
+    vec = numpy.asarray([numpy.abs(a) ** 2, numpy.conjugate(a) * b, numpy.conjugate(b) * a, numpy.abs(b) ** 2])
+    factors = [1.0] + [vec.dot(pauli_matrices[p].reshape([4])) for p in ['X', 'Y', 'Z']]
+    return numpy.asarray(factors, dtype=complex)
+
 
 class PauliString:
     """
@@ -100,21 +123,13 @@ class PauliString:
         -------
             traced out PauliString
         """
-        # |psi> = a|0> + b|1>
-        # <psi|op|psi> = |a|**2<0|op|0> + (a*)*b<1|op|0> + (b*)*a<0|op|1> + |b|**2<1|op|1>
-
         if states is None:
             states = [(1.0, 0.0)]*len(qubits)
 
-        def make_coeff_vec(state_tuple):
-            return numpy.asarray([numpy.abs(state_tuple[0])**2, state_tuple[0].conjugate()*state_tuple[1], state_tuple[1].conjugate()*state_tuple[0] ,numpy.abs(state_tuple[1])**2])
-
         factor=1.0
         for q, state in zip(qubits, states):
             if q in self.keys():
-                matrix = pauli_matrices[self[q].upper()].reshape([4])
-                vec = make_coeff_vec(state)
-                factor *= vec.dot(matrix)
+                factor *= trace_factors(state)[pauli_codes[self[q].upper()]]
                 if factor == 0.0:
                     break
 
@@ -278,14 +293,50 @@ class QubitHamiltonian:
         """
         :return: All Qubits the Hamiltonian acts on
         """
-        accumulate = []
-        for ps in self.paulistrings:
-            accumulate += ps.qubits
-        return sorted(list(set(accumulate)))
+        return sorted(list(set([self.index(k) for key in self.keys() for k in key])))
 
     @qubit_operator.setter
     def qubit_operator(self, other: QubitOperator) -> QubitOperator:
         self._qubit_operator = other
+        self.clear_cache()
+
+    def clear_cache(self):
+        """
+        Reset the cached array representation and the cached reductions
+        Called by all methods of this class that change the Hamiltonian,
+        call it manually after changing the underlying openfermion QubitOperator in place
+        """
+        self._pauli_array = None
+        self._reduction_cache = {}
+
+    def pauli_array(self) -> tuple:
+        """
+        Array representation of the Hamiltonian (cached until the Hamiltonian is changed)
+
+        Returns
+        -------
+            tuple of (qubits, codes, coeffs) with
+            qubits: sorted list of the qubits the Hamiltonian acts on (the columns of codes)
+            codes: uint8 array of shape (n_terms, n_qubits) holding the primitive paulis as defined in pauli_codes
+            coeffs: array with the coefficients of the terms
+        """
+        if self._pauli_array is None:
+            keys = list(self.keys())
+            qubits = sorted(list(set([self.index(k) for key in keys for k in key])))
+            column = {q: i for i, q in enumerate(qubits)}
+            rows = []
+            columns = []
+            values = []
+            for i, key in enumerate(keys):
+                for k in key:
+                    rows.append(i)
+                    columns.append(column[self.index(k)])
+                    values.append(pauli_codes[self.pauli(k).upper()])
+            codes = numpy.zeros(shape=[len(keys), len(qubits)], dtype=numpy.uint8)
+            codes[rows, columns] = values
+            coeffs = numpy.asarray(list(self.values()))
+            self._pauli_array = (qubits, codes, coeffs)
+        return self._pauli_array
 
     def index(self, ituple):
         return ituple[0]
@@ -311,6 +362,7 @@ class QubitHamiltonian:
             self._qubit_operator = qubit_hamiltonian
 
         assert (isinstance(self._qubit_operator, QubitOperator))
+        self.clear_cache()
 
     def trace_out_qubits(self, qubits, states: list=None, *args, **kwargs):
         """
@@ -327,15 +379,59 @@ class QubitHamiltonian:
             traced out Hamiltonian
         """
 
+        cache_key = None
         if states is None:
+            # reductions onto the default states are memoized (e.g. for the same Hamiltonian in many expectation values)
+            cache_key = (frozenset(qubits), args, tuple(sorted(kwargs.items())))
+            if cache_key in self._reduction_cache:
+                reduced = QubitOperator.zero()
+                reduced.terms = dict(self._reduction_cache[cache_key])
+                return QubitHamiltonian(qubit_hamiltonian=reduced)
             states = [(1.0,0.0)]*len(qubits)
         else:
             assert len(states) == len(qubits)
             # states should be given as list of individual tq.QubitWaveFunctions
             states = [tuple(s.to_array()) for s in states]
 
-        reduced_ps = [ps.trace_out_qubits(qubits=qubits, states=states) for ps in self.paulistrings]
-        return self.from_paulistrings(ps=reduced_ps).simplify(*args, **kwargs)
+        all_qubits, codes, coeffs = self.pauli_array()
+        column = {q: i for i, q in enumerate(all_qubits)}
+
+        # multiply the coefficients with the expectation values of the traced out paulis
+        factors = numpy.ones(shape=[codes.shape[0]], dtype=complex)
+        traced = set()
+        for q, state in zip(qubits, states):
+            if q in column and column[q] not in traced:
+                traced.add(column[q])
+                factors *= trace_factors(state)[codes[:, column[q]]]
+        if numpy.all(factors.imag == 0.0):
+            factors = factors.real
+
+        kept = [i for i in range(len(all_qubits)) if i not in traced]
+        survivors = factors != 0.0
+        reduced_codes = codes[survivors][:, kept]
+        reduced_coeffs = coeffs[survivors] * factors[survivors]
+
+        # terms that only differed on the traced out qubits are collected
+        terms = {}
+        if reduced_codes.shape[0] > 0:
+            if len(kept) == 0:
+                terms[()] = numpy.sum(reduced_coeffs)
+            else:
+                unique, inverse = numpy.unique(reduced_codes, axis=0, return_inverse=True)
+                summed = numpy.zeros(shape=[unique.shape[0]], dtype=reduced_coeffs.dtype)
+                numpy.add.at(summed, inverse.reshape([-1]), reduced_coeffs)
+                names = {v: k for k, v in pauli_codes.items()}
+                kept_qubits = [all_qubits[i] for i in kept]
+                for row, coeff in zip(unique, summed):
+                    key = tuple([(kept_qubits[i], names[row[i]]) for i in numpy.flatnonzero(row)])
+                    terms[key] = coeff
+
+        reduced = QubitOperator.zero()
+        reduced.terms = terms
+        result = QubitHamiltonian(qubit_hamiltonian=reduced).simplify(*args, **kwargs)
+        if cache_key is not None:
+            self._reduction_cache[cache_key] = dict(result.qubit_operator.terms)
+        return result
 
     def __len__(self):
         return len(self._qubit_operator.terms)
@@ -351,6 +447,7 @@ class QubitHamiltonian:
 
     def __setitem__(self, key, value):
         self._qubit_operator.terms[key] = value
+        self.clear_cache()
         return self
 
     def items(self):
@@ -493,6 +590,7 @@ class QubitHamiltonian:
         try:
             for k, v in self.qubit_operator.terms.items():
                 self.qubit_operator.terms[k] = to_float(v)
+            self.clear_cache()
             return True
         except TypeError:
             return False
@@ -503,6 +601,7 @@ class QubitHamiltonian:
             if not numpy.isclose(v, 0.0, atol=threshold):
                 simplified[k] = v
         self._qubit_operator.terms = simplified
+        self.clear_cache()
         return self
 
     def split(self, *args, **kwargs) -> tuple:
@@ -558,6 +657,7 @@ class QubitHamiltonian:
 
     def normalize(self):
         self._qubit_operator.renormalize()
+        self.clear_cache()
         return self
 
     def to_matrix(self):
@@ -610,6 +710,7 @@ class QubitHamiltonian:
             tmp = QubitOperator(term=ps.key_openfermion(), value=ps.coeff)
             new_hamiltonian += tmp
         self._qubit_operator = new_hamiltonian
+        self.clear_cache()
         return self
 
     def map_qubits(self, qubit_map: dict):
@@ -1,12 +1,21 @@
 import numpy
-from tequila.objective import format_variable_dictionary
+import time
+from tequila.objective.objective import assign_variable
 from tequila.tools.qng import evaluate_qng
-import sys
 """
 Define Containers for SciPy usage
 """
 
 
+def print_evaluation(record: dict):
+    """
+    Default logger of _EvalContainer: print a structured evaluation record.
+    """
+    if "angles" in record:
+        print("E={:+2.8f}".format(record["energy"]), " angles=", record["angles"], " samples=", record["samples"])
+    else:
+        print("E={:+2.8f}".format(record["energy"]))
+
 
 class _EvalContainer:
     """
@@ -31,12 +40,29 @@ class _EvalContainer:
         if save_history, a list of energies received from every __call__
     history_angles:
         if save_history, a list of angles sent to __call__.
+    last:
+        the most recent result of __call__ (with the angles for _EvalContainer).
+    best:
+        the lowest value received from __call__ and the corresponding angles.
+    logger:
+        callable receiving a dictionary describing an evaluation (evaluation, energy, samples, time and,
+        for print_level > 2, angles). Only called if print_level > 1.
+    log_interval:
+        minimal time in seconds between two calls of the logger (None or 0: log every evaluation).
+    evaluations:
+        number of calls so far.
+    on_evaluate:
+        optional callable receiving the parameters of every call before the objective is evaluated
+        (used to start the gradient evaluation in the background with _GradContainer.prefetch).
 
 
     """
 
+    # names of the history properties for values and angles (see OptimizerHistory.new_series)
+    series = ("energy_calls", "angles_calls")
+
     def __init__(self, objective, param_keys, passive_angles=None, samples=None, save_history=True,
-                 print_level: int = 3):
+                 print_level: int = 3, history=None, logger=None, log_interval: float = None):
         self.objective = objective
         self.samples = samples
         self.param_keys = param_keys
@@ -44,9 +70,47 @@ class _EvalContainer:
         self.save_history = save_history
         self.print_level = print_level
         self.passive_angles = passive_angles
+        self.logger = print_evaluation if logger is None else logger
+        self.log_interval = log_interval
+        self.evaluations = 0
+        self._last_log = None
+        self._start = time.monotonic()
+        # index map: position in the parameter array -> variable, formatted once
+        self._keys = [assign_variable(k) for k in param_keys]
+        self._passive = {} if passive_angles is None else {assign_variable(k): v for k, v in passive_angles.items()}
+        self.on_evaluate = None
+        self.last = None
+        self.best = (None, None)
         if save_history:
-            self.history = []
-            self.history_angles = []
+            # with an OptimizerHistory given, the containers follow its storage (lists or bounded HistoryTraces)
+            if history is None:
+                self.history = []
+                self.history_angles = []
+            else:
+                self.history = history.new_series(self.series[0])
+                self.history_angles = history.new_series(self.series[1])
+
+    def variables(self, p) -> dict:
+        """
+        the variables (active and passive) corresponding to the parameter array p
+        """
+        variables = dict(zip(self._keys, p.tolist()))
+        if self._passive:
+            variables.update(self._passive)
+        return variables
+
+    def log(self, E, angles):
+        """
+        pass the evaluation to the logger, at most once every log_interval seconds
+        """
+        now = time.monotonic()
+        if self.log_interval and self._last_log is not None and now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        record = {"evaluation": self.evaluations, "energy": E, "samples": self.samples, "time": now - self._start}
+        if self.print_level > 2:
+            record["angles"] = angles
+        self.logger(record)
 
     def __call__(self, p, *args, **kwargs):
         """
@@ -64,19 +128,19 @@ class _EvalContainer:
             value of self.objective with p translated into variables, as a numpy array.
         """
 
-        angles = dict((self.param_keys[i], p[i]) for i in range(self.N))
-        if self.passive_angles is not None:
-            angles = {**angles, **self.passive_angles}
-        vars = format_variable_dictionary(angles)
-        E = self.objective(variables=vars, samples=self.samples)
-        if self.print_level > 2:
-            print("E={:+2.8f}".format(E), " angles=", angles, " samples=", self.samples)
-        elif self.print_level > 1:
-            print("E={:+2.8f}".format(E))
+        if self.on_evaluate is not None:
+            self.on_evaluate(p)
+        angles = self.variables(p)
+        E = self.objective(variables=angles, samples=self.samples)
+        self.evaluations += 1
+        if self.print_level > 1:
+            self.log(E, angles)
+        self.last = (E, angles)
+        if self.best[0] is None or E < self.best[0]:
+            self.best = (E, angles)
         if self.save_history:
             self.history.append(E)
             self.history_angles.append(angles)
-        sys.stdout.flush()
         return numpy.float64(E)  # jax types confuses optimizers
 
 
@@ -86,8 +150,36 @@ class _GradContainer(_EvalContainer):
     This class is used by the SciPy optimizer and should not be used elsewhere.
     see _EvalContainer for details.
 
+    Attributes
+    ----------
+    evaluator:
+        optional _AsyncEvaluator; if set, prefetch submits the components of the gradient to it
+        and __call__ picks up the results if it is called at the same parameters.
     """
 
+    series = ("gradient_calls", None)
+    evaluator = None
+    _pending = None
+
+    def prefetch(self, p):
+        """
+        start evaluating the gradient at p in the background.
+        Parameters
+        ----------
+        p: numpy array:
+            Parameters with which the gradient will probably be called next
+        """
+        if self.evaluator is None:
+            return
+        if self._pending is not None:
+            if numpy.array_equal(self._pending[0], p):
+                return
+            self._pending[1].cancel()
+        variables = self.variables(p)
+        functions = [self.objective[k] for k in self.param_keys]
+        self._pending = (numpy.array(p, copy=True), self.evaluator.submit_vector(functions, variables,
+                                                                                  samples=self.samples))
+
     def __call__(self, p, *args, **kwargs):
         """
         call the wrapped qng.
@@ -105,15 +197,19 @@ class _GradContainer(_EvalContainer):
             value of self.objective with p translated into variables, as a numpy array.
         """
         dO = self.objective
-        dE_vec = numpy.zeros(self.N)
         memory = dict()
-        variables = dict((self.param_keys[i], p[i]) for i in range(len(self.param_keys)))
-        if self.passive_angles is not None:
-            variables = {**variables, **self.passive_angles}
+        if self._pending is not None and numpy.array_equal(self._pending[0], p):
+            dE_vec = self._pending[1].result()
+        else:
+            dE_vec = numpy.zeros(self.N)
+            variables = self.variables(p)
+            for i in range(self.N):
+                dE_vec[i] = dO[self.param_keys[i]](variables=variables, samples=self.samples)
+        self._pending = None
         for i in range(self.N):
-            dE_vec[i] = dO[self.param_keys[i]](variables=variables, samples=self.samples)
             memory[self.param_keys[i]] = dE_vec[i]
 
+        self.last = memory
         self.history.append(memory)
         return numpy.asarray(dE_vec, dtype=numpy.float64)  # jax types confuse optimizers
 
@@ -135,6 +231,8 @@ class _QngContainer(_EvalContainer):
         evaluate the qng.
     """
 
+    series = ("gradient_calls", None)
+
 
     def __init__(self, combos, param_keys, passive_angles=None, samples=None, save_history=True):
 
@@ -175,12 +273,11 @@ class _QngContainer(_EvalContainer):
             value of the qng of some object with p translated into variables, as a numpy array.
         """
         memory = dict()
-        variables = dict((self.param_keys[i], p[i]) for i in range(len(self.param_keys)))
-        if self.passive_angles is not None:
-            variables = {**variables, **self.passive_angles}
+        variables = self.variables(p)
         out = self.evaluate_qng(variables=variables)
         for i in range(self.N):
             memory[self.param_keys[i]] = out[i]
+        self.last = memory
         self.history.append(memory)
         return numpy.asarray(out, dtype=numpy.float64)
 
@@ -193,6 +290,8 @@ class _HessContainer(_EvalContainer):
 
     """
 
+    series = ("hessian_calls", None)
+
     def __call__(self, p, *args, **kwargs):
         """
         call the wrapped Hessian.
@@ -213,9 +312,17 @@ class _HessContainer(_EvalContainer):
         ddO = self.objective
         ddE_mat = numpy.zeros(shape=[self.N, self.N])
         memory = dict()
-        variables = dict((self.param_keys[i], p[i]) for i in range(len(self.param_keys)))
-        if self.passive_angles is not None:
-            variables = {**variables, **self.passive_angles}
+        variables = self.variables(p)
+        if callable(ddO):
+            # assembled as a whole (see _ShiftHessian)
+            order = [ddO.index[k] for k in self._keys]
+            ddE_mat = ddO(variables=variables, samples=self.samples)[numpy.ix_(order, order)]
+            for i in range(self.N):
+                for j in range(i, self.N):
+                    memory[(self.param_keys[i], self.param_keys[j])] = ddE_mat[i, j]
+            self.last = memory
+            self.history.append(memory)
+            return numpy.asarray(ddE_mat, dtype=numpy.float64)
         for i in range(self.N):
             for j in range(i, self.N):
                 key = (self.param_keys[i], self.param_keys[j])
@@ -223,5 +330,6 @@ class _HessContainer(_EvalContainer):
                 ddE_mat[i, j] = value
                 ddE_mat[j, i] = value
                 memory[key] = value
+        self.last = memory
         self.history.append(memory)
         return numpy.asarray(ddE_mat, dtype=numpy.float64)  # jax types confuse optimizers
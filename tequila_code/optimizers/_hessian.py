@@ -0,0 +1,353 @@
+"""
+Hessians assembled from deduplicated parameter shifted circuits
+"""
+import typing
+import numbers
+import numpy
+
+from tequila.utils.exceptions import TequilaException
+from tequila.objective.objective import Objective, ExpectationValueImpl, Variable, assign_variable, identity
+from tequila.circuit.compiler import CircuitCompiler
+from tequila.circuit.gradient import grad
+from tequila.autograd_imports import jax
+
+
+def _value(x, variables) -> float:
+    # derivatives of gate parameters are numbers or classical objectives
+    if isinstance(x, numbers.Number):
+        return float(x)
+    return float(x(variables))
+
+
+class _ShiftHessian:
+    """
+    Hessian of an objective, assembled from the parameter shifted circuits of its expectation values.
+
+    Instead of differentiating the gradient objectives once more for every pair of variables,
+    the doubly shifted circuits are enumerated directly for every pair of parametrized gates.
+    Circuits appearing in several entries (e.g. through gates sharing variables,
+    symmetric entries or shifts of the same gate in different order) are compiled and evaluated only once per call.
+    All circuits needed for a call are evaluated in one batch (concurrently if an evaluator is given).
+
+    Modes:
+    'full': the full matrix,
+    'diagonal': only the diagonal (a diagonal matrix is returned),
+    'lowrank': Nystroem approximation H[:, S] pinv(H[S, S]) H[S, :] with S the rank variables of largest
+    diagonal magnitude, needs the diagonal and rank columns instead of all entries.
+
+    Should not be used outside of optimizers.
+
+    Attributes
+    ----------
+    keys:
+        the variables of the hessian, rows and columns of the returned matrix are in this order.
+    mode:
+        'full', 'diagonal' or 'lowrank'.
+    rank:
+        number of columns used in 'lowrank' mode.
+    evaluations:
+        number of circuit evaluations so far.
+    """
+
+    modes = ["full", "diagonal", "lowrank"]
+
+    def __init__(self, objective: Objective, variables: list, compile_objective: typing.Callable,
+                 mode: str = "full", rank: int = None, evaluator=None):
+        """
+        Parameters
+        ----------
+        objective: Objective:
+            the (not compiled) objective, with a scalar transformation of expectation values and variables.
+        variables: list:
+            the variables of the hessian.
+        compile_objective: callable:
+            compiles an Objective (e.g. Optimizer.compile_objective).
+        mode: str: Default = 'full':
+            'full', 'diagonal' or 'lowrank'.
+        rank: int, optional:
+            number of columns for 'lowrank', default is a quarter of the variables (at least one).
+        evaluator: optional:
+            anything with a concurrent.futures like submit function, evaluates the circuits of a batch concurrently.
+        """
+        if mode not in self.modes:
+            raise TequilaException("unknown hessian mode {}, available are {}".format(mode, self.modes))
+        if objective.is_translated():
+            raise TequilaException("_ShiftHessian needs the abstract, not compiled, objective")
+        self.keys = [assign_variable(k) for k in variables]
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        self.mode = mode
+        if rank is None:
+            rank = max(1, len(self.keys) // 4)
+        self.rank = min(rank, len(self.keys))
+        self.evaluator = evaluator
+        self.evaluations = 0
+        self._compile = compile_objective
+
+        compiler = CircuitCompiler(multitarget=True, trotterized=True, hadamard_power=True, power=True,
+                                   controlled_phase=True, controlled_rotation=True, gradient_mode=True)
+        # all gates: a variable list makes the compiler visit gates depending on several variables repeatedly
+        compiled = compiler(objective)
+        self.args = compiled.args
+        self.transformation = compiled.transformation
+
+        # parametrized gates of every expectation value: position -> gate
+        # with the derivatives of the gate parameter with respect to the variables
+        self._gates = {}
+        self._derivatives = {}
+        curved = False
+        for a, arg in enumerate(self.args):
+            if not isinstance(arg, ExpectationValueImpl):
+                continue
+            gates = {}
+            for k in self.keys:
+                for position, gate in arg.U._parameter_map.get(k, []):
+                    gates[position] = gate
+            self._gates[a] = gates
+            for position, gate in gates.items():
+                first, second = self._parameter_derivatives(gate.parameter)
+                self._derivatives[(a, position)] = (first, second)
+                curved = curved or len(second) > 0
+
+        # classical part: derivatives of the transformation with respect to its arguments
+        self._linear = self.transformation is None or self.transformation == identity
+        self._outer = None
+        if not self._linear:
+            self._outer = self._outer_derivatives()
+        # gradients of the expectation values are only needed for curved transformations or gate parameters
+        self._first_order = curved or (self._outer is None and not self._linear)
+
+        self._shifts = {}
+        self._circuits = {}
+        if self.mode != "lowrank":
+            pairs = [(i, i) for i in range(len(self.keys))]
+            if self.mode == "full":
+                pairs = [(i, j) for i in range(len(self.keys)) for j in range(i, len(self.keys))]
+            for key in self._plan(pairs):
+                self._circuit(key)
+
+    def _parameter_derivatives(self, parameter) -> tuple:
+        """
+        first and second derivatives of a gate parameter with respect to the variables
+        as dictionaries of numbers or classical objectives
+        """
+        if isinstance(parameter, Variable):
+            return ({parameter: 1.0} if parameter in self.index else {}), {}
+        dependencies = [k for k in parameter.extract_variables() if k in self.index]
+        first = {k: grad(parameter, k) for k in dependencies}
+        second = {}
+        for k, dk in first.items():
+            if isinstance(dk, numbers.Number):
+                continue
+            for l in dependencies:
+                if l in dk.extract_variables():
+                    second[(k, l)] = grad(dk, l)
+        return first, second
+
+    def _outer_derivatives(self) -> typing.Optional[tuple]:
+        """
+        constant gradient of the transformation if it is affine in its arguments (checked at random points),
+        None otherwise
+        """
+        f = self._transformation_vector
+        n = len(self.args)
+        points = numpy.random.default_rng(0).uniform(-1.0, 1.0, size=(2, n))
+        try:
+            gradients = [numpy.asarray(jax.grad(f)(x), dtype=float) for x in points]
+            hessians = [numpy.asarray(jax.hessian(f)(x), dtype=float) for x in points]
+        except Exception:
+            return None
+        if numpy.allclose(gradients[0], gradients[1]) and all(numpy.allclose(h, 0.0) for h in hessians):
+            return (gradients[0],)
+        return None
+
+    def _transformation_vector(self, x):
+        return self.transformation(*[x[i] for i in range(len(self.args))])
+
+    def _shifted(self, gate, path: tuple) -> tuple:
+        """
+        weight and gate(s) of a gate shifted successively by the shift rules in path
+        """
+        weight = 1.0
+        for s in path:
+            if isinstance(gate, (list, tuple)) or not hasattr(gate, "shifted_gates"):
+                raise TequilaException("_ShiftHessian: can not shift the shifted gate {} once more".format(gate))
+            w, gate = gate.shifted_gates()[s]
+            weight *= w
+        return weight, gate
+
+    def _circuit(self, key: tuple):
+        """
+        the compiled expectation value of a shifted circuit, key: (argument, ((position, path), ...))
+        """
+        if key not in self._circuits:
+            a, shifts = key
+            E = self.args[a]
+            positions = []
+            circuits = []
+            for position, path in shifts:
+                weight, gate = self._shifted(self._gates[a][position], path)
+                positions.append(position)
+                circuits.append(gate)
+            U = E.U.replace_gates(positions=positions, circuits=circuits) if len(positions) > 0 else E.U
+            self._circuits[key] = self._compile(Objective.ExpectationValue(U=U, H=E.H))
+        return self._circuits[key]
+
+    def _terms(self, a: int, position: int) -> list:
+        if (a, position) not in self._shifts:
+            self._shifts[(a, position)] = [w for w, g in self._gates[a][position].shifted_gates()]
+        return self._shifts[(a, position)]
+
+    def _first_terms(self, a: int, g: int) -> list:
+        """ (weight, key) of the first derivative with respect to the parameter of gate g """
+        return [(w, (a, ((g, (s,)),))) for s, w in enumerate(self._terms(a, g))]
+
+    def _second_terms(self, a: int, g: int, h: int) -> list:
+        """ (weight, key) of the second derivative with respect to the parameters of gates g and h """
+        wg = self._terms(a, g)
+        wh = self._terms(a, h)
+        terms = []
+        for s in range(len(wg)):
+            for t in range(len(wh)):
+                if g == h:
+                    shifts = ((g, tuple(sorted((s, t)))),)
+                else:
+                    shifts = tuple(sorted([(g, (s,)), (h, (t,))]))
+                terms.append((wg[s] * wh[t], (a, shifts)))
+        return terms
+
+    def _gates_of(self, a: int, k) -> list:
+        return [p for p in self._gates[a] if k in self._derivatives[(a, p)][0]]
+
+    def _plan(self, pairs: list) -> list:
+        """ keys of all circuits needed for the entries pairs (index tuples) """
+        keys = {}
+        for a in self._gates:
+            if not self._linear:
+                keys[(a, ())] = None
+            for i, j in pairs:
+                for g in self._gates_of(a, self.keys[i]):
+                    for h in self._gates_of(a, self.keys[j]):
+                        for w, key in self._second_terms(a, min(g, h), max(g, h)):
+                            keys[key] = None
+            if self._first_order:
+                for g in self._gates[a]:
+                    for w, key in self._first_terms(a, g):
+                        keys[key] = None
+        return list(keys.keys())
+
+    def _evaluate(self, keys: list, variables, samples=None) -> dict:
+        functions = [self._circuit(key) for key in keys]
+        if self.evaluator is not None:
+            futures = [self.evaluator.submit(f, variables, samples=samples) for f in functions]
+            values = [f.result() for f in futures]
+        else:
+            values = [f(variables=variables, samples=samples) for f in functions]
+        self.evaluations += len(keys)
+        return {key: float(v) for key, v in zip(keys, values)}
+
+    def entries(self, variables, pairs: list, samples=None) -> dict:
+        """
+        evaluate hessian entries
+
+        Parameters
+        ----------
+        variables: dict:
+            the variables to evaluate at.
+        pairs: list:
+            the entries as tuples of indices into self.keys.
+        samples: int, optional:
+            samples for the circuits.
+
+        Returns
+        -------
+        dict:
+            index tuple: value
+        """
+        results = self._evaluate(self._plan(pairs), variables, samples=samples)
+        n = len(self.keys)
+
+        first = {}
+        second = {}
+        for (a, position), (dp, ddp) in self._derivatives.items():
+            first[(a, position)] = {k: _value(v, variables) for k, v in dp.items()}
+            second[(a, position)] = {k: _value(v, variables) for k, v in ddp.items()}
+
+        # outer derivatives of the transformation at the current arguments
+        if self._linear:
+            f1 = numpy.ones(len(self.args))
+            f2 = None
+        elif self._outer is not None:
+            f1 = self._outer[0]
+            f2 = None
+        else:
+            x = numpy.asarray([results[(a, ())] if a in self._gates else float(arg(variables))
+                               for a, arg in enumerate(self.args)], dtype=float)
+            f1 = numpy.asarray(jax.grad(self._transformation_vector)(x), dtype=float)
+            f2 = numpy.asarray(jax.hessian(self._transformation_vector)(x), dtype=float)
+
+        # gradients of the arguments with respect to the variables
+        gradients = None
+        if f2 is not None:
+            gradients = numpy.zeros([len(self.args), n])
+            for a, arg in enumerate(self.args):
+                if a in self._gates:
+                    for g in self._gates[a]:
+                        d = sum(w * results[key] for w, key in self._first_terms(a, g))
+                        for k, v in first[(a, g)].items():
+                            gradients[a, self.index[k]] += v * d
+                elif isinstance(arg, Variable) and arg in self.index:
+                    gradients[a, self.index[arg]] = 1.0
+
+        entries = {}
+        for i, j in pairs:
+            ki, kj = self.keys[i], self.keys[j]
+            value = 0.0
+            for a in self._gates:
+                if f1[a] == 0.0:
+                    continue
+                H = 0.0
+                for g in self._gates_of(a, ki):
+                    for h in self._gates_of(a, kj):
+                        d = sum(w * results[key] for w, key in self._second_terms(a, min(g, h), max(g, h)))
+                        H += first[(a, g)][ki] * first[(a, h)][kj] * d
+                for g in self._gates[a]:
+                    c = second[(a, g)].get((ki, kj), 0.0)
+                    if c != 0.0:
+                        H += c * sum(w * results[key] for w, key in self._first_terms(a, g))
+                value += f1[a] * H
+            if f2 is not None:
+                value += gradients[:, i] @ f2 @ gradients[:, j]
+            entries[(i, j)] = value
+            entries[(j, i)] = value
+        return entries
+
+    def __call__(self, variables, samples=None, *args, **kwargs) -> numpy.ndarray:
+        """
+        the hessian (or its approximation in the chosen mode) as matrix in the order of self.keys
+        """
+        n = len(self.keys)
+        if self.mode == "full" or (self.mode == "lowrank" and self.rank == n):
+            entries = self.entries(variables, [(i, j) for i in range(n) for j in range(i, n)], samples=samples)
+            matrix = numpy.zeros([n, n])
+            for (i, j), v in entries.items():
+                matrix[i, j] = v
+            return matrix
+
+        entries = self.entries(variables, [(i, i) for i in range(n)], samples=samples)
+        diagonal = numpy.asarray([entries[(i, i)] for i in range(n)])
+        if self.mode == "diagonal":
+            return numpy.diag(diagonal)
+
+        selected = [int(i) for i in numpy.argsort(-numpy.abs(diagonal), kind="stable")[:self.rank]]
+        pairs = [(i, j) for i in selected for j in range(n) if (i, j) not in entries]
+        entries.update(self.entries(variables, pairs, samples=samples))
+        C = numpy.asarray([[entries[(i, s)] for s in selected] for i in range(n)])
+        return C @ numpy.linalg.pinv(C[selected]) @ C.T
+
+    def count_expectationvalues(self, *args, **kwargs) -> int:
+        """ number of distinct shifted circuits compiled so far """
+        return len(self._circuits)
+
+    def __repr__(self):
+        return "_ShiftHessian(mode={}, {} variables, {} circuits)".format(self.mode, len(self.keys),
+                                                                          len(self._circuits))
@@ -0,0 +1,262 @@
+"""
+Columnar storage for long optimization histories
+"""
+import os
+import pickle
+import typing
+import numbers
+import numpy
+
+
+class HistoryTrace:
+    """
+    Sequence of numbers or of equally keyed dictionaries (like angles or gradients)
+    stored column wise in numpy arrays.
+
+    Entries can be decimated (only every n-th entry is kept), the number of entries held in memory
+    can be bounded (ring buffer with the most recent entries) and all kept entries can be
+    spilled to a directory of npy chunks on the fly.
+    Indexing and iteration give back the entries in their original form (float or dictionary),
+    the original position of each stored entry is in self.steps.
+
+    Attributes
+    ----------
+    keys:
+        the keys of the dictionaries (None if the trace holds numbers).
+    max_length:
+        maximum number of entries held in memory (None: unbounded).
+    decimation:
+        only every decimation-th entry is kept.
+    spill:
+        directory to which all kept entries are written in chunks (None: no spilling).
+    """
+
+    def __init__(self, max_length: int = None, decimation: int = 1, spill: str = None, chunk_size: int = 1024):
+        """
+        Parameters
+        ----------
+        max_length: int, optional:
+            maximum number of entries held in memory, older entries are dropped (they are kept in the spill files).
+        decimation: int: Default = 1:
+            only every decimation-th entry is kept.
+        spill: str, optional:
+            directory for the npy chunks, created if it does not exist.
+        chunk_size: int: Default = 1024:
+            number of entries per npy chunk.
+        """
+        if max_length is not None and max_length < 1:
+            raise ValueError("max_length of HistoryTrace needs to be positive, got {}".format(max_length))
+        if decimation < 1:
+            raise ValueError("decimation of HistoryTrace needs to be positive, got {}".format(decimation))
+        self.max_length = max_length
+        self.decimation = int(decimation)
+        self.spill = spill
+        self.chunk_size = chunk_size
+        self.keys = None
+        self._scalar = None
+        self._index = {}
+        self._data = numpy.empty(shape=[0, 0])
+        self._steps = numpy.empty(shape=[0], dtype=numpy.int64)
+        self._size = 0  # number of entries held in memory
+        self._kept = 0  # number of entries kept in total
+        self._count = 0  # number of entries appended in total
+        self._chunk = []
+        self._n_chunks = 0
+        if spill is not None:
+            os.makedirs(spill, exist_ok=True)
+
+    def _setup(self, value):
+        self._scalar = not hasattr(value, "keys")
+        if self._scalar:
+            self.keys = None
+            self._data = numpy.empty(shape=[0, 1])
+        else:
+            self._add_keys(value.keys())
+
+    def _add_keys(self, keys):
+        new = [k for k in keys if k not in self._index]
+        if len(new) == 0:
+            return
+        if self.keys is None:
+            self.keys = []
+        for k in new:
+            self._index[k] = len(self.keys)
+            self.keys.append(k)
+        self._data = numpy.pad(self._data, ((0, 0), (0, len(new))), constant_values=numpy.nan)
+        if len(self._chunk) > 0:
+            self._flush_chunk()
+        if self.spill is not None:
+            with open(os.path.join(self.spill, "keys.pickle"), "wb") as f:
+                pickle.dump(self.keys, f)
+
+    def _row(self, value) -> numpy.ndarray:
+        if self._scalar:
+            return numpy.asarray([value], dtype=float)
+        if not all(k in self._index for k in value.keys()):
+            self._add_keys(value.keys())
+        row = numpy.full(len(self.keys), numpy.nan)
+        for k, v in value.items():
+            row[self._index[k]] = v
+        return row
+
+    def _store(self, row: numpy.ndarray):
+        step = self._count
+        self._count += 1
+        if step % self.decimation != 0:
+            return
+        capacity = len(self._steps)
+        if self.max_length is not None and self._size == self.max_length:
+            position = self._kept % self.max_length
+        else:
+            if self._size == capacity:
+                capacity = max(16, 2 * capacity)
+                if self.max_length is not None:
+                    capacity = min(capacity, self.max_length)
+                self._data = numpy.resize(self._data, [capacity, self._data.shape[1]])
+                self._steps = numpy.resize(self._steps, [capacity])
+            position = self._size
+            self._size += 1
+        self._data[position] = row
+        self._steps[position] = step
+        self._kept += 1
+        if self.spill is not None:
+            self._chunk.append(numpy.concatenate([[step], row]))
+            if len(self._chunk) >= self.chunk_size:
+                self._flush_chunk()
+
+    def _flush_chunk(self):
+        numpy.save(os.path.join(self.spill, "{:08d}.npy".format(self._n_chunks)), numpy.asarray(self._chunk))
+        self._n_chunks += 1
+        self._chunk = []
+
+    def flush(self):
+        """ write the pending entries to the spill directory """
+        if self.spill is not None and len(self._chunk) > 0:
+            self._flush_chunk()
+
+    def append(self, value: typing.Union[numbers.Real, dict]):
+        if self._scalar is None:
+            self._setup(value)
+        self._store(self._row(value))
+
+    def extend(self, values: typing.Iterable):
+        for value in values:
+            self.append(value)
+
+    def extend_rows(self, keys: list, rows: numpy.ndarray, base: dict = None):
+        """
+        append entries given as rows of an array, avoids building the dictionaries
+
+        Parameters
+        ----------
+        keys: list:
+            the keys corresponding to the columns of rows.
+        rows: numpy.ndarray:
+            two dimensional array, one row per entry.
+        base: dict, optional:
+            values of further keys, equal for all entries.
+        """
+        rows = numpy.asarray(rows, dtype=float).reshape([-1, len(keys)])
+        if len(rows) == 0:
+            return
+        if base is not None:
+            extra = [k for k in base.keys() if k not in keys]
+            keys = list(keys) + extra
+            rows = numpy.hstack([rows, numpy.tile([base[k] for k in extra], (len(rows), 1))])
+        if self._scalar is None:
+            self._scalar = False
+        self._add_keys(keys)
+        columns = [self._index[k] for k in keys]
+        for row in rows:
+            full = numpy.full(len(self.keys), numpy.nan)
+            full[columns] = row
+            self._store(full)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def _order(self) -> numpy.ndarray:
+        """ positions of the stored entries in the order they were appended """
+        if self.max_length is not None and self._size == self.max_length:
+            return numpy.roll(numpy.arange(self._size), -(self._kept % self.max_length))
+        return numpy.arange(self._size)
+
+    def _entry(self, row: numpy.ndarray):
+        if self._scalar:
+            return float(row[0])
+        return {k: float(v) for k, v in zip(self.keys, row) if not numpy.isnan(v)}
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, item):
+        order = self._order()
+        if isinstance(item, slice):
+            return [self._entry(self._data[i]) for i in order[item]]
+        return self._entry(self._data[order[item]])
+
+    def __iter__(self):
+        for i in self._order():
+            yield self._entry(self._data[i])
+
+    def __array__(self, dtype=None, copy=None):
+        data = self._data[self._order()]
+        if self._scalar:
+            data = data[:, 0]
+        return numpy.asarray(data, dtype=dtype)
+
+    @property
+    def count(self) -> int:
+        """ number of entries appended in total (including dropped and decimated ones) """
+        return self._count
+
+    @property
+    def steps(self) -> numpy.ndarray:
+        """ the original positions of the entries held in memory """
+        return self._steps[self._order()]
+
+    def indexed(self) -> typing.Iterator[tuple]:
+        """ iterate over (original position, entry) """
+        for i in self._order():
+            yield int(self._steps[i]), self._entry(self._data[i])
+
+    def column(self, key) -> typing.Dict[numbers.Integral, numbers.Real]:
+        """ the values of key over time as dictionary: original position -> value """
+        if self._scalar or self.keys is None or key not in self._index:
+            return {}
+        order = self._order()
+        values = self._data[order, self._index[key]]
+        return {int(s): float(v) for s, v in zip(self._steps[order], values) if not numpy.isnan(v)}
+
+    @staticmethod
+    def read_spill(directory: str) -> typing.Tuple[numpy.ndarray, numpy.ndarray, typing.Optional[list]]:
+        """
+        Read the entries spilled to a directory
+
+        Returns
+        -------
+        tuple:
+            original positions, array with one row per entry (nan for missing keys), keys (None for numbers)
+        """
+        keys = None
+        if os.path.exists(os.path.join(directory, "keys.pickle")):
+            with open(os.path.join(directory, "keys.pickle"), "rb") as f:
+                keys = pickle.load(f)
+        chunks = sorted(x for x in os.listdir(directory) if x.endswith(".npy"))
+        chunks = [numpy.load(os.path.join(directory, x)) for x in chunks]
+        if len(chunks) == 0:
+            return numpy.empty(shape=[0], dtype=numpy.int64), numpy.empty(shape=[0, 0]), keys
+        width = max(x.shape[1] for x in chunks)
+        data = numpy.vstack([numpy.pad(x, ((0, 0), (0, width - x.shape[1])), constant_values=numpy.nan)
+                             for x in chunks])
+        return data[:, 0].astype(numpy.int64), data[:, 1:], keys
+
+    def __repr__(self):
+        return "HistoryTrace({} of {} entries in memory, keys={})".format(self._size, self._count, self.keys)
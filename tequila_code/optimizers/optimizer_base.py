@@ -1,16 +1,19 @@
 """
 Base class for Optimizers.
 """
-import typing, numbers, copy, warnings
+import typing, numbers, copy, warnings, functools, os, pickle, threading, concurrent.futures, multiprocessing.pool
 
 from tequila.utils.exceptions import TequilaException, TequilaWarning
 from tequila.simulators.simulator_api import compile, pick_backend
 from tequila.objective import Objective
 from tequila.circuit.gradient import grad
 from dataclasses import dataclass, field
-from tequila.objective.objective import assign_variable, Variable, format_variable_dictionary, format_variable_list
+from tequila.objective.objective import assign_variable, Variable, FixedVariable, format_variable_dictionary, \
+    format_variable_list
+from tequila.simulators.simulator_base import BackendExpectationValue
 import numpy
-from random import choices
+from ._history import HistoryTrace
+from ._hessian import _ShiftHessian
 
 
 class TequilaOptimizerException(TequilaException):
@@ -21,12 +24,20 @@ class TequilaOptimizerException(TequilaException):
 class OptimizerHistory:
     """
     A class representing the history of optimizers over time. Has a variety of convenience functions attached to it.
+
+    By default everything is kept in lists. If max_length, decimation or spill are set,
+    the entries are stored in columnar HistoryTrace objects with bounded memory instead:
+    max_length: only the most recent entries are held in memory,
+    decimation: only every n-th entry is kept,
+    spill: directory to which all kept entries are written (one subdirectory per property).
     """
 
     @property
     def iterations(self):
         if self.energies is None:
             return 0
+        elif isinstance(self.energies, HistoryTrace):
+            return self.energies.count
         else:
             return len(self.energies)
 
@@ -39,7 +50,42 @@ class OptimizerHistory:
     energy_calls: typing.List[numbers.Real] = field(default_factory=list)
     gradient_calls: typing.List[typing.Dict[str, numbers.Real]] = field(default_factory=list)
     angles_calls: typing.List[typing.Dict[str, numbers.Number]] = field(default_factory=list)
-    
+
+    # bounded memory storage
+    max_length: int = None
+    decimation: int = 1
+    spill: str = None
+
+    def __post_init__(self):
+        if self.streaming:
+            for name in ["energies", "gradients", "angles", "energy_calls", "gradient_calls", "angles_calls"]:
+                if len(getattr(self, name)) == 0:
+                    setattr(self, name, self.new_series(name))
+
+    @property
+    def streaming(self) -> bool:
+        return self.max_length is not None or self.decimation > 1 or self.spill is not None
+
+    def new_series(self, name: str) -> typing.Union[list, HistoryTrace]:
+        """
+        an empty container for the property name: a list or, with bounded memory, a HistoryTrace
+        series without a name are not spilled
+        """
+        if not self.streaming:
+            return []
+        spill = None
+        if self.spill is not None and name is not None:
+            spill = os.path.join(self.spill, name)
+        return HistoryTrace(max_length=self.max_length, decimation=self.decimation, spill=spill)
+
+    def flush(self):
+        """
+        write pending entries of all properties to the spill directory
+        """
+        for value in self.__dict__.values():
+            if isinstance(value, HistoryTrace):
+                value.flush()
+
     # backward comp.
     @property
     def energies_calls(self):
@@ -53,9 +99,9 @@ class OptimizerHistory:
         magic method for convenient combination of history objects.
         """
         result = OptimizerHistory()
-        result.energies = self.energies + other.energies
-        result.gradients = self.gradients + other.gradients
-        result.angles = self.angles + other.angles
+        result.energies = list(self.energies) + list(other.energies)
+        result.gradients = list(self.gradients) + list(other.gradients)
+        result.angles = list(self.angles) + list(other.angles)
         return result
 
     def __iadd__(self, other):
@@ -71,7 +117,7 @@ class OptimizerHistory:
         """
         convenience function to get the energies back as a dictionary.
         """
-        return {i: e for i, e in enumerate(self.energies)}
+        return {i: e for i, e in _indexed(self.energies)}
 
     def extract_gradients(self, key: str) -> typing.Dict[numbers.Integral, numbers.Real]:
         """
@@ -86,6 +132,8 @@ class OptimizerHistory:
         dict:
             a dictionary, representing the gradient of variable 'key' over time.
         """
+        if isinstance(self.gradients, HistoryTrace):
+            return self.gradients.column(assign_variable(key))
         gradients = {}
         for i, d in enumerate(self.gradients):
             if key in d:
@@ -106,6 +154,8 @@ class OptimizerHistory:
         dict:
             a dictionary, representing the value of variable 'key' over time.
         """
+        if isinstance(self.angles, HistoryTrace):
+            return self.angles.column(assign_variable(key))
         angles = {}
         for i, d in enumerate(self.angles):
             if key in d:
@@ -211,6 +261,13 @@ class OptimizerHistory:
             pickle.dump(fig, open(filename + ".pickle", "wb"))
             plt.savefig(fname=filename + ".pdf", **kwargs)
 
+def _indexed(series):
+    # (iteration, entry) pairs of lists and HistoryTraces
+    if isinstance(series, HistoryTrace):
+        return series.indexed()
+    return enumerate(series)
+
+
 @dataclass
 class OptimizerResults:
 
@@ -225,6 +282,227 @@ class OptimizerResults:
         return self.variables
 
 
+CHECKPOINT_VERSION = 2
+
+
+def write_checkpoint(filename: str, state: dict):
+    """
+    Write an optimizer state to a binary checkpoint file.
+    The file is replaced atomically, an interrupted write leaves the previous checkpoint intact.
+    The trajectory is not part of the state, its rows are appended to a separate file with append_checkpoint_rows.
+
+    Parameters
+    ----------
+    filename: str:
+        the checkpoint file
+    state: dict:
+        the state of the optimizer (numpy arrays, numbers and variables)
+    """
+    tmp = "{}.tmp".format(filename)
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": CHECKPOINT_VERSION, "state": state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, filename)
+
+
+def append_checkpoint_rows(filename: str, rows: dict):
+    """
+    Append rows of the trajectory (e.g. the angles, gradients and energies of the steps since the last checkpoint)
+    to the rows file of a checkpoint.
+
+    Parameters
+    ----------
+    filename: str:
+        the checkpoint file (the rows are appended to filename.rows)
+    rows: dict:
+        name of the trajectory -> array with the new rows
+    """
+    with open("{}.rows".format(filename), "ab") as f:
+        pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_checkpoint(filename: str) -> dict:
+    """
+    Read an optimizer state written by write_checkpoint.
+    The trajectories are read from the rows file and cut to the lengths recorded in the state
+    (field "lengths"), rows appended after the last complete state are ignored.
+
+    Parameters
+    ----------
+    filename: str:
+        the checkpoint file
+
+    Returns
+    -------
+    dict:
+        the state of the optimizer
+    """
+    with open(filename, "rb") as f:
+        data = pickle.load(f)
+    if not isinstance(data, dict) or data.get("version", None) != CHECKPOINT_VERSION:
+        raise TequilaOptimizerException("{} is not a checkpoint of this tequila version".format(filename))
+    state = data["state"]
+    lengths = state.get("lengths", {})
+    rows = {name: [] for name in lengths}
+    if len(lengths) > 0:
+        with open("{}.rows".format(filename), "rb") as f:
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError):
+                    # end of file or a chunk that was cut by an interruption
+                    break
+                for name, value in chunk.items():
+                    if name in rows:
+                        rows[name].append(value)
+    for name, length in lengths.items():
+        value = numpy.concatenate(rows[name]) if len(rows[name]) > 0 else numpy.empty(shape=[0])
+        if len(value) < length:
+            raise TequilaOptimizerException(
+                "checkpoint {} holds {} rows of {}, expected {}".format(filename, len(value), name, length))
+        state[name] = value[:length]
+    return state
+
+
+class _CheckpointWriter:
+    """
+    Writes checkpoints in a background thread.
+
+    Should not be used outside of optimizers.
+    The rows of the trajectories are submitted incrementally, only the rows added since the last
+    submission, and are appended to the rows file. All submitted rows are written.
+    If states are submitted faster than they can be written, only the most recent state is written.
+
+    Attributes
+    ----------
+    filename:
+        the checkpoint file.
+    writes:
+        number of checkpoints written so far.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.writes = 0
+        self._pending = None
+        self._rows = []
+        self._closed = False
+        self._error = None
+        # a new checkpoint starts with an empty rows file
+        open("{}.rows".format(filename), "wb").close()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, state: dict, rows: dict = None):
+        """
+        queue a state for writing; the state and rows must not be modified afterwards
+
+        Parameters
+        ----------
+        state: dict:
+            the state of the optimizer, field "lengths" holds the total number of rows of each trajectory
+        rows: dict, optional:
+            name of the trajectory -> array with the rows added since the last submission
+        """
+        with self._condition:
+            if rows is not None:
+                self._rows.append(rows)
+            self._pending = state
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                state = self._pending
+                rows = self._rows
+                self._pending = None
+                self._rows = []
+            try:
+                # rows first: a state never refers to rows that are not written yet
+                for chunk in rows:
+                    append_checkpoint_rows(self.filename, chunk)
+                write_checkpoint(self.filename, state)
+                self.writes += 1
+            except Exception as error:
+                self._error = error
+
+    def close(self):
+        """ write the pending state and stop the background thread """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        if self._error is not None:
+            warnings.warn("writing checkpoint {} failed: {}".format(self.filename, self._error), TequilaWarning)
+
+
+class _VectorFuture:
+    """
+    Combines the futures of the components of a vector.
+
+    Should not be used outside of optimizers.
+    """
+
+    def __init__(self, futures: list):
+        self.futures = futures
+
+    def result(self) -> numpy.ndarray:
+        return numpy.asarray([f.result() if hasattr(f, "result") else f for f in self.futures], dtype=float)
+
+    def cancel(self):
+        for f in self.futures:
+            if hasattr(f, "cancel"):
+                f.cancel()
+
+
+class _AsyncEvaluator:
+    """
+    Submits evaluations of compiled objectives (and of the components of gradients) to an executor,
+    so that they can run while the optimizer does other work.
+
+    Should not be used outside of optimizers.
+
+    Attributes
+    ----------
+    executor:
+        the executor (anything with a concurrent.futures like submit function).
+    """
+
+    def __init__(self, pipeline: typing.Union[bool, int, typing.Any] = True):
+        """
+        Parameters
+        ----------
+        pipeline:
+            True: use a thread pool with the default number of workers,
+            int: use a thread pool with that many workers,
+            otherwise an executor (e.g. concurrent.futures.ProcessPoolExecutor) which is used as is.
+        """
+        self._owned = not hasattr(pipeline, "submit")
+        if self._owned:
+            max_workers = None if pipeline is True else int(pipeline)
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            self.executor = pipeline
+
+    def submit(self, function, variables, *args, **kwargs):
+        """ evaluate function(variables, *args, **kwargs) in the background """
+        return self.executor.submit(function, variables, *args, **kwargs)
+
+    def submit_vector(self, functions: list, variables, *args, **kwargs) -> _VectorFuture:
+        """ evaluate all components of a vector (callables or numbers) in the background """
+        return _VectorFuture([self.executor.submit(f, variables, *args, **kwargs) if callable(f) else f
+                              for f in functions])
+
+    def close(self):
+        """ shut down the executor, if it was created here """
+        if self._owned:
+            self.executor.shutdown(wait=True)
+
+
 class Optimizer:
 
     """
@@ -248,6 +526,8 @@ class Optimizer:
         whether or not to save history.
     history:
         a history object, saving information during optimization.
+    pipeline:
+        instruction for background evaluation of gradients (None: sequential evaluation).
     noise:
         what noise (e.g, a NoiseModel) to apply to simulations during optimization.
     device:
@@ -275,7 +555,9 @@ class Optimizer:
                  noise=None,
                  save_history: bool = True,
                  silent: typing.Union[bool, int] = False,
-                 print_level: int = 99, *args, **kwargs):
+                 print_level: int = 99,
+                 history_options: dict = None,
+                 pipeline=None, *args, **kwargs):
 
         """
         initialize an optimizer.
@@ -304,6 +586,14 @@ class Optimizer:
             False indicates verbosity.
         print_level: int: Default = 99:
             The degree of verbosity during print. Meaningless on in base.
+        history_options: dict, optional:
+            bounded memory storage of the history, passed to OptimizerHistory
+            e.g. {"max_length": 1000, "decimation": 10, "spill": "history_directory"}
+            Default: keep the full history in memory.
+        pipeline: optional:
+            evaluate gradients in the background while the energy is evaluated (if supported by the optimizer).
+            True or an int (number of threads) for a thread pool, or any concurrent.futures executor.
+            Default: evaluate everything sequentially.
         args
         kwargs
         """
@@ -332,13 +622,15 @@ class Optimizer:
 
         self.samples = samples
         self.save_history = save_history
+        self.history_options = {} if history_options is None else history_options
         if save_history:
-            self.history = OptimizerHistory()
+            self.history = OptimizerHistory(**self.history_options)
         else:
             self.history = None
 
         self.noise = noise
         self.device = device
+        self.pipeline = pipeline
         self.args = args
         self.kwargs = kwargs
 
@@ -350,7 +642,7 @@ class Optimizer:
         -------
         None
         """
-        self.history = OptimizerHistory()
+        self.history = OptimizerHistory(**self.history_options)
 
     def __call__(self, objective: Objective,
                  variables: typing.List[Variable],
@@ -528,10 +820,15 @@ class Optimizer:
                         grad_obj: typing.Dict[Variable, Objective],
                         comp_grad_obj: typing.Dict[Variable, Objective],
                         hessian: dict = None,
+                        objective: Objective = None,
                         *args,
                         **kwargs) -> tuple:
         """
         convenience function to compile hessians for optimizers which require it.
+
+        With the objective given, analytical hessians are assembled by _ShiftHessian from the deduplicated
+        doubly shifted circuits, otherwise every entry is compiled from the gradient objectives.
+
         Parameters
         ----------
         variables:
@@ -542,6 +839,10 @@ class Optimizer:
             the compiled gradient object, used for further compilation of the hessian.
         hessian: optional:
             extra information to modulate compilation of the hessian.
+            A dictionary with the key 'mode' selects the analytical hessian mode:
+            {'mode': 'full'}, {'mode': 'diagonal'} or {'mode': 'lowrank', 'rank': int}, see _ShiftHessian.
+        objective: Objective, optional:
+            the objective itself, needed for the shift rule hessian.
         args
         kwargs
 
@@ -553,7 +854,21 @@ class Optimizer:
         dO = grad_obj
         cdO = comp_grad_obj
 
-        if hessian is None:
+        if hessian is None and objective is not None:
+            hessian = {"mode": "full"}
+
+        if isinstance(hessian, dict) and "mode" in hessian:
+            if objective is None:
+                raise TequilaOptimizerException("hessian mode {} needs the objective".format(hessian["mode"]))
+            evaluator = None
+            if self.pipeline:
+                evaluator = _AsyncEvaluator(self.pipeline)
+            ddO = None
+            compiled_hessian = _ShiftHessian(objective=objective, variables=variables,
+                                             compile_objective=self.compile_objective, evaluator=evaluator,
+                                             mode=hessian["mode"], rank=hessian.get("rank", None))
+
+        elif hessian is None:
             if dO is None:
                 raise TequilaOptimizerException("Can not combine analytical Hessian with numerical Gradient\n"
                                                 "hessian instruction was: {}".format(hessian))
@@ -679,7 +994,8 @@ class _NumGrad:
         left[key] += step / 2
         right = copy.deepcopy(vars)
         right[key] -= step / 2
-        return 1.0 / step * (obj(left, *args, **kwargs) - obj(right, *args, **kwargs))
+        fleft, fright = _sweep_objective(obj, [left, right], *args, **kwargs)
+        return 1.0 / step * (fleft - fright)
 
     @staticmethod
     def forward_two_point_stencil(obj, vars, key, step, *args, **kwargs):
@@ -708,7 +1024,8 @@ class _NumGrad:
         left = copy.deepcopy(vars)
         left[key] += step
         right = copy.deepcopy(vars)
-        return 1.0 / step * (obj(left, *args, **kwargs) - obj(right, *args, **kwargs))
+        fleft, fright = _sweep_objective(obj, [left, right], *args, **kwargs)
+        return 1.0 / step * (fleft - fright)
 
     @staticmethod
     def backward_two_point_stencil(obj, vars, key, step, *args, **kwargs):
@@ -736,7 +1053,8 @@ class _NumGrad:
         left = copy.deepcopy(vars)
         right = copy.deepcopy(vars)
         right[key] -= step
-        return 1.0 / step * (obj(left, *args, **kwargs) - obj(right, *args, **kwargs))
+        fleft, fright = _sweep_objective(obj, [left, right], *args, **kwargs)
+        return 1.0 / step * (fleft - fright)
 
     def __call__(self, variables, *args, **kwargs):
         """
@@ -786,10 +1104,20 @@ class _SPSAGrad(_NumGrad):
         the variables with respect to which the gradient is taken.
     stepsize:
         the size of the small constant for shifting.
+    perturbations:
+        number of random perturbation vectors averaged in each gradient estimate.
+    generator:
+        the numpy random generator the perturbations are drawn from.
+    second_order:
+        if True the gradient is preconditioned by the running average of the 2-SPSA hessian estimates.
+    hessian:
+        the current running average of the hessian estimates (only for second_order).
 
     """
 
-    def __init__(self, objective, variables, stepsize, gamma=None,method=None):
+    def __init__(self, objective, variables, stepsize, gamma=None, method=None,
+                 perturbations: int = 1, seed=None, second_order: bool = False, hessian_stepsize=None,
+                 regularization: float = 1.e-3, executor=None):
         """
 
         Parameters
@@ -800,9 +1128,26 @@ class _SPSAGrad(_NumGrad):
             the variables the gradient of objective with respect to which is taken.
         stepsize:
             the small shift by which to displace variable around a point.
-        nextIndex:
-            Integer indicating the next index of the list stepsize to use
-            if(nextIndex == -1) stepsize is a float
+        gamma: optional:
+            the stepsize is adjusted in each iteration as stepsize / (iteration ** gamma)
+        method: optional:
+            callable replacing standard_spsa, called as method(objective, variables, keys, stepsize, ...)
+        perturbations: int: Default = 1:
+            number of random perturbation vectors per gradient estimate, the estimates are averaged.
+        seed: optional:
+            seed (or numpy.random.Generator) for the perturbations, makes the optimization reproducible.
+        second_order: bool: Default = False:
+            use second order SPSA (2-SPSA): estimate the hessian from two additional evaluations per
+            perturbation and return the gradient preconditioned with the averaged hessian.
+        hessian_stepsize: optional:
+            stepsize of the additional perturbation for the hessian estimate. Default: same as stepsize.
+        regularization: float: Default = 1.e-3:
+            added to the absolute eigenvalues of the averaged hessian before inverting it.
+        executor: optional:
+            any object with a map function (e.g. a concurrent.futures executor or a multiprocessing pool)
+            used to evaluate all shifted points of one step. Default: evaluate them one after the other.
+            A compiled objective can not be evaluated by several threads at once: with a thread pool
+            every shifted point is evaluated on its own deep copy of the objective (kept for the next steps).
         """
         self.objective = objective
         self.variables = variables
@@ -820,17 +1165,83 @@ class _SPSAGrad(_NumGrad):
         else:
             self.method = method
 
-    @staticmethod
-    def standard_spsa(obj, vars, keys, step, *args, **kwargs):
+        if perturbations < 1:
+            raise TequilaOptimizerException("SPSA needs at least one perturbation per step, got {}".format(perturbations))
+        self.perturbations = int(perturbations)
+        self.generator = numpy.random.default_rng(seed)
+        self.second_order = second_order
+        self.hessian_stepsize = hessian_stepsize
+        self.regularization = regularization
+        self.executor = executor
+        self.hessian = None
+        self.hessian_samples = 0
+        self._replicas = []
+
+    def draw_perturbations(self, dim: int, k: int = None) -> numpy.ndarray:
+        """
+        Draw k random perturbation vectors with entries +1 or -1
+
+        Returns
+        -------
+        numpy.ndarray:
+            array of shape (k, dim)
+        """
+        if k is None:
+            k = self.perturbations
+        return self.generator.choice(numpy.array([-1.0, 1.0]), size=(k, dim))
+
+    def evaluate_points(self, obj, vars, keys, points: numpy.ndarray, *args, **kwargs) -> numpy.ndarray:
+        """
+        Evaluate the objective at all given points with one call to the executor
+        (or with one parameter sweep per expectationvalue, see _sweep_objective)
+
+        Parameters
+        ----------
+        obj:
+            objective to call.
+        vars:
+            variables to feed to the objective, the entries of keys are replaced by the points.
+        keys:
+            the variables corresponding to the columns of points.
+        points: numpy.ndarray:
+            array of shape (n_points, len(keys))
+
+        Returns
+        -------
+        numpy.ndarray:
+            the objective values at the points
+        """
+        shifted = [{**vars, **dict(zip(keys, point.tolist()))} for point in points]
+        if self.executor is None:
+            values = _sweep_objective(obj, shifted, *args, **kwargs)
+        elif isinstance(self.executor, (concurrent.futures.ThreadPoolExecutor, multiprocessing.pool.ThreadPool)):
+            pairs = zip(self.replicas(obj, len(shifted)), shifted)
+            values = list(self.executor.map(lambda pair: pair[0](pair[1], *args, **kwargs), pairs))
+        else:
+            values = list(self.executor.map(functools.partial(_call_objective, obj, args, kwargs), shifted))
+        return numpy.asarray(values, dtype=float).reshape([len(shifted)])
+
+    def replicas(self, obj, n: int) -> list:
         """
-        calculate objective gradient using standar spsa.
+        obj and n - 1 deep copies of it, which can be evaluated by different threads at the same time
+        """
+        if len(self._replicas) == 0 or self._replicas[0] is not obj:
+            self._replicas = [obj]
+        while len(self._replicas) < n:
+            self._replicas.append(copy.deepcopy(obj))
+        return self._replicas[:n]
+
+    def standard_spsa(self, obj, vars, keys, step, *args, **kwargs):
+        """
+        calculate objective gradient using standard spsa,
+        averaged over self.perturbations random perturbations.
         Parameters
         ----------
         obj: Objective:
             objective to call.
         vars:
             variables to feed to the objective.
-        key:
+        keys:
             which variables to shift, i.e, which variable's gradient is being called.
         step:
             the size of the shift; a small float.
@@ -839,23 +1250,53 @@ class _SPSAGrad(_NumGrad):
 
         Returns
         -------
-        the approximated gradient of obj w.r.t var at point vars as a float.
+        numpy.ndarray:
+            the approximated gradient of obj w.r.t the keys at point vars.
 
         """
         dim = len(keys)
-        perturbation_vector = choices([-1,1],k = dim)
-        left = copy.deepcopy(vars)
-        right = copy.deepcopy(vars)
-        for i, key in enumerate(keys):
-            left[key] += perturbation_vector[i] * step
-            right[key] -= perturbation_vector[i] * step
-        numerator = obj(left, *args, **kwargs) - obj(right, *args, **kwargs)
-        gradient = list()
-        for i in range(dim):
-            gradientComponent = numerator / (2 * step * perturbation_vector[i])
-            gradient.append(gradientComponent)
+        x = numpy.asarray([vars[k] for k in keys], dtype=float)
+        deltas = self.draw_perturbations(dim)
+        points = [x + step * deltas, x - step * deltas]
+        if self.second_order:
+            hstep = step if self.hessian_stepsize is None else self.hessian_stepsize
+            hdeltas = self.draw_perturbations(dim)
+            points += [x + step * deltas + hstep * hdeltas, x - step * deltas + hstep * hdeltas]
+
+        values = self.evaluate_points(obj, vars, keys, numpy.concatenate(points), *args, **kwargs)
+        values = values.reshape([len(points), self.perturbations])
+
+        # entries of the perturbations are +-1, so dividing by them is multiplying
+        gradient = numpy.mean(((values[0] - values[1]) / (2 * step))[:, None] * deltas, axis=0)
+
+        if self.second_order:
+            df = (values[2] - values[0]) - (values[3] - values[1])
+            hessian = numpy.zeros(shape=[dim, dim])
+            for i in range(self.perturbations):
+                outer = numpy.outer(hdeltas[i], deltas[i])
+                hessian += df[i] / (4 * step * hstep) * (outer + outer.T)
+            hessian /= self.perturbations
+            gradient = self.precondition(gradient, hessian)
+
         return gradient
 
+    def precondition(self, gradient: numpy.ndarray, hessian: numpy.ndarray) -> numpy.ndarray:
+        """
+        Add a hessian estimate to the running average and return the preconditioned gradient
+
+        The averaged hessian is made positive definite by taking the absolute value of its eigenvalues
+        (plus self.regularization) before it is inverted.
+        """
+        if self.hessian is None:
+            self.hessian = hessian
+        else:
+            n = self.hessian_samples
+            self.hessian = n / (n + 1) * self.hessian + 1.0 / (n + 1) * hessian
+        self.hessian_samples += 1
+        eigenvalues, eigenvectors = numpy.linalg.eigh(self.hessian)
+        eigenvalues = numpy.abs(eigenvalues) + self.regularization
+        return eigenvectors.dot(eigenvectors.T.dot(gradient) / eigenvalues)
+
     def __call__(self, variables, iteration=1, *args, **kwargs):
         """
         convenience function to call self.method, e.g one of the staticmethods of this class.
@@ -902,21 +1343,55 @@ class _SPSAGrad(_NumGrad):
         type:
             float: the learning rate calibrated
         """
-        dim = len(initial_value)
-        delta = 0
         if(self.nextIndex != -1 and self.nextIndex != "adjust"):
             stepsize = self.stepsize[0]
         else:
             stepsize = self.stepsize
- 
-        for i in range(max_iter):
-            perturbation_vector = choices([-1,1],k = dim)
-            left = copy.deepcopy(initial_value)
-            right = copy.deepcopy(initial_value)
-            for j, v in enumerate(initial_value):
-                left[v] += perturbation_vector[j] * stepsize
-                right[v] -= perturbation_vector[j] * stepsize
-            numeratorLeft = self.objective(left, *args, **kwargs) 
-            numeratorRight = self.objective(right, *args, **kwargs)
-            delta += numpy.absolute(numeratorRight - numeratorLeft) / max_iter
-        return lr * 2 * stepsize / delta 
+
+        keys = [k for k in self.variables if k in initial_value]
+        x = numpy.asarray([initial_value[k] for k in keys], dtype=float)
+        deltas = self.draw_perturbations(len(keys), max_iter)
+        values = self.evaluate_points(self.objective, initial_value, keys,
+                                      numpy.concatenate([x + stepsize * deltas, x - stepsize * deltas]),
+                                      *args, **kwargs)
+        delta = numpy.mean(numpy.absolute(values[max_iter:] - values[:max_iter]))
+        return lr * 2 * stepsize / delta
+
+
+def _call_objective(objective, args, kwargs, variables):
+    # module level, so that executors based on processes can pickle it
+    return objective(variables, *args, **kwargs)
+
+
+def _sweep_objective(objective, points: list, *args, **kwargs) -> list:
+    """
+    Evaluate a compiled objective at several points.
+    Every expectationvalue is evaluated at all points with one call of its sweep method,
+    so that backends supporting parameter sweeps execute each circuit only once.
+    Objectives with other arguments (and other callables) are evaluated point by point.
+    """
+    objective_args = getattr(objective, "args", None)
+    if objective_args is None or not all(isinstance(arg, (BackendExpectationValue, Variable, FixedVariable))
+                                         for arg in objective_args):
+        return [objective(p, *args, **kwargs) for p in points]
+
+    points = [format_variable_dictionary(p) for p in points]
+    evaluated = {}
+    for arg in objective_args:
+        if arg in evaluated:
+            continue
+        if isinstance(arg, BackendExpectationValue):
+            evaluated[arg] = arg.sweep(variables=points, *args, **kwargs)
+        else:
+            evaluated[arg] = [arg(p) for p in points]
+
+    values = []
+    for i in range(len(points)):
+        result = numpy.asarray(objective.transformation(*[evaluated[arg][i] for arg in objective_args]))
+        if result.shape == ():
+            values.append(result.item())
+        elif len(result) == 1:
+            values.append(result[0])
+        else:
+            values.append(result)
+    return values
@@ -1,9 +1,12 @@
-import numpy, typing, numbers
+import numpy, typing, numbers, copy, time, collections
 from tequila.objective import Objective
 from tequila.objective.objective import Variable, format_variable_dictionary
-from .optimizer_base import Optimizer, OptimizerResults, dataclass
+from .optimizer_base import Optimizer, OptimizerResults, TequilaOptimizerException, dataclass, \
+    _CheckpointWriter, read_checkpoint, _AsyncEvaluator, _NumGrad
+from ._history import HistoryTrace
 from tequila.circuit.noise import NoiseModel
 from tequila.tools.qng import get_qng_combos, CallableVector, QNGVector
+from .qng_statevector import statevector_block
 from tequila.utils import TequilaException
 
 @dataclass
@@ -34,8 +37,8 @@ class OptimizerGD(Optimizer):
         dictionary mapping object ids as strings to said object's current stored moments; a pair of lists of floats,
         namely running tallies of gradient momenta. said momenta are used to SCALE or REDIRECT gradient descent steps.
     moments_trajectory:
-        dictionary mapping object ids as strings to said object's momenta at ALL steps; that is, a list of all
-        the moments of a given object, in order.
+        dictionary mapping object ids as strings to said object's momenta at the steps, in order.
+        Only the most recent max_length moments are kept if a max_length is set for the history.
     step_lookup:
         dictionary mapping object ids as strings to an int; how many optimization steps have been performed for
         a given object. Relevant only to the Adam optimizer.
@@ -94,7 +97,7 @@ class OptimizerGD(Optimizer):
     @classmethod
     def available_diis(cls):
         """:return: All tested methods that can be diis accelerated"""
-        return ['sgd']
+        return cls.available_methods()
 
     def __init__(self, maxiter=100,
                  method='sgd',
@@ -188,7 +191,9 @@ class OptimizerGD(Optimizer):
 
         self.f = method_dict[method.lower()]
         self.gradient_lookup = {}
+        self.component_lookup = {}
         self.active_key_lookup = {}
+        self.layout_lookup = {}
         self.moments_lookup = {}
         self.moments_trajectory = {}
         self.step_lookup = {}
@@ -239,6 +244,9 @@ class OptimizerGD(Optimizer):
                  reset_history: bool = True,
                  method_options: dict = None,
                  gradient=None,
+                 checkpoint: str = None,
+                 checkpoint_every: int = 1,
+                 resume_from: str = None,
                  *args, **kwargs) -> GDResults:
 
         """
@@ -263,7 +271,16 @@ class OptimizerGD(Optimizer):
             dummy keyword to play well with tq.minimize. Does nothing.
         gradient: optional:
             how to calculate gradients. if str '2-point', will use 2-point numerical gradients;
-            if str 'qng' will use the default qng optimizer. Other more complex options possible.
+            if str 'qng' will use the default qng optimizer, 'qng-statevector' computes the metric blocks
+            from one statevector simulation per layer. Other more complex options possible.
+        checkpoint: str, optional:
+            file to which the state of the optimizer is written every checkpoint_every iterations.
+            The files are written in a background thread.
+        checkpoint_every: int: Default = 1:
+            number of iterations between two checkpoints.
+        resume_from: str, optional:
+            checkpoint file of an interrupted run of the same objective and method to continue from.
+            The initial_values are ignored in that case.
         args
         kwargs
 
@@ -289,67 +306,251 @@ class OptimizerGD(Optimizer):
             maxiter = self.maxiter
 
         ### the actual algorithm acts here:
-        e = comp(v, samples=self.samples)
-        self.history.energies.append(e)
-        self.history.angles.append(v)
-        best = e
-        best_angles = v
-        v = self.step(comp, v)
-        last = e
+        # internally the active parameters are a flat vector with the fixed layout of the prepared objective
+        # dictionaries are only built to evaluate the objective and for the history
+        layout = self.layout_lookup[id(comp)]
+        x = layout.to_vector(active_angles)
+        # angles and gradients go to the history as soon as they are known, no trajectory is kept here
+        n_angles = 0
+        n_gradients = 0
+
+        # the checkpoint to resume from is read first, it may be the file that is written again
+        restored = None
+        if resume_from is not None:
+            restored = read_checkpoint(resume_from)
+
+        # checkpoints only hold the optimizer state, the trajectories are appended
+        # incrementally: pending holds the rows since the last checkpoint
+        writer = None
+        pending = None
+        if checkpoint is not None:
+            writer = _CheckpointWriter(filename=checkpoint)
+            pending = {"angles": [], "gradients": [], "energies": []}
+
+        # with a pipeline, the gradient for the next step is evaluated in the background
+        # while the energy is evaluated in the foreground
+        evaluator = None
+        prefetched = None
+        if self.pipeline:
+            evaluator = _AsyncEvaluator(self.pipeline)
 
-        if not self.silent:
-            print("iter.        <O>          Δ<O>      max(d<O>)   rms(d<O>)")
-
-        for step in range(1, maxiter):
-            comment = ""
-            e = comp(v, samples=self.samples)
-            self.history.energies.append(e)
-            self.history.angles.append(v)
-            ### saving best performance
-            if e < best:
+        try:
+            if resume_from is None:
+                if evaluator is not None:
+                    prefetched = self._prefetch(evaluator, id(comp), x, passive_angles)
+                e = comp(v, samples=self.samples)
+                self.history.energies.append(e)
+                self._append_rows(self.history.angles, layout, x, base=passive_angles)
+                n_angles += 1
+                if pending is not None:
+                    pending["energies"].append(e)
+                    pending["angles"].append(x)
                 best = e
-                best_angles = v
+                best_x = x
+                x, grads = self._vector_step(id(comp), x, passive_angles, prefetched=prefetched)
+                if self.save_history:
+                    self._append_rows(self.history.gradients, layout, grads)
+                n_gradients += 1
+                if pending is not None:
+                    pending["gradients"].append(grads)
+                last = e
+                start = 1
+            else:
+                state = restored
+                self._restore_state(id(comp), state)
+                x, best, best_x, last, start = state["x"], state["best"], state["best_x"], state["last"], state["step"]
+                n_angles = len(state["angles"])
+                n_gradients = len(state["gradients"])
+                if max(n_angles, n_gradients) > maxiter:
+                    raise TequilaOptimizerException(
+                        "checkpoint {} holds {} iterations, more than maxiter={}".format(resume_from, n_angles, maxiter))
+                self.history.energies += list(state["energies"])
+                self._append_rows(self.history.angles, layout, state["angles"], base=passive_angles)
+                if self.save_history:
+                    self._append_rows(self.history.gradients, layout, state["gradients"])
+                if pending is not None:
+                    # the new checkpoint starts with the restored trajectories
+                    pending["energies"] += list(state["energies"])
+                    pending["angles"] += list(state["angles"])
+                    pending["gradients"] += list(state["gradients"])
 
-            if self.tol != None:
-                if numpy.abs(e - last) <= self.tol:
-                    if not self.silent:
-                        print('delta f smaller than tolerance {}. Stopping optimization.'.format(str(self.tol)))
-                    break
+            if not self.silent:
+                print("iter.        <O>          Δ<O>      max(d<O>)   rms(d<O>)")
+
+            for step in range(start, maxiter):
+                comment = ""
+                if evaluator is not None:
+                    prefetched = self._prefetch(evaluator, id(comp), x, passive_angles)
+                e = comp(layout.to_dict(x, passive_angles), samples=self.samples)
+                self.history.energies.append(e)
+                self._append_rows(self.history.angles, layout, x, base=passive_angles)
+                n_angles += 1
+                if pending is not None:
+                    pending["energies"].append(e)
+                    pending["angles"].append(x)
+                ### saving best performance
+                if e < best:
+                    best = e
+                    best_x = x
+
+                if self.tol != None:
+                    if numpy.abs(e - last) <= self.tol:
+                        if not self.silent:
+                            print('delta f smaller than tolerance {}. Stopping optimization.'.format(str(self.tol)))
+                        if prefetched is not None:
+                            prefetched[1].cancel()
+                        break
+
+                ### get new parameters with self.step!
+                xn, grads = self._vector_step(id(comp), x, passive_angles, prefetched=prefetched)
+                if self.save_history:
+                    self._append_rows(self.history.gradients, layout, grads)
+                n_gradients += 1
+                if pending is not None:
+                    pending["gradients"].append(grads)
+
+                # From http://vergil.chemistry.gatech.edu/notes/diis/node3.html
+                if self.__diis:
+                    self.__diis.push(xn, xn - x)
+
+                    new = self.__diis.update()
+                    if new is not None:
+                        self.reset_momenta()
+                        comment = "DIIS"
+                        xn = numpy.asarray(new, dtype=float)
+
+                if not self.silent:
+                    print("%3i   %+15.8f   %+7.2e   %7.3e   %7.3e    %s"
+                          % (step,
+                             e,
+                             e-last,
+                             numpy.max(numpy.abs(self.__dx)),
+                             numpy.sqrt(numpy.average(self.__dx**2)),
+                             comment))
+
+                last = e
+                x = xn
+                self.iteration += 1
+
+                if writer is not None and step % checkpoint_every == 0:
+                    # only the rows since the last checkpoint and copies of the optimizer state are taken here,
+                    # serialization and writing happen in the background
+                    state = self._collect_state(id(comp))
+                    lengths = {"angles": n_angles, "gradients": n_gradients,
+                               "energies": n_angles}
+                    state.update(step=step + 1, x=x, best=best, best_x=best_x, last=last, lengths=lengths)
+                    rows = {"angles": numpy.asarray(pending["angles"], dtype=float).reshape([-1, layout.size]),
+                            "gradients": numpy.asarray(pending["gradients"], dtype=float).reshape([-1, layout.size]),
+                            "energies": numpy.asarray(pending["energies"], dtype=float)}
+                    pending = {"angles": [], "gradients": [], "energies": []}
+                    writer.submit(state, rows=rows)
+        finally:
+            if evaluator is not None:
+                evaluator.close()
+            if writer is not None:
+                writer.close()
+            if self.save_history:
+                self.history.flush()
+
+        E_final, angles_final = best, layout.to_dict(best_x, passive_angles)
+        return GDResults(energy=E_final, variables=format_variable_dictionary(angles_final), history=self.history,
+                            moments=list(self.moments_trajectory[id(comp)]), num_iteration=self.iteration)
 
-            ### get new parameters with self.step!
-            vn = self.step(comp, v)
+    @staticmethod
+    def _append_rows(series: typing.Union[list, HistoryTrace], layout: '_ParameterLayout', rows: numpy.ndarray,
+                     base: dict = None):
+        """
+        append parameter vectors to a history series, as dictionaries or, for a HistoryTrace, as rows.
+        Parameters
+        ----------
+        series:
+            the history series (e.g. self.history.angles).
+        layout: _ParameterLayout:
+            the layout of the vectors.
+        rows: numpy.ndarray:
+            one vector or an array with one vector per row.
+        base: dict, optional:
+            values of further keys, equal for all entries (e.g. the passive angles).
 
-            # From http://vergil.chemistry.gatech.edu/notes/diis/node3.html
-            if self.__diis:
-                self.__diis.push(
-                    numpy.array([vn[k] for k in active_angles]),
-                    numpy.array([vn[k]-v[k] for k in active_angles]))
+        Returns
+        -------
+        None
+        """
+        rows = numpy.asarray(rows, dtype=float)
+        if rows.ndim == 1:
+            rows = rows[None, :]
+        if isinstance(series, HistoryTrace):
+            series.extend_rows(layout.keys, rows, base=base)
+        else:
+            series += [layout.to_dict(row, base) for row in rows]
 
-                new = self.__diis.update()
-                if new is not None:
-                    self.reset_momenta()
-                    comment = "DIIS"
-                    for i,k in enumerate(active_angles):
-                        vn[k] = new[i]
+    def _collect_state(self, s) -> dict:
+        """
+        copy of the internal state of the optimizer for the prepared objective with id s.
+        Parameters
+        ----------
+        s:
+            id of the compiled objective (as registered by prepare).
 
+        Returns
+        -------
+        dict
+            the state, as written to checkpoint files
+        """
+        gradient = self.gradient_lookup[s]
+        state = {"method": self.f.__name__,
+                 "keys": list(self.layout_lookup[s].keys),
+                 "moments": tuple(numpy.array(m, copy=True) for m in self.moments_lookup[s]),
+                 "adam_step": self.step_lookup[s],
+                 "iteration": self.iteration,
+                 "lr": copy.deepcopy(self.lr),
+                 "lr_index": self.nextLRIndex,
+                 "diis": None,
+                 "spsa": None}
+        if self.__diis:
+            state["diis"] = self.__diis.get_state()
+        if hasattr(gradient, "generator"):
+            state["spsa"] = {"rng": copy.deepcopy(gradient.generator.bit_generator.state),
+                             "index": gradient.nextIndex,
+                             "hessian": None if gradient.hessian is None else numpy.array(gradient.hessian, copy=True),
+                             "hessian_samples": gradient.hessian_samples}
+        return state
+
+    def _restore_state(self, s, state: dict):
+        """
+        restore the internal state of the optimizer for the prepared objective with id s.
+        Parameters
+        ----------
+        s:
+            id of the compiled objective (as registered by prepare).
+        state: dict:
+            a state as returned by _collect_state.
 
-            if not self.silent:
-                self.__dx = numpy.asarray(self.__dx)
-                print("%3i   %+15.8f   %+7.2e   %7.3e   %7.3e    %s"
-                      % (step,
-                         e,
-                         e-last,
-                         numpy.max([abs(x) for x in self.__dx]),
-                         numpy.sqrt(numpy.average(self.__dx**2)),
-                         comment))
-
-
-            last = e
-            v = vn
-            self.iteration += 1
-        E_final, angles_final = best, best_angles
-        return GDResults(energy=E_final, variables=format_variable_dictionary(angles_final), history=self.history,
-                            moments=self.moments_trajectory[id(comp)], num_iteration=self.iteration)
+        Returns
+        -------
+        None
+        """
+        if state["method"] != self.f.__name__:
+            raise TequilaOptimizerException(
+                "checkpoint was written by method {}, can not resume with {}".format(state["method"], self.f.__name__))
+        if state["keys"] != list(self.layout_lookup[s].keys):
+            raise TequilaOptimizerException(
+                "checkpoint was written for variables {}, objective has {}".format(state["keys"],
+                                                                                  self.layout_lookup[s].keys))
+        self.moments_lookup[s] = state["moments"]
+        self.moments_trajectory[s] = self._new_moments_trajectory(state["moments"])
+        self.step_lookup[s] = state["adam_step"]
+        self.iteration = state["iteration"]
+        self.lr = state["lr"]
+        self.nextLRIndex = state["lr_index"]
+        if self.__diis and state["diis"] is not None:
+            self.__diis.restore(state["diis"])
+        gradient = self.gradient_lookup[s]
+        if state["spsa"] is not None and hasattr(gradient, "generator"):
+            gradient.generator.bit_generator.state = state["spsa"]["rng"]
+            gradient.nextIndex = state["spsa"]["index"]
+            gradient.hessian = state["spsa"]["hessian"]
+            gradient.hessian_samples = state["spsa"]["hessian_samples"]
 
     def prepare(self, objective: Objective, initial_values: dict = None,
                 variables: list = None, gradient=None):
@@ -387,10 +588,18 @@ class OptimizerGD(Optimizer):
                     break
 
         if(self.f == self._spsa):
-            gradient = {"method": "standard_spsa", "stepsize": self.c, "gamma": self.gamma}
+            # further spsa options (perturbations, seed, second_order, ...) can be given as gradient dictionary
+            spsa_options = {}
+            if isinstance(gradient, dict):
+                spsa_options = {k: v for k, v in gradient.items() if k != "method"}
+            gradient = {"method": "standard_spsa", "stepsize": self.c, "gamma": self.gamma, **spsa_options}
 
         compile_gradient = True
         dE = None
+        components = None
+        if isinstance(gradient, str) and gradient.lower() == 'qng-statevector':
+            # metric blocks from one statevector simulation per layer
+            gradient = {"method": "qng", "function": statevector_block}
         if isinstance(gradient, str):
             if gradient.lower() == 'qng':
                 compile_gradient = False
@@ -420,7 +629,11 @@ class OptimizerGD(Optimizer):
                 if(self.calibrate_lr):
                     self.lr = dE.calibrated_lr(self.lr,initial_values, 50, samples=self.samples)
             else:
-                dE = CallableVector([comp_grad_obj[k] for k in comp_grad_obj.keys()])
+                components = [comp_grad_obj[k] for k in comp_grad_obj.keys()]
+                dE = CallableVector(components)
+                # numerical gradients share one compiled objective and can not be evaluated concurrently
+                if any(isinstance(x, _NumGrad) for x in components):
+                    components = None
 
         ostring = id(comp)
         if not self.silent:
@@ -438,9 +651,11 @@ class OptimizerGD(Optimizer):
         second = numpy.zeros(vec_len)
 
         self.gradient_lookup[ostring] = dE
+        self.component_lookup[ostring] = components
         self.active_key_lookup[ostring] = active_angles.keys()
+        self.layout_lookup[ostring] = _ParameterLayout(keys=active_angles.keys())
         self.moments_lookup[ostring] = (first, second)
-        self.moments_trajectory[ostring] = [(first, second)]
+        self.moments_trajectory[ostring] = self._new_moments_trajectory((first, second))
         self.step_lookup[ostring] = 0
         return comp
 
@@ -461,33 +676,115 @@ class OptimizerGD(Optimizer):
             dict of new suggested parameters.
         """
         s = id(objective)
+        if s not in self.layout_lookup:
+            raise TequilaException(
+                'Could not retrieve necessary information. Please use the prepare function before optimizing!')
+        layout = self.layout_lookup[s]
+        x, grads = self._vector_step(s, layout.to_vector(parameters), parameters)
+        back = layout.to_dict(x, parameters)
+        if self.save_history:
+            self.history.gradients.append(layout.to_dict(grads))
+        return back
+
+    def _lookahead(self, s, x: numpy.ndarray) -> numpy.ndarray:
+        """
+        the point at which the update rule will evaluate the gradient in the next step from x.
+        """
+        if self.f in (self._nesterov, self._rms_nesterov):
+            return x + self.beta * self.moments_lookup[s][0]
+        return x
+
+    def _prefetch(self, evaluator: _AsyncEvaluator, s, x: numpy.ndarray, passive: dict) -> tuple:
+        """
+        submit the gradient evaluation of the next step from x to the background.
+        Parameters
+        ----------
+        evaluator: _AsyncEvaluator:
+            the evaluator to submit to.
+        s:
+            id of the compiled objective (as registered by prepare).
+        x: numpy.ndarray:
+            the active parameters in the layout of the objective.
+        passive: dict:
+            values for the variables that are not optimized.
+
+        Returns
+        -------
+        tuple
+            the point the gradient is evaluated at and the future of the gradient
+        """
+        point = self._lookahead(s, x)
+        variables = self.layout_lookup[s].to_dict(point, passive)
+        components = self.component_lookup[s]
+        if components is not None:
+            return point, evaluator.submit_vector(components, variables, samples=self.samples)
+        kwargs = {"samples": self.samples}
+        if self.f == self._spsa:
+            kwargs["iteration"] = self.iteration
+        return point, evaluator.submit(self.gradient_lookup[s], variables, **kwargs)
+
+    def _vector_step(self, s, x: numpy.ndarray, passive: dict,
+                     prefetched: tuple = None) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        perform a single optimization step on the flat vector of active parameters.
+        Parameters
+        ----------
+        s:
+            id of the compiled objective (as registered by prepare).
+        x: numpy.ndarray:
+            the active parameters in the layout of the objective.
+        passive: dict:
+            values for the variables that are not optimized (active variables in it are overwritten).
+        prefetched: tuple, optional:
+            point and future of a gradient evaluation submitted by _prefetch.
+            Used if the update rule asks for the gradient at that point.
+
+        Returns
+        -------
+        tuple
+            the new parameter vector and the gradient vector
+        """
         try:
             gradients = self.gradient_lookup[s]
-            active_keys = self.active_key_lookup[s]
+            layout = self.layout_lookup[s]
             last_moment = self.moments_lookup[s]
             adam_step = self.step_lookup[s]
         except:
             raise TequilaException(
                 'Could not retrieve necessary information. Please use the prepare function before optimizing!')
+
+        def evaluate_gradient(y, *args, **kwargs):
+            if prefetched is not None and numpy.array_equal(y, prefetched[0]):
+                return numpy.asarray(prefetched[1].result(), dtype=float)
+            # the dictionary is only constructed at the boundary to the objectives
+            return numpy.asarray(gradients(layout.to_dict(y, passive), *args, **kwargs), dtype=float)
+
         new, moments, grads = self.f(step=adam_step,
-                                     gradients=gradients,
-                                     active_keys=active_keys,
+                                     gradients=evaluate_gradient,
                                      moments=last_moment,
-                                     v=parameters,
+                                     x=x,
                                      iteration=self.iteration)
-        back = {**parameters}
-        for k in new.keys():
-            back[k] = new[k]
-        save_grad = {}
         self.moments_lookup[s] = moments
         self.moments_trajectory[s].append(moments)
-        if self.save_history:
-            for i, k in enumerate(active_keys):
-                save_grad[k] = grads[i]
-            self.history.gradients.append(save_grad)
         self.step_lookup[s] += 1
         self.__dx = grads       # most recent gradient
-        return back
+        return new, grads
+
+    def _new_moments_trajectory(self, moments) -> collections.deque:
+        """
+        a new moments trajectory starting with moments, bounded by the max_length of the history (if set).
+        Parameters
+        ----------
+        moments:
+            the initial moments.
+
+        Returns
+        -------
+        collections.deque
+            holds at most history max_length moments, all moments if no max_length is set.
+        """
+        maxlen = self.history.max_length if self.save_history else None
+        return collections.deque([moments], maxlen=maxlen)
 
     def reset_stepper(self):
         """
@@ -500,6 +797,8 @@ class OptimizerGD(Optimizer):
         self.moments_lookup = {}
         self.step_lookup = {}
         self.gradient_lookup = {}
+        self.component_lookup = {}
+        self.layout_lookup = {}
         self.reset_history()
 
     def reset_momenta(self):
@@ -515,7 +814,7 @@ class OptimizerGD(Optimizer):
             first = numpy.zeros(vlen)
             second = numpy.zeros(vlen)
             self.moments_lookup[k] = (first, second)
-            self.moments_trajectory[k] = [(first, second)]
+            self.moments_trajectory[k] = self._new_moments_trajectory((first, second))
             self.step_lookup[k] = 0
 
     def reset_momenta_for(self, objective: Objective):
@@ -537,189 +836,140 @@ class OptimizerGD(Optimizer):
             first = numpy.zeros(vlen)
             second = numpy.zeros(vlen)
             self.moments_lookup[k] = (first, second)
-            self.moments_trajectory[k] = [(first, second)]
+            self.moments_trajectory[k] = self._new_moments_trajectory((first, second))
             self.step_lookup[k] = 0
         except:
             print('found no compiled objective with id {} in lookup. Did you pass the correct object?'.format(k))
 
     def _adam(self, gradients, step,
-              v, moments, active_keys,
+              x, moments,
               **kwargs):
 
         learningRate = self.nextLearningRate()
         t = step + 1
         s = moments[0]
         r = moments[1]
-        grads = gradients(v, samples=self.samples)
+        grads = gradients(x, samples=self.samples)
         s = self.beta * s + (1 - self.beta) * grads
         r = self.rho * r + (1 - self.rho) * numpy.square(grads)
         s_hat = s / (1 - self.beta ** t)
         r_hat = r / (1 - self.rho ** t)
-        updates = []
-        for i in range(len(grads)):
-            rule = - learningRate * s_hat[i] / (numpy.sqrt(r_hat[i]) + self.epsilon)
-            updates.append(rule)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] + updates[i]
+        new = x - learningRate * s_hat / (numpy.sqrt(r_hat) + self.epsilon)
         back_moment = [s, r]
         return new, back_moment, grads
 
     def _adagrad(self, gradients,
-                 v, moments, active_keys, **kwargs):
+                 x, moments, **kwargs):
 
         learningRate = self.nextLearningRate()
         r = moments[1]
-        grads = gradients(v, self.samples)
+        grads = gradients(x, samples=self.samples)
 
-        r += numpy.square(grads)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] - learningRate * grads[i] / numpy.sqrt(r[i] + self.epsilon)
+        r = r + numpy.square(grads)
+        new = x - learningRate * grads / numpy.sqrt(r + self.epsilon)
 
         back_moments = [moments[0], r]
         return new, back_moments, grads
 
     def _adamax(self, gradients,
-                v, moments, active_keys, **kwargs):
+                x, moments, **kwargs):
 
         learningRate = self.nextLearningRate()
         s = moments[0]
         r = moments[1]
-        grads = gradients(v, samples=self.samples)
+        grads = gradients(x, samples=self.samples)
         s = self.beta * s + (1 - self.beta) * grads
         r = self.rho * r + (1 - self.rho) * numpy.linalg.norm(grads, numpy.inf)
-        updates = []
-        for i in range(len(grads)):
-            rule = - learningRate * s[i] / r[i]
-            updates.append(rule)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] + updates[i]
+        new = x - learningRate * s / r
         back_moment = [s, r]
         return new, back_moment, grads
 
     def _nadam(self, step, gradients,
-               v, moments, active_keys,
+               x, moments,
                **kwargs):
 
         learningRate = self.nextLearningRate()
         s = moments[0]
         r = moments[1]
         t = step + 1
-        grads = gradients(v, samples=self.samples)
+        grads = gradients(x, samples=self.samples)
         s = self.beta * s + (1 - self.beta) * grads
         r = self.rho * r + (1 - self.rho) * numpy.square(grads)
         s_hat = s / (1 - self.beta ** t)
         r_hat = r / (1 - self.rho ** t)
-        updates = []
-        for i in range(len(grads)):
-            rule = - learningRate * (self.beta * s_hat[i] + (1 - self.beta) * grads[i] / (1 - self.beta ** t)) / (
-                        numpy.sqrt(r_hat[i]) + self.epsilon)
-            updates.append(rule)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] + updates[i]
+        new = x - learningRate * (self.beta * s_hat + (1 - self.beta) * grads / (1 - self.beta ** t)) / (
+                numpy.sqrt(r_hat) + self.epsilon)
         back_moment = [s, r]
         return new, back_moment, grads
 
     def _sgd(self, gradients,
-             v, moments, active_keys, **kwargs):
+             x, moments, **kwargs):
 
         learningRate = self.nextLearningRate()
-        grads = gradients(v, samples=self.samples)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] - learningRate * grads[i]
+        grads = gradients(x, samples=self.samples)
+        new = x - learningRate * grads
         return new, moments, grads
 
-    def _spsa(self, gradients, v, moments, active_keys, **kwargs):
+    def _spsa(self, gradients, x, moments, **kwargs):
 
         learningRate = self.nextLearningRate()
-        grads = gradients(v, samples=self.samples, iteration=self.iteration)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] - learningRate * grads[i]
+        grads = gradients(x, samples=self.samples, iteration=self.iteration)
+        new = x - learningRate * grads
         return new, moments, grads
 
     def _momentum(self, gradients,
-                  v, moments, active_keys, **kwargs):
+                  x, moments, **kwargs):
 
         learningRate = self.nextLearningRate()
         m = moments[0]
-        grads = gradients(v, samples=self.samples)
+        grads = gradients(x, samples=self.samples)
 
         m = self.beta * m - learningRate * grads
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] + m[i]
+        new = x + m
 
         back_moments = [m, moments[1]]
         return new, back_moments, grads
 
     def _nesterov(self, gradients,
-                  v, moments, active_keys, **kwargs):
+                  x, moments, **kwargs):
 
         learningRate = self.nextLearningRate()
         m = moments[0]
 
-        interim = {}
-        for i, k in enumerate(active_keys):
-            interim[k] = v[k] + self.beta * m[i]
-        active_keyset = set([k for k in active_keys])
-        total_keyset = set([k for k in v.keys()])
-        for k in total_keyset:
-            if k not in active_keyset:
-                interim[k] = v[k]
-        grads = gradients(interim, samples=self.samples)
+        grads = gradients(x + self.beta * m, samples=self.samples)
 
         m = self.beta * m - learningRate * grads
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] + m[i]
+        new = x + m
 
         back_moments = [m, moments[1]]
         return new, back_moments, grads
 
     def _rms(self, gradients,
-             v, moments, active_keys,
+             x, moments,
              **kwargs):
 
         learningRate = self.nextLearningRate()
         r = moments[1]
-        grads = gradients(v, samples=self.samples)
+        grads = gradients(x, samples=self.samples)
         r = self.rho * r + (1 - self.rho) * numpy.square(grads)
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] - learningRate * grads[i] / numpy.sqrt(self.epsilon + r[i])
+        new = x - learningRate * grads / numpy.sqrt(self.epsilon + r)
 
         back_moments = [moments[0], r]
         return new, back_moments, grads
 
     def _rms_nesterov(self, gradients,
-                      v, moments, active_keys,
+                      x, moments,
                       **kwargs):
 
         learningRate = self.nextLearningRate()
         m = moments[0]
         r = moments[1]
 
-        interim = {}
-        for i, k in enumerate(active_keys):
-            interim[k] = v[k] + self.beta * m[i]
-        active_keyset = set([k for k in active_keys])
-        total_keyset = set([k for k in v.keys()])
-        for k in total_keyset:
-            if k not in active_keyset:
-                interim[k] = v[k]
-        grads = gradients(interim, samples=self.samples)
+        grads = gradients(x + self.beta * m, samples=self.samples)
 
         r = self.rho * r + (1 - self.rho) * numpy.square(grads)
-        for i in range(len(m)):
-            m[i] = self.beta * m[i] - learningRate * grads[i] / numpy.sqrt(r[i])
-        new = {}
-        for i, k in enumerate(active_keys):
-            new[k] = v[k] + m[i]
+        m = self.beta * m - learningRate * grads / numpy.sqrt(r)
+        new = x + m
 
         back_moments = [m, r]
         return new, back_moments, grads
@@ -742,6 +992,42 @@ class OptimizerGD(Optimizer):
             else:
                 return self.lr[self.nextLRIndex]
 
+class _ParameterLayout:
+    """
+    Fixed layout of the active variables in a flat parameter vector.
+
+    Should not be used outside of optimizers.
+    Can't interact with other tequila structures.
+
+    Attributes
+    ----------
+    keys:
+        the active variables, in the order of the vector entries.
+    index:
+        dictionary mapping the variables to their position in the vector.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+
+    @property
+    def size(self):
+        return len(self.keys)
+
+    def to_vector(self, values: dict) -> numpy.ndarray:
+        """ the active entries of a dictionary as flat vector """
+        return numpy.asarray([values[k] for k in self.keys], dtype=float)
+
+    def to_dict(self, x: numpy.ndarray, base: dict = None) -> dict:
+        """ a new dictionary with the entries of base updated by the vector x """
+        if base is None:
+            return dict(zip(self.keys, x.tolist()))
+        result = {**base}
+        result.update(zip(self.keys, x.tolist()))
+        return result
+
+
 class DIIS:
     def __init__(self: 'DIIS',
                  ndiis: int =8,
@@ -790,8 +1076,6 @@ class DIIS:
         self.ndiis = ndiis
         self.min_vectors = min_vectors
         self.tol = tol
-        self.error = []
-        self.P = []
 
         if drop == 'error':
             self.drop = self.drop_error
@@ -800,79 +1084,146 @@ class DIIS:
         else:
             raise NotImplementedError("Drop type %s not implemented" % drop)
 
+        # vectors are stored in preallocated slots (allocated on the first push, when the length is known)
+        # B holds the overlaps of the error vectors in the slots and is updated with every push
+        self._P = None
+        self._E = None
+        self._B = numpy.zeros((ndiis, ndiis))
+        self._age = numpy.zeros(ndiis, dtype=numpy.int64)
+        self._n = 0
+        self._pushes = 0
+        self.statistics = {"push": 0, "update": 0, "active": 0, "failed": 0,
+                           "time_push": 0.0, "time_update": 0.0}
+
     def reset(self: 'DIIS') -> None:
         """Reset containers."""
-        self.P = []
-        self.error = []
-
-    def drop_first(self: 'DIIS',
-                   p: typing.Sequence[numpy.ndarray],
-                   e: typing.Sequence[numpy.ndarray]
-                   ) -> typing.Tuple[typing.List[numpy.ndarray], typing.List[numpy.ndarray]]:
-        """Return P,E with the first element removed."""
-        return p[1:], e[1:]
-
-    def drop_error(self: 'DIIS',
-                   p: typing.Sequence[numpy.ndarray],
-                   e: typing.Sequence[numpy.ndarray]
-                   ) -> typing.Tuple[typing.List[numpy.ndarray], typing.List[numpy.ndarray]]:
-        """Return P,E with the largest magnitude error vector removed."""
-        i = numpy.argmax([v.dot(v) for v in e])
-        return p[:i] + p[i+1:], e[:i] + e[i+1:]
+        self._n = 0
+
+    def drop_first(self: 'DIIS') -> int:
+        """Return the slot of the oldest vectors."""
+        return int(numpy.argmin(self._age[:self._n]))
+
+    def drop_error(self: 'DIIS') -> int:
+        """Return the slot of the largest magnitude error vector."""
+        return int(numpy.argmax(numpy.diagonal(self._B)[:self._n]))
 
     def push(self: 'DIIS',
              param_vector: numpy.ndarray,
              error_vector: numpy.ndarray
              ) -> None:
         """Update DIIS calculator with parameter and error vectors."""
-        if len(self.error) == self.ndiis:
-            self.drop(self.P, self.error)
-
-        self.error += [error_vector]
-        self.P += [param_vector]
+        start = time.perf_counter()
+        param_vector = numpy.asarray(param_vector, dtype=float).reshape([-1])
+        error_vector = numpy.asarray(error_vector, dtype=float).reshape([-1])
+        if self._P is None or self._P.shape[1] != len(param_vector):
+            self._P = numpy.empty((self.ndiis, len(param_vector)))
+            self._E = numpy.empty((self.ndiis, len(error_vector)))
+            self._n = 0
+
+        if self._n == self.ndiis:
+            slot = self.drop()
+        else:
+            slot = self._n
+            self._n += 1
+
+        self._P[slot] = param_vector
+        self._E[slot] = error_vector
+        self._age[slot] = self._pushes
+        self._pushes += 1
+        # rank-one update of the overlaps: only row and column of the new slot change
+        overlaps = self._E[:self._n].dot(error_vector)
+        self._B[slot, :self._n] = overlaps
+        self._B[:self._n, slot] = overlaps
+
+        self.statistics["push"] += 1
+        self.statistics["time_push"] += time.perf_counter() - start
+
+    @property
+    def P(self) -> typing.List[numpy.ndarray]:
+        """The stored parameter vectors, oldest first."""
+        return [self._P[i] for i in self._order()]
+
+    @property
+    def error(self) -> typing.List[numpy.ndarray]:
+        """The stored error vectors, oldest first."""
+        return [self._E[i] for i in self._order()]
+
+    def _order(self) -> numpy.ndarray:
+        if self._n == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+        return numpy.argsort(self._age[:self._n])
+
+    def get_state(self: 'DIIS') -> dict:
+        """Copy of the stored vectors, their overlaps and ages, e.g. for a checkpoint."""
+        return {"P": None if self._P is None else self._P.copy(),
+                "E": None if self._E is None else self._E.copy(),
+                "B": self._B.copy(),
+                "age": self._age.copy(),
+                "n": self._n,
+                "pushes": self._pushes}
+
+    def restore(self: 'DIIS', state: dict) -> None:
+        """Restore a state returned by get_state; the overlaps are taken as they are, not recomputed."""
+        if len(state["B"]) != self.ndiis:
+            raise TequilaException("DIIS state holds {} vectors, ndiis={}".format(len(state["B"]), self.ndiis))
+        self._P = None if state["P"] is None else numpy.array(state["P"], dtype=float)
+        self._E = None if state["E"] is None else numpy.array(state["E"], dtype=float)
+        self._B = numpy.array(state["B"], dtype=float)
+        self._age = numpy.array(state["age"], dtype=numpy.int64)
+        self._n = state["n"]
+        self._pushes = state["pushes"]
 
     def do_diis(self: 'DIIS') -> bool:
         """Return with DIIS should be performed."""
-        if len(self.error) < self.min_vectors:
+        if self._n < self.min_vectors:
             # No point in DIIS with less than 2 vectors!
             return False
 
-        if max(numpy.abs(self.error[-1])) > self.tol:
+        latest = int(numpy.argmax(self._age[:self._n]))
+        if numpy.max(numpy.abs(self._E[latest])) > self.tol:
             return False
 
         return True
 
     def update(self:'DIIS') -> typing.Optional[numpy.ndarray]:
         """Get update parameter from DIIS iteration, or None if DIIS is not doable."""
-        # Check if we should do DIIS
-        if not self.do_diis():
-            return None
-
-        # Making the B matrix
-        N = len(self.error)
-        B = numpy.zeros((N+1, N+1))
-        for i in range(N):
-            for j in range(i,N):
-                B[i,j] = self.error[i].dot(self.error[j])
-                B[j,i] = B[i,j]
-
-        B[N,:] = -1
-        B[:,N] = -1
-        B[N,N] = 0
-
-        # Making the K vector
-        K = numpy.zeros((N+1,))
-        K[-1] = -1.0
-
-        # Solve DIIS for great convergence!
+        start = time.perf_counter()
+        self.statistics["update"] += 1
         try:
-            diis_v, res, rank, s = numpy.linalg.lstsq(B,K,rcond=None)
-        except numpy.linalg.LinAlgError:
-            self.reset()
-            return None
-
-        new = diis_v[:-1].dot(self.P)
-        return new
+            # Check if we should do DIIS
+            if not self.do_diis():
+                return None
+
+            # Making the B matrix from the stored overlaps
+            N = self._n
+            B = numpy.empty((N+1, N+1))
+            B[:N, :N] = self._B[:N, :N]
+            B[N,:] = -1
+            B[:,N] = -1
+            B[N,N] = 0
+
+            # Making the K vector
+            K = numpy.zeros((N+1,))
+            K[-1] = -1.0
+
+            # Solve DIIS for great convergence!
+            try:
+                diis_v, res, rank, s = numpy.linalg.lstsq(B,K,rcond=None)
+            except numpy.linalg.LinAlgError:
+                self.statistics["failed"] += 1
+                self.reset()
+                return None
+
+            self.statistics["active"] += 1
+            return diis_v[:-1].dot(self._P[:N])
+        finally:
+            self.statistics["time_update"] += time.perf_counter() - start
+
+    def print_statistics(self: 'DIIS') -> None:
+        """Print how often DIIS was attempted and active and the time spent."""
+        print("DIIS: {} vectors pushed in {:.4e}s, {} updates in {:.4e}s, {} active, {} failed".format(
+            self.statistics["push"], self.statistics["time_push"], self.statistics["update"],
+            self.statistics["time_update"], self.statistics["active"], self.statistics["failed"]))
 
 
 def minimize(objective: Objective,
@@ -897,6 +1248,8 @@ def minimize(objective: Objective,
              c: typing.Union[float, typing.List[float]] = 0.2,
              epsilon: float = 1. * 10 ** (-7),
              calibrate_lr: bool = False,
+             history_options: dict = None,
+             pipeline=None,
              *args,
              **kwargs) -> GDResults:
 
@@ -930,6 +1283,8 @@ def minimize(objective: Objective,
         the gradient to use. If None, calculated in the usual way. if str='qng', then the qng is calculated.
         If a dictionary of objectives, those objectives are used. If another dictionary,
         an attempt will be made to interpret that dictionary to get, say, numerical gradients.
+        For method='spsa' the dictionary can hold further options of the spsa gradient, e.g.
+        {"perturbations": 4, "seed": 42, "second_order": True} (see _SPSAGrad).
     samples: int, optional:
          samples/shots to take in every run of the quantum circuits (None activates full wavefunction simulation)
     maxiter: int : Default = 100:
@@ -950,6 +1305,16 @@ def minimize(objective: Objective,
         Save the history throughout the optimization
     calibrate_lr: bool: Default = False:
         Calibrates the value of the learning rate
+    history_options: dict, optional:
+        bounded memory storage of the history, e.g. {"max_length": 1000, "decimation": 10, "spill": "directory"}
+        see OptimizerHistory
+    pipeline: optional:
+        evaluate the gradient in the background while the energy is evaluated.
+        True or an int (number of threads) for a thread pool, or any concurrent.futures executor.
+    checkpoint: str, optional (passed as kwarg):
+        file to which the optimizer state is written periodically (see OptimizerGD.__call__)
+    resume_from: str, optional (passed as kwarg):
+        checkpoint file of an interrupted run to continue from
 
     Note
     ----
@@ -982,7 +1347,9 @@ def minimize(objective: Objective,
                             noise=noise,
                             maxiter=maxiter,
                             silent=silent,
-                            calibrate_lr=calibrate_lr)
+                            calibrate_lr=calibrate_lr,
+                            history_options=history_options,
+                            pipeline=pipeline)
     return optimizer(objective=objective,
                      maxiter=maxiter,
                      gradient=gradient,
@@ -1,7 +1,13 @@
 from tequila.objective.objective import Objective
-from tequila.optimizers.optimizer_base import Optimizer, OptimizerResults, dataclass
+from tequila.optimizers.optimizer_base import Optimizer, OptimizerResults, OptimizerHistory, dataclass, \
+    TequilaOptimizerException, _AsyncEvaluator
+from tequila.optimizers._history import HistoryTrace
 import typing
 import numbers
+import os
+import copy
+import concurrent.futures
+import pickle
 from tequila.objective.objective import Variable
 import warnings
 import GPyOpt
@@ -47,6 +53,139 @@ def array_to_objective_dict(objective, array, passives=None) -> typing.Dict[Vari
     return back
 
 
+class _BatchFunction:
+    """
+    An objective as function of a two dimensional numpy array with one point per row, as called by GPyOpt.
+
+    With batch acquisition GPyOpt proposes several points at once, they are evaluated concurrently
+    if an evaluator is given. A compiled objective can not be evaluated by two threads at once,
+    with a thread pool every point of a batch is therefore evaluated on its own (deep) copy of the objective.
+    Should not be used outside of OptimizerGPyOpt.
+    """
+
+    def __init__(self, objective, keys: list, passive_angles: dict = None, evaluator: _AsyncEvaluator = None,
+                 **kwargs):
+        self.objective = objective
+        self.keys = keys
+        self.passive_angles = {} if passive_angles is None else passive_angles
+        self.evaluator = evaluator
+        self.kwargs = kwargs
+        self._replicas = [objective]
+
+    def replicas(self, n: int) -> list:
+        """
+        n objectives which can be evaluated concurrently: copies for a thread pool,
+        the objective itself for executors which run in other processes (and pickle it anyway).
+        """
+        if not isinstance(self.evaluator.executor, concurrent.futures.ThreadPoolExecutor):
+            return [self.objective] * n
+        while len(self._replicas) < n:
+            self._replicas.append(copy.deepcopy(self.objective))
+        return self._replicas[:n]
+
+    def variables(self, x) -> typing.Dict[Variable, float]:
+        back = {k: float(v) for k, v in zip(self.keys, x)}
+        back.update(self.passive_angles)
+        return back
+
+    def __call__(self, arr) -> np.ndarray:
+        points = [self.variables(x) for x in np.atleast_2d(arr)]
+        if self.evaluator is None or len(points) == 1:
+            values = [self.objective(variables=p, **self.kwargs) for p in points]
+        else:
+            objectives = self.replicas(len(points))
+            futures = [self.evaluator.submit(f, p, **self.kwargs) for f, p in zip(objectives, points)]
+            values = [f.result() for f in futures]
+        return np.asarray(values, dtype=float).reshape([-1, 1])
+
+
+def _history_pairs(history) -> typing.List[typing.Tuple[dict, float]]:
+    """
+    (angles, energy) pairs of an OptimizerHistory, every function evaluation if it was recorded
+    """
+    pairs = []
+    for angles, energies in [(history.angles_calls, history.energy_calls), (history.angles, history.energies)]:
+        if angles is None or energies is None or len(angles) == 0 or len(energies) == 0:
+            continue
+        if isinstance(angles, HistoryTrace) or isinstance(energies, HistoryTrace):
+            # stored entries can be decimated or dropped, match them by their original position
+            angles = dict(angles.indexed() if isinstance(angles, HistoryTrace) else enumerate(angles))
+            energies = dict(energies.indexed() if isinstance(energies, HistoryTrace) else enumerate(energies))
+            pairs = [(angles[i], energies[i]) for i in sorted(angles.keys()) if i in energies]
+        else:
+            pairs = list(zip(angles, energies))
+        break
+    return pairs
+
+
+def _spill_pairs(directory: str) -> typing.List[typing.Tuple[dict, float]]:
+    """
+    (angles, energy) pairs of a history spilled to a directory (see OptimizerHistory)
+    """
+    for a, e in [("angles_calls", "energy_calls"), ("angles", "energies")]:
+        if not os.path.isdir(os.path.join(directory, a)) or not os.path.isdir(os.path.join(directory, e)):
+            continue
+        steps_a, angles, keys = HistoryTrace.read_spill(os.path.join(directory, a))
+        steps_e, energies, _ = HistoryTrace.read_spill(os.path.join(directory, e))
+        if len(steps_a) == 0 or len(steps_e) == 0 or keys is None:
+            continue
+        energies = {int(s): float(v[0]) for s, v in zip(steps_e, energies)}
+        return [({k: v for k, v in zip(keys, row)}, energies[int(s)]) for s, row in zip(steps_a, angles)
+                if int(s) in energies]
+    return []
+
+
+def load_warm_start(source, keys: list) -> typing.Tuple[typing.Optional[np.ndarray], typing.Optional[np.ndarray]]:
+    """
+    collect previously evaluated points to initialize a bayesian optimization with.
+
+    Parameters
+    ----------
+    source:
+        OptimizerHistory, OptimizerResults, path to a pickled history or results, path to the spill
+        directory of a history, or a list of those.
+    keys: list:
+        the active variables, in the order of the domain.
+
+    Returns
+    -------
+    tuple:
+        X (one point per row, wrapped into the domain [0, 2 pi)) and Y (column of energies),
+        None, None if no complete point was found.
+    """
+    sources = source if isinstance(source, (list, tuple)) else [source]
+    pairs = []
+    for s in sources:
+        if isinstance(s, str) and os.path.isdir(s):
+            pairs += _spill_pairs(s)
+            continue
+        if isinstance(s, str):
+            if not os.path.exists(s):
+                raise TequilaOptimizerException("warm start: history file {} not found".format(s))
+            with open(s, "rb") as f:
+                s = pickle.load(f)
+        if isinstance(s, OptimizerResults):
+            s = s.history
+        if not isinstance(s, OptimizerHistory):
+            raise TequilaOptimizerException("warm start: can not read a history from {}".format(type(s)))
+        pairs += _history_pairs(s)
+
+    names = {str(k): k for k in keys}
+    X = []
+    Y = []
+    for angles, energy in pairs:
+        angles = {str(k): v for k, v in angles.items()}
+        if not all(k in angles for k in names) or not np.isfinite(energy):
+            continue
+        x = np.asarray([angles[k] for k in names], dtype=float)
+        if np.all(np.isfinite(x)):
+            X.append(np.mod(x, 2 * np.pi))
+            Y.append(energy)
+    if len(X) == 0:
+        return None, None
+    return np.asarray(X), np.asarray(Y, dtype=float).reshape([-1, 1])
+
+
 class OptimizerGPyOpt(Optimizer):
     """
     Wrapper around the optimization package GPyOpt. See: https://github.com/SheffieldML/GPyOpt and Optimizer.
@@ -58,7 +197,7 @@ class OptimizerGPyOpt(Optimizer):
     get_object:
         return a GPyOpt BayesianOptimization object from prepared information.
     construct_function:
-        return a tequila Objective as a callable function of a single numpy array.
+        return a tequila Objective as a callable function of a numpy array (one point per row).
     redictify:
         transform an array of parameters into a dictionary.
     """
@@ -69,7 +208,8 @@ class OptimizerGPyOpt(Optimizer):
 
     def __init__(self, maxiter=100, backend=None,
                  samples=None, noise=None, device=None,
-                 save_history=True, silent=False):
+                 save_history=True, silent=False,
+                 batch_size=1, evaluator_type="local_penalization", pipeline=None):
 
         """
 
@@ -93,9 +233,22 @@ class OptimizerGPyOpt(Optimizer):
             whether or not to save this history of the optimization.
         silent: bool: Default = False:
             suppresses printouts if true.
+        batch_size: int: Default = 1:
+            number of points proposed in every iteration of the bayesian optimization.
+        evaluator_type: str: Default = 'local_penalization':
+            how GPyOpt collects the points of a batch ('local_penalization', 'thompson_sampling', 'random').
+            Ignored for batch_size 1.
+        pipeline: optional:
+            evaluate the points of a batch concurrently.
+            True or an int (number of threads) for a thread pool, or any concurrent.futures executor.
+            Default: evaluate the points one after another.
         """
         super().__init__(backend=backend, maxiter=maxiter, samples=samples, save_history=save_history, device=device,
-                         noise=noise, silent=silent)
+                         noise=noise, silent=silent, pipeline=pipeline)
+        if batch_size < 1:
+            raise TequilaOptimizerException("batch_size needs to be positive, got {}".format(batch_size))
+        self.batch_size = batch_size
+        self.evaluator_type = evaluator_type
 
     def get_domain(self, objective: Objective, passive_angles: dict = None) -> typing.List[typing.Dict]:
         """
@@ -127,7 +280,7 @@ class OptimizerGPyOpt(Optimizer):
                     op.remove(thing)
         return [{'name': v, 'type': 'continuous', 'domain': (0, 2 * np.pi)} for v in op]
 
-    def get_object(self, func, domain, method) -> GPyOpt.methods.BayesianOptimization:
+    def get_object(self, func, domain, method, X=None, Y=None) -> GPyOpt.methods.BayesianOptimization:
         """
         get a GPyOpt BayesianOptimization object to run optimization with.
 
@@ -139,16 +292,27 @@ class OptimizerGPyOpt(Optimizer):
             the domain of optimization; a list of dicts.
         method: str:
             what optimization method to use.
+        X: np.ndarray, optional:
+            previously evaluated points (one per row) to start the model from.
+        Y: np.ndarray, optional:
+            the values of func at X (one column).
 
         Returns
         -------
         a BayesianOptimization object.
         """
-        return BayesianOptimization(f=func, domain=domain, acquisition=method)
-
-    def construct_function(self, objective, passive_angles=None) -> typing.Callable:
+        kwargs = {}
+        if X is not None:
+            kwargs["X"] = X
+            kwargs["Y"] = Y
+        if self.batch_size > 1:
+            kwargs["batch_size"] = self.batch_size
+            kwargs["evaluator_type"] = self.evaluator_type
+        return BayesianOptimization(f=func, domain=domain, acquisition=method, **kwargs)
+
+    def construct_function(self, objective, passive_angles=None, evaluator: _AsyncEvaluator = None) -> typing.Callable:
         """
-        return an objective as a callable function of a numpy array.
+        return an objective as a callable function of a numpy array with one point per row.
 
         Parameters
         ----------
@@ -156,14 +320,15 @@ class OptimizerGPyOpt(Optimizer):
             an objective.
         passive_angles: dict, optional:
             the passive angles of objective.
+        evaluator: optional:
+            evaluates the points of a batch concurrently.
         Returns
         -------
         callable.
         """
-        return lambda arr: objective(backend=self.backend,
-                                     variables=array_to_objective_dict(objective, arr, passive_angles),
-                                     samples=self.samples,
-                                     noise=self.noise)
+        keys = [d['name'] for d in self.get_domain(objective, passive_angles)]
+        return _BatchFunction(objective, keys=keys, passive_angles=passive_angles, evaluator=evaluator,
+                              samples=self.samples)
 
     def redictify(self, arr, objective, passive_angles=None) -> typing.Dict:
         """
@@ -195,7 +360,7 @@ class OptimizerGPyOpt(Optimizer):
     def __call__(self, objective: Objective,
                  initial_values: typing.Dict[Variable, numbers.Real] = None,
                  variables: typing.List[typing.Hashable] = None,
-                 method: str = 'lbfgs', *args, **kwargs) -> GPyOptResults:
+                 method: str = 'lbfgs', warm_start=None, *args, **kwargs) -> GPyOptResults:
 
         """
         perform optimization of an objective via GPyOpt.
@@ -213,6 +378,10 @@ class OptimizerGPyOpt(Optimizer):
         method: str: Default = 'lbfgs'
             what method to use for the acquisition function of the bayesian optimization.
             Default: use lbfgs.
+        warm_start: optional:
+            previously evaluated points the surrogate model is initialized with (instead of a random design):
+            an OptimizerHistory or OptimizerResults, path to a pickled history or results,
+            path to the spill directory of a history, or a list of those.
         args
         kwargs
 
@@ -232,15 +401,28 @@ class OptimizerGPyOpt(Optimizer):
             print("{:15} : {}".format("method", method))
             print("{:15} : {} expectationvalues".format("Objective", O.count_expectationvalues()))
 
-        f = self.construct_function(O, passive_angles)
-        opt = self.get_object(f, dom, method)
+        X, Y = None, None
+        if warm_start is not None:
+            X, Y = load_warm_start(warm_start, [d['name'] for d in dom])
+            if not self.silent:
+                print("{:15} : {} points".format("warm start", 0 if X is None else len(X)))
+
+        evaluator = None
+        if self.pipeline is not None and self.batch_size > 1:
+            evaluator = _AsyncEvaluator(self.pipeline)
+        try:
+            f = self.construct_function(O, passive_angles, evaluator=evaluator)
+            opt = self.get_object(f, dom, method, X=X, Y=Y)
 
-        method_options = {"max_iter": self.maxiter, "verbosity": not self.silent, "eps": 1.e-4}
+            method_options = {"max_iter": self.maxiter, "verbosity": not self.silent, "eps": 1.e-4}
 
-        if "method_options" in kwargs:
-            tmp = {**method_options, **kwargs["method_options"]}
+            if "method_options" in kwargs:
+                method_options = {**method_options, **kwargs["method_options"]}
 
-        opt.run_optimization(**method_options)
+            opt.run_optimization(**method_options)
+        finally:
+            if evaluator is not None:
+                evaluator.close()
         if self.save_history:
             self.history.energies = opt.get_evaluations()[1].flatten()
             self.history.angles = [self.redictify(v, objective, passive_angles) for v in opt.get_evaluations()[0]]
@@ -258,6 +440,10 @@ def minimize(objective: Objective,
              device: str = None,
              method: str = 'lbfgs',
              silent: bool = False,
+             batch_size: int = 1,
+             evaluator_type: str = "local_penalization",
+             pipeline=None,
+             warm_start=None,
              *args,
              **kwargs
              ) -> GPyOptResults:
@@ -284,6 +470,16 @@ def minimize(objective: Objective,
         the device from which to (potentially, simulatedly) sample all quantum circuits employed in optimization.
     method: str: Default = 'lbfgs':
          method of acquisition. Allowed arguments are 'lbfgs', 'DIRECT', and 'CMA'
+    batch_size: int: Default = 1:
+        number of points proposed (and evaluated) in every iteration.
+    evaluator_type: str: Default = 'local_penalization':
+        how the points of a batch are collected, see OptimizerGPyOpt.
+    pipeline: optional:
+        evaluate the points of a batch concurrently: True, number of threads or a concurrent.futures executor.
+    warm_start: optional:
+        histories (objects, pickle files or spill directories) of previous runs to initialize the model with.
+    kwargs:
+        method_options: dict, optional: passed on to GPyOpt's run_optimization.
 
     Returns
     -------
@@ -291,10 +487,19 @@ def minimize(objective: Objective,
         the results of an optimization.
     """
 
+    unsupported = [k for k in ["checkpoint", "checkpoint_every", "resume_from"] if k in kwargs]
+    if len(unsupported) > 0:
+        raise TequilaOptimizerException("{} not supported by GPyOpt, checkpoints are written by the gradient descent "
+                                        "optimizers".format(", ".join(unsupported)))
+
     optimizer = OptimizerGPyOpt(samples=samples, backend=backend, maxiter=maxiter,
                                 device=device,
-                                noise=noise, silent=silent)
+                                noise=noise, silent=silent, batch_size=batch_size,
+                                evaluator_type=evaluator_type, pipeline=pipeline)
+    method_options = {k: v for k, v in kwargs.items() if k == "method_options"}
     return optimizer(objective=objective, initial_values=initial_values,
                      variables=variables,
-                     method=method
+                     method=method,
+                     warm_start=warm_start,
+                     **method_options
                      )
@@ -1,11 +1,14 @@
 import scipy, numpy, typing, numbers
 from tequila.objective import Objective
 from tequila.objective.objective import assign_variable, Variable, format_variable_dictionary, format_variable_list
-from .optimizer_base import Optimizer, OptimizerResults
+from .optimizer_base import Optimizer, OptimizerResults, OptimizerHistory, _AsyncEvaluator, _NumGrad, \
+    TequilaOptimizerException
 from ._containers import _EvalContainer, _GradContainer, _HessContainer, _QngContainer
+from ._hessian import _ShiftHessian
 from tequila.utils.exceptions import TequilaException
 from tequila.circuit.noise import NoiseModel
 from tequila.tools.qng import get_qng_combos
+from .qng_statevector import statevector_block
 
 from dataclasses import dataclass
 
@@ -53,6 +56,8 @@ class OptimizerSciPy(Optimizer):
                  method_options=None,
                  method_bounds=None,
                  method_constraints=None,
+                 logger: typing.Callable = None,
+                 log_interval: float = 1.0,
                  **kwargs):
         """
         Parameters
@@ -67,8 +72,13 @@ class OptimizerSciPy(Optimizer):
             See scipy documentation for the method you picked
         method_constraints: optional:
             See scipy documentation for the method you picked
+        logger: callable, optional:
+            receives a dictionary for evaluations of the objective (evaluation, energy, samples, time
+            and the angles for print_level > 2). Default: print the energy (and angles).
+        log_interval: float: Default = 1.0:
+            minimal time in seconds between two calls of the logger. None or 0: log every evaluation.
         silent: bool:
-            if False the optimizer prints out all evaluated energies
+            if False the optimizer prints out the evaluated energies
         """
         super().__init__(**kwargs)
         if hasattr(method, "upper"):
@@ -77,6 +87,8 @@ class OptimizerSciPy(Optimizer):
             self.method = method
         self.tol = tol
         self.method_options = method_options
+        self.logger = logger
+        self.log_interval = log_interval
 
         if method_bounds is not None:
             method_bounds = {assign_variable(k): v for k, v in method_bounds.items()}
@@ -120,6 +132,7 @@ class OptimizerSciPy(Optimizer):
             Information or object used to calculate the gradient of objective. Defaults to None: get analytically.
         hessian: optional:
             Information or object used to calculate the hessian of objective. Defaults to None: get analytically.
+            {'mode': 'diagonal'} or {'mode': 'lowrank', 'rank': int} select approximate analytical hessians.
         reset_history: bool: Default = True:
             whether or not to reset all history before optimizing.
         args
@@ -166,7 +179,10 @@ class OptimizerSciPy(Optimizer):
                            samples=self.samples,
                            passive_angles=passive_angles,
                            save_history=self.save_history,
-                           print_level=self.print_level)
+                           print_level=self.print_level,
+                           history=self.history,
+                           logger=self.logger,
+                           log_interval=self.log_interval)
 
         compile_gradient = self.method in (self.gradient_based_methods + self.hessian_based_methods)
         compile_hessian = self.method in self.hessian_based_methods
@@ -175,6 +191,9 @@ class OptimizerSciPy(Optimizer):
         ddE = None
         # detect if numerical gradients shall be used
         # switch off compiling if so
+        if isinstance(gradient, str) and gradient.lower() == 'qng-statevector':
+            # metric blocks from one statevector simulation per layer
+            gradient = {"method": "qng", "function": statevector_block}
         if isinstance(gradient, str):
             if gradient.lower() == 'qng':
                 compile_gradient = False
@@ -220,20 +239,36 @@ class OptimizerSciPy(Optimizer):
                                 samples=self.samples,
                                 passive_angles=passive_angles,
                                 save_history=self.save_history,
-                                print_level=self.print_level)
+                                print_level=self.print_level,
+                                history=self.history)
         if compile_hessian:
             hess_obj, comp_hess_obj = self.compile_hessian(variables=variables,
                                                            hessian=hessian,
                                                            grad_obj=grad_obj,
-                                                           comp_grad_obj=comp_grad_obj, *args, **kwargs)
-            expvals = sum([o.count_expectationvalues() for o in comp_hess_obj.values()])
+                                                           comp_grad_obj=comp_grad_obj,
+                                                           objective=objective, *args, **kwargs)
+            if isinstance(comp_hess_obj, _ShiftHessian):
+                expvals = comp_hess_obj.count_expectationvalues()
+            else:
+                expvals = sum([o.count_expectationvalues() for o in comp_hess_obj.values()])
             infostring += "{:15} : {} expectationvalues\n".format("hessian", expvals)
             ddE = _HessContainer(objective=comp_hess_obj,
                                  param_keys=param_keys,
                                  samples=self.samples,
                                  passive_angles=passive_angles,
                                  save_history=self.save_history,
-                                 print_level=self.print_level)
+                                 print_level=self.print_level,
+                                 history=self.history)
+        # with a pipeline, the gradient is evaluated in the background while the energy is evaluated
+        # numerical gradients share one compiled objective and are evaluated sequentially
+        evaluator = None
+        if self.pipeline and isinstance(dE, _GradContainer) and \
+                not any(isinstance(x, _NumGrad) for x in dE.objective.values()):
+            evaluator = _AsyncEvaluator(self.pipeline)
+            dE.evaluator = evaluator
+            E.on_evaluate = dE.prefetch
+            infostring += "{:15} : {}\n".format("pipeline", self.pipeline)
+
         if self.print_level > 0:
             print(self)
             print(infostring)
@@ -243,31 +278,40 @@ class OptimizerSciPy(Optimizer):
 
         optimizer_instance = self
         class SciPyCallback:
-            energies = []
-            gradients = []
-            hessians = []
-            angles = []
-            real_iterations = 0
+
+            def __init__(self, history):
+                self.energies = history.new_series("energies")
+                self.gradients = history.new_series("gradients")
+                self.hessians = history.new_series("hessians")
+                self.angles = history.new_series("angles")
+                self.real_iterations = 0
 
             def __call__(self, *args, **kwargs):
-                self.energies.append(E.history[-1])
-                self.angles.append(E.history_angles[-1])
+                self.energies.append(E.last[0])
+                self.angles.append(E.last[1])
                 if dE is not None and not isinstance(dE, str):
-                    self.gradients.append(dE.history[-1])
+                    self.gradients.append(dE.last)
                 if ddE is not None and not isinstance(ddE, str):
-                    self.hessians.append(ddE.history[-1])
+                    self.hessians.append(ddE.last)
                 self.real_iterations += 1
                 if 'callback' in optimizer_instance.kwargs:
-                    optimizer_instance.kwargs['callback'](E.history_angles[-1])
-
-        callback = SciPyCallback()
-        res = scipy.optimize.minimize(E, x0=param_values, jac=dE, hess=ddE,
-                                      args=(Es,),
-                                      method=self.method, tol=self.tol,
-                                      bounds=bounds,
-                                      constraints=self.method_constraints,
-                                      options=self.method_options,
-                                      callback=callback)
+                    optimizer_instance.kwargs['callback'](E.last[1])
+
+        callback = SciPyCallback(history=self.history if self.save_history else OptimizerHistory())
+        try:
+            res = scipy.optimize.minimize(E, x0=param_values, jac=dE, hess=ddE,
+                                          args=(Es,),
+                                          method=self.method, tol=self.tol,
+                                          bounds=bounds,
+                                          constraints=self.method_constraints,
+                                          options=self.method_options,
+                                          callback=callback)
+        finally:
+            if evaluator is not None:
+                evaluator.close()
+            if isinstance(ddE, _HessContainer) and isinstance(ddE.objective, _ShiftHessian) and \
+                    ddE.objective.evaluator is not None:
+                ddE.objective.evaluator.close()
 
         # failsafe since callback is not implemented everywhere
         if callback.real_iterations == 0:
@@ -290,10 +334,10 @@ class OptimizerSciPy(Optimizer):
                 self.history.energies = E.history
                 self.history.angles = E.history_angles
 
+            self.history.flush()
+
         # some scipy methods always give back the last value and not the minimum (e.g. cobyla)
-        ea = sorted(zip(E.history, E.history_angles), key=lambda x: x[0])
-        E_final = ea[0][0]
-        angles_final = ea[0][1] #dict((param_keys[i], res.x[i]) for i in range(len(param_keys)))
+        E_final, angles_final = E.best
         angles_final = {**angles_final, **passive_angles}
 
         return SciPyResults(energy=E_final, history=self.history, variables=format_variable_dictionary(angles_final), scipy_result=res)
@@ -355,10 +399,13 @@ def minimize(objective: Objective,
         '2-point', 'cs' or '3-point' for numerical gradient evaluation (does not work in combination with all optimizers),
         dictionary of variables and tequila objective to define own gradient,
         None for automatic construction (default)
-        Other options include 'qng' to use the quantum natural gradient.
+        Other options include 'qng' to use the quantum natural gradient
+        and 'qng-statevector' for the quantum natural gradient with the metric from statevector simulation.
     hessian: typing.Union[str, typing.Dict[Variable, Objective], None], optional:
         '2-point', 'cs' or '3-point' for numerical gradient evaluation (does not work in combination with all optimizers),
         dictionary (keys:tuple of variables, values:tequila objective) to define own gradient,
+        {'mode': 'diagonal'} or {'mode': 'lowrank', 'rank': int} for approximate analytical hessians
+        (e.g. for newton-cg with many variables),
         None for automatic construction (default)
     initial_values: typing.Dict[typing.Hashable, numbers.Real], optional:
         Initial values as dictionary of Hashable types (variable keys) and floating point numbers. If given None they will all be set to zero
@@ -404,6 +451,11 @@ def minimize(objective: Objective,
             hessian = {(assign_variable(k[0]), assign_variable([k[1]])): v for k, v in hessian.items()}
     method_bounds = format_variable_dictionary(method_bounds)
 
+    unsupported = [k for k in ["checkpoint", "checkpoint_every", "resume_from"] if k in kwargs]
+    if len(unsupported) > 0:
+        raise TequilaOptimizerException("{} not supported by scipy, checkpoints are written by the gradient descent "
+                                        "optimizers".format(", ".join(unsupported)))
+
     # set defaults
 
     optimizer = OptimizerSciPy(save_history=save_history,
@@ -0,0 +1,189 @@
+"""
+Block diagonal quantum geometric tensor (Fubini-Study metric) from statevector simulation
+
+Drop-in replacement for the stokes_block function of the quantum natural gradient:
+instead of compiling one expectation value per metric element, the state before each parametrized layer
+is simulated once and all elements of the block of that layer are computed from it.
+"""
+import typing
+import numpy
+
+from tequila.utils.exceptions import TequilaException
+from tequila.circuit.circuit import QCircuit
+from tequila.simulators.simulator_api import compile_circuit
+
+# single qubit generators of the gaussian gates, the metric uses (<G_k G_q> - <G_k><G_q>)/4
+_generators = {
+    "rx": numpy.array([[0.0, 1.0], [1.0, 0.0]], dtype=complex),
+    "ry": numpy.array([[0.0, -1.0j], [1.0j, 0.0]], dtype=complex),
+    "rz": numpy.array([[1.0, 0.0], [0.0, -1.0]], dtype=complex),
+    "phase": numpy.array([[0.0, 0.0], [0.0, 1.0]], dtype=complex),
+}
+
+
+class StatevectorMetric:
+    """
+    Evaluates the layerwise blocks of the metric of an expectation value
+    with one statevector simulation per parametrized layer.
+
+    Results are cached for the most recent variables, so that all elements of all blocks
+    requested for the same variables share the simulations.
+
+    Attributes
+    ----------
+    prefixes:
+        compiled circuits preparing the state before each parametrized layer (None for the initial state).
+    generators:
+        for each parametrized layer: list of (qubit, single qubit generator matrix).
+    n_qubits:
+        number of qubits of the states.
+    simulations:
+        number of statevector simulations performed so far.
+    """
+
+    def __init__(self, U: QCircuit, backend: str = None, initial_values: dict = None):
+        """
+        Parameters
+        ----------
+        U: QCircuit:
+            the circuit of the expectation value, consisting of gaussian gates (rx, ry, rz, phase) in the
+            parametrized layers (as prepared by get_qng_combos).
+        backend: str, optional:
+            a statevector backend. Default: pick automatically.
+        initial_values: dict, optional:
+            variables to compile with.
+        """
+        moments = U.canonical_moments
+        self.n_qubits = max(U.qubits) + 1 if len(U.qubits) > 0 else 0
+        self.prefixes = []
+        self.generators = []
+        for i in range(1, len(moments), 2):
+            if len(moments[i].gates) == 0:
+                continue
+            generators = []
+            for gate in moments[i].gates:
+                name = gate.name.lower()
+                if name not in _generators:
+                    raise TequilaException("StatevectorMetric: can not get the generator of gate {}".format(gate.name))
+                generators.append((gate.target[0], _generators[name]))
+            prefix = QCircuit.from_moments(moments[:i])
+            if len(prefix.gates) == 0:
+                self.prefixes.append(None)
+            else:
+                self.prefixes.append(compile_circuit(prefix, backend=backend, variables=initial_values))
+            self.generators.append(generators)
+        self.simulations = 0
+        self._key = None
+        self._blocks = {}
+
+    def state(self, layer: int, variables) -> numpy.ndarray:
+        """
+        the state before the given parametrized layer as tensor with one axis per qubit
+        """
+        n = self.n_qubits
+        prefix = self.prefixes[layer]
+        if prefix is None:
+            state = numpy.zeros(2 ** n, dtype=complex)
+            state[0] = 1.0
+        else:
+            wfn = prefix(variables=variables)
+            self.simulations += 1
+            state = wfn.to_array()
+            if wfn.n_qubits < n:
+                # qubits not touched by the prefix are in |0>, with MSB numbering they are the trailing axes
+                padding = numpy.zeros(2 ** (n - wfn.n_qubits), dtype=complex)
+                padding[0] = 1.0
+                state = numpy.kron(state, padding)
+        return state.reshape([2] * n)
+
+    def block(self, layer: int, variables) -> numpy.ndarray:
+        """
+        the metric block of a parametrized layer
+
+        Parameters
+        ----------
+        layer: int:
+            index of the (non empty) parametrized layer.
+        variables: dict:
+            the variables to evaluate the block at.
+
+        Returns
+        -------
+        numpy.ndarray:
+            the real symmetric block
+        """
+        key = tuple(sorted((str(k), float(v)) for k, v in variables.items()))
+        if key != self._key:
+            self._key = key
+            self._blocks = {}
+        if layer not in self._blocks:
+            state = self.state(layer, variables)
+            # all generator states G_k|psi> of the layer
+            vectors = numpy.empty((len(self.generators[layer]), state.size), dtype=complex)
+            for k, (qubit, G) in enumerate(self.generators[layer]):
+                vectors[k] = numpy.moveaxis(numpy.tensordot(G, state, axes=([1], [qubit])), 0, qubit).reshape([-1])
+            flat = state.reshape([-1])
+            expectations = (flat.conj() @ vectors.T).real
+            products = (vectors.conj() @ vectors.T).real
+            self._blocks[layer] = (products - numpy.outer(expectations, expectations)) / 4
+        return self._blocks[layer]
+
+    def entry(self, layer: int, k: int, q: int) -> "_MetricEntry":
+        return _MetricEntry(self, layer, k, q)
+
+
+class _MetricEntry:
+    """
+    Callable element of a metric block, evaluated through the cache of a StatevectorMetric.
+
+    Should not be used outside of StatevectorMetric.
+    """
+
+    def __init__(self, metric: StatevectorMetric, layer: int, k: int, q: int):
+        self.metric = metric
+        self.layer = layer
+        self.k = k
+        self.q = q
+
+    def __call__(self, variables, samples=None, *args, **kwargs):
+        return self.metric.block(self.layer, variables)[self.k, self.q]
+
+
+def statevector_block(
+    expectation, initial_values=None, samples=None, device=None, backend=None, noise=None
+) -> typing.List[typing.List[typing.List[_MetricEntry]]]:
+    """
+    returns the blocks of the layerwise block-diagonal approximation to the qgt,
+    evaluated with one statevector simulation per parametrized layer.
+    Same interface as stokes_block, can be passed as gradient={"method": "qng", "function": statevector_block}
+    or selected with gradient="qng-statevector".
+
+    Parameters
+    ----------
+    expectation: ExpectationValueImpl:
+        the expectation value whose qgt is to be built.
+    initial_values: dict, optional:
+        a dictionary of initial values with which the circuits should be compiled
+    samples: optional:
+        needs to be None, the metric is computed from the exact state
+    device: optional:
+        needs to be None
+    backend: str, optional:
+        the statevector backend to simulate the circuits with
+    noise: optional:
+        needs to be None
+
+    Returns
+    -------
+    list of list of lists:
+        the blocks of the block diagonal layerwise approx to the qgt.
+
+    """
+    if samples is not None or noise is not None or device is not None:
+        raise TequilaException("statevector_block needs exact statevector simulation: no samples, noise or device")
+    metric = StatevectorMetric(expectation.U, backend=backend, initial_values=initial_values)
+    blocks = []
+    for layer, generators in enumerate(metric.generators):
+        n = len(generators)
+        blocks.append([[metric.entry(layer, k, q) for q in range(n)] for k in range(n)])
+    return blocks
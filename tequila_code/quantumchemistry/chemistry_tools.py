@@ -613,9 +613,35 @@ class NBodyTensor:
         def __str__(self):
             return self._scheme
 
+    # axis permutations mapping an index tuple in the given ordering to the chem (mulliken) index tuple
+    # i.e. elems[p,q,r,s] = chem[idx[perm[0]], idx[perm[1]], idx[perm[2]], idx[perm[3]]]
+    # consistent with the einsum strings in self.reorder
+    _to_chem_axes = {"chem": (0, 1, 2, 3), "of": (0, 3, 1, 2), "phys": (0, 2, 1, 3)}
+
+    @staticmethod
+    def _pair_index(i, j):
+        """ compound index of the (unordered) pair i,j in lower-triangular packing (works on numpy arrays) """
+        i = numpy.asarray(i)
+        j = numpy.asarray(j)
+        a = numpy.maximum(i, j)
+        b = numpy.minimum(i, j)
+        return a * (a + 1) // 2 + b
+
+    @staticmethod
+    def _packed_dimension(size):
+        """ number of orbitals n from the length of a packed array with n(n+1)/2*(n(n+1)/2+1)/2 elements """
+        npair = int(round((numpy.sqrt(8 * size + 1) - 1) / 2))
+        n = int(round((numpy.sqrt(8 * npair + 1) - 1) / 2))
+        if npair * (npair + 1) // 2 != size or n * (n + 1) // 2 != npair:
+            raise TequilaException("packed NBodyTensor: {} elements do not correspond to a symmetry packed two-body tensor".format(size))
+        return n
+
     def identify_ordering(self, trials=25):
         if len(self.shape) != 4:
             return None
+        if self.is_packed:
+            # packed storage holds the symmetry unique elements, the ordering only defines the view
+            return self.ordering
         chem=False
         phys=False
         of=False
@@ -685,11 +711,12 @@ class NBodyTensor:
         return True
 
     def __init__(self, elems: numpy.ndarray = None, active_indices: list = None, ordering: str = None,
-                 size_full: int = None, verify=False):
+                 size_full: int = None, verify=False, packed=False):
         """
         Parameters
         ----------
         elems: Tensor data as numpy array
+            if packed=True this can also be the already packed one-dimensional array (see self.pack)
         active_indices: List of active indices in total ordering
         ordering: Ordering scheme for two body tensors
         "dirac" or "phys": <12|g|12>
@@ -703,10 +730,21 @@ class NBodyTensor:
                 g_{gqprs} = \\int d1 d2 p(1)q(2) g(1,2) s(1)r(2)
 
         size_full
+        packed: store two-body tensors in symmetry packed form (only i>=j, k>=l, ij>=kl in chem ordering)
+            assumes real orbitals (8-fold permutational symmetry), reduces memory by roughly a factor of 8
         """
 
         # Set elements
-        self.elems = elems
+        self._packed_elems = None
+        self._packed_n = None
+        if packed and elems is not None and len(elems.shape) == 1:
+            if ordering is None:
+                ordering = "chem"
+            self._elems = None
+            self._packed_elems = numpy.asarray(elems)
+            self._packed_n = self._packed_dimension(len(elems))
+        else:
+            self.elems = elems
         # Active indices only as list of indices (e.g. spatial orbital indices), not as a dictionary of irreducible
         # representations
         if active_indices is not None:
@@ -717,10 +755,10 @@ class NBodyTensor:
 
         # Determine order of tensor
         # Assume, that tensor is entered in desired shape, not as flat array.
-        self.order = len(self.elems.shape)
+        self.order = len(self.shape)
         # Can use size_full < self.elems.shape[0] -> 'full' space is to be considered a subspace as well
         if size_full is None:
-            self._size_full = self.elems.shape[0]
+            self._size_full = self.shape[0]
         else:
             self._size_full = size_full
         # 2-body tensors (<=> order 4) currently allow reordering
@@ -738,11 +776,237 @@ class NBodyTensor:
         else:
             if ordering is not None:
                 raise Exception("Ordering only implemented for tensors of order 4 / 2-body tensors.")
+            if packed:
+                raise Exception("Packed storage only implemented for tensors of order 4 / 2-body tensors.")
             self.ordering = None
 
+        if packed and not self.is_packed:
+            self.pack()
+
+    @property
+    def elems(self):
+        """
+        Dense tensor data in the current ordering
+        Packed tensors have no dense data, densification has to be requested explicitly:
+        self.to_dense() gives a dense copy and self.unpack() switches the storage,
+        self.get_element or self.sub_lists/self.sub_str give cheap access to parts of the tensor
+        """
+        if self.is_packed:
+            raise TequilaException("NBodyTensor is stored packed: use to_dense() for a dense copy "
+                                   "or unpack() to switch to dense storage")
+        return self._elems
+
+    @elems.setter
+    def elems(self, other):
+        self._elems = other
+        self._packed_elems = None
+        self._packed_n = None
+
+    @property
+    def is_packed(self):
+        return self._packed_elems is not None
+
+    @property
+    def packed_elems(self):
+        """
+        The flat array of the symmetry unique elements (see self.pack), None for dense storage
+        same layout as the 8-fold symmetric integrals of pyscf
+        """
+        return self._packed_elems
+
     @property
     def shape(self, *args, **kwargs):
-        return self.elems.shape
+        if self.is_packed:
+            return tuple([self._packed_n] * 4)
+        return self._elems.shape
+
+    def pack(self):
+        """
+        Switch to symmetry packed storage
+        Only the elements (ij|kl) with i>=j, k>=l and ij>=kl (chem ordering) are kept in a flat array
+        Assumes real orbitals i.e. full 8-fold permutational symmetry of the two-body tensor
+
+        Returns
+        -------
+            self in packed storage (ordering is kept)
+        """
+        if self.order != 4:
+            raise TequilaException("Packed storage only implemented for two-body tensors.")
+        if self.is_packed:
+            return self
+        ordering = self.ordering
+        elems = self.reorder(to="chem").elems
+        n = elems.shape[0]
+        rows, cols = numpy.tril_indices(n)
+        # (ij|kl) for i>=j and k>=l as npair x npair matrix, then keep ij>=kl
+        pairs = elems[rows, cols][:, rows, cols]
+        prows, pcols = numpy.tril_indices(len(rows))
+        packed = numpy.ascontiguousarray(pairs[prows, pcols])
+        del pairs
+        self._elems = None
+        self._packed_elems = packed
+        self._packed_n = n
+        self.ordering = ordering
+        return self
+
+    def unpack(self):
+        """
+        Switch back to dense storage in the current ordering
+
+        Returns
+        -------
+            self in dense storage
+        """
+        if self.is_packed:
+            elems = self.to_dense()
+            ordering = self.ordering
+            self.elems = elems
+            self.ordering = ordering
+        return self
+
+    def to_dense(self, ordering=None) -> numpy.ndarray:
+        """
+        Dense tensor data without changing the storage of self
+
+        Parameters
+        ----------
+        ordering: ordering of the returned array (default is the current ordering)
+
+        Returns
+        -------
+            dense numpy.ndarray
+        """
+        if ordering is None:
+            ordering = self.ordering
+        ordering = self.Ordering(scheme=ordering)
+        if not self.is_packed:
+            return NBodyTensor(elems=self._elems, ordering=self.ordering).reorder(to=ordering).elems
+        full = [i for i in range(self._packed_n)]
+        return self._sub_lists_packed([full] * 4, ordering=ordering)
+
+    def sub_tensor(self, indices: list):
+        """
+        The tensor restricted to some orbitals (e.g. an active space), in the same ordering and storage
+
+        Parameters
+        ----------
+        indices: the orbitals to keep, in the order of the new tensor
+
+        Returns
+        -------
+            NBodyTensor with len(indices) orbitals
+        """
+        if not self.is_packed:
+            return NBodyTensor(elems=self.sub_lists([indices] * self.order), ordering=self.ordering)
+        indices = numpy.asarray(indices, dtype=int)
+        rows, cols = numpy.tril_indices(len(indices))
+        pairs = self._pair_index(indices[rows], indices[cols])
+        prows, pcols = numpy.tril_indices(len(pairs))
+        packed = self._packed_elems[self._pair_index(pairs[prows], pairs[pcols])]
+        return NBodyTensor(elems=packed, ordering=self.ordering, packed=True)
+
+    def transform(self, orbital_coefficients: numpy.ndarray, block_size: int = 2 ** 20):
+        """
+        The two-body tensor in new orbitals, in the same ordering and storage
+
+        Parameters
+        ----------
+        orbital_coefficients: C_{old,new}, the first index runs over the orbitals of self
+        block_size: packed tensors are transformed in blocks of about this many elements
+
+        Returns
+        -------
+            new NBodyTensor
+        """
+        C = orbital_coefficients
+        if not self.is_packed:
+            g = self.to_dense(ordering="chem")
+            g = numpy.einsum("ijkx, xl -> ijkl", g, C, optimize='greedy')
+            g = numpy.einsum("ijxl, xk -> ijkl", g, C, optimize='greedy')
+            g = numpy.einsum("ixkl, xj -> ijkl", g, C, optimize='greedy')
+            g = numpy.einsum("xjkl, xi -> ijkl", g, C, optimize='greedy')
+            return NBodyTensor(elems=numpy.asarray(g), ordering='chem').reorder(to=self.ordering)
+
+        # two half transformations on the pair matrix (ij|kl), the dense n^4 tensor is never built
+        # peak memory is the half transformed pair matrix (about 2x the packed tensor)
+        n = self._packed_n
+        m = C.shape[1]
+        npair = n * (n + 1) // 2
+        mpair = m * (m + 1) // 2
+        unpacked = self._pair_index(numpy.arange(n)[:, None], numpy.arange(n)[None, :])
+        rows, cols = numpy.tril_indices(m)
+        block = max(1, block_size // (n * n))
+
+        # (ij|KL) with new orbitals i,j and old pairs KL
+        half = numpy.empty([mpair, npair], dtype=numpy.result_type(self._packed_elems, C))
+        for start in range(0, npair, block):
+            kl = numpy.arange(start, min(start + block, npair))
+            columns = self._packed_elems[self._pair_index(numpy.arange(npair)[:, None], kl[None, :])]
+            t = numpy.einsum("xi, xyk, yj -> ijk", C, columns[unpacked], C, optimize='greedy')
+            half[:, start:start + len(kl)] = t[rows, cols]
+
+        # (ij|kl) only depends on the row ij of the half transformed matrix, keep kl <= ij
+        packed = numpy.empty([mpair * (mpair + 1) // 2], dtype=half.dtype)
+        for start in range(0, mpair, block):
+            ij = numpy.arange(start, min(start + block, mpair))
+            t = numpy.einsum("kxy, xi, yj -> kij", half[ij][:, unpacked], C, C, optimize='greedy')
+            t = t[:, rows, cols]
+            for k, x in enumerate(ij):
+                packed[x * (x + 1) // 2:x * (x + 1) // 2 + x + 1] = t[k, :x + 1]
+        del half
+        return NBodyTensor(elems=packed, ordering=self.ordering, packed=True)
+
+    def scale(self, factor):
+        """
+        Multiply all elements by factor, in place for dense and packed storage
+
+        Returns
+        -------
+            self
+        """
+        if self.is_packed:
+            self._packed_elems *= factor
+        else:
+            self._elems *= factor
+        return self
+
+    def get_element(self, p, q, r, s):
+        """
+        Single element of a two-body tensor in the current ordering
+        works for dense and packed storage
+
+        Returns
+        -------
+            the element elems[p,q,r,s]
+        """
+        if not self.is_packed:
+            return self._elems[p, q, r, s]
+        idx = (p, q, r, s)
+        perm = self._to_chem_axes[str(self.ordering)]
+        i, j, k, l = [idx[x] for x in perm]
+        return self._packed_elems[self._pair_index(self._pair_index(i, j), self._pair_index(k, l))]
+
+    def _sub_lists_packed(self, idx_lists, ordering=None) -> numpy.ndarray:
+        """
+        Block extraction directly from packed storage (the dense tensor is never constructed)
+        idx_lists are given with respect to the ordering (default: current ordering)
+        """
+        if ordering is None:
+            ordering = self.ordering
+        perm = self._to_chem_axes[str(self.Ordering(scheme=ordering))]
+        full = numpy.arange(self._packed_n)
+        chem_lists = []
+        for ax in perm:
+            if idx_lists[ax] is None:
+                chem_lists.append(full)
+            else:
+                chem_lists.append(numpy.asarray(idx_lists[ax], dtype=int))
+        ij = self._pair_index(chem_lists[0][:, None], chem_lists[1][None, :])
+        kl = self._pair_index(chem_lists[2][:, None], chem_lists[3][None, :])
+        block = self._packed_elems[self._pair_index(ij[:, :, None, None], kl[None, None, :, :])]
+        # chem axis k corresponds to axis perm[k] of the requested ordering
+        inverse = [perm.index(ax) for ax in range(4)]
+        return numpy.transpose(block, axes=inverse)
 
     def sub_lists(self, idx_lists: list = None) -> numpy.ndarray:
         """
@@ -767,6 +1031,9 @@ class NBodyTensor:
             raise Exception("Need to pass an index list for each dimension!" +
                             " Length of idx_lists needs to match order of tensor.")
 
+        if self.is_packed:
+            return self._sub_lists_packed(idx_lists)
+
         # Perform slicing via numpy.take
         out = self.elems
         for ax in range(self.order):
@@ -779,7 +1046,7 @@ class NBodyTensor:
         """ Set passive and full index lists based on class inputs """
         tmp_size = self._size_full
         if self._size_full is None:
-            tmp_size = self.elems.shape[0]
+            tmp_size = self.shape[0]
 
         self._passive_indices = [i for i in range(tmp_size)
                                  if i not in self.active_indices]
@@ -869,6 +1136,11 @@ class NBodyTensor:
 
         to = self.Ordering(scheme=to)
 
+        if self.is_packed:
+            # all orderings are views on the same packed elements
+            self.ordering = to
+            return self
+
         if self.ordering == to:
             return self
         elif self.ordering.is_chem():
@@ -945,7 +1217,7 @@ class IntegralManager:
                     str(E), str(type(two_body_integrals)), str(two_body_integrals.ordering)))
 
         for i in range(4):
-            assert self._one_body_integrals.shape[0] == self._two_body_integrals.elems.shape[i]
+            assert self._one_body_integrals.shape[0] == self._two_body_integrals.shape[i]
         assert self._one_body_integrals.shape[0] == self._one_body_integrals.shape[1]
 
         if overlap_integrals is None:
@@ -1117,7 +1389,9 @@ class IntegralManager:
         c = self.constant_term
         h = self._get_transformed_one_body_integrals(orbital_coefficients=orbital_coefficients)
         g = self._get_transformed_two_body_integrals(orbital_coefficients=orbital_coefficients, ordering=ordering)
-        if not ignore_active_space and self._active_space is not None:
+        if not ignore_active_space and self._active_space is not None and g.is_packed:
+            c, h, g = self._get_active_space_integrals_packed(c=c, h=h, g=g)
+        elif not ignore_active_space and self._active_space is not None:
 
             g = g.reorder(to="openfermion").elems
 
@@ -1149,17 +1423,29 @@ class IntegralManager:
         elif verify:
             assert self.verify_orbital_coefficients(orbital_coefficients=orbital_coefficients)
 
-        g = self.two_body_integrals
-        g = g.reorder("chem").elems
-        g = numpy.einsum("ijkx, xl -> ijkl", g, orbital_coefficients, optimize='greedy')
-        g = numpy.einsum("ijxl, xk -> ijkl", g, orbital_coefficients, optimize='greedy')
-        g = numpy.einsum("ixkl, xj -> ijkl", g, orbital_coefficients, optimize='greedy')
-        g = numpy.einsum("xjkl, xi -> ijkl", g, orbital_coefficients, optimize='greedy')
-        g = NBodyTensor(elems=numpy.asarray(g), ordering='chem')
+        g = self.two_body_integrals.transform(orbital_coefficients)
         g = g.reorder(to=ordering)
 
         return g
 
+    def _get_active_space_integrals_packed(self, c, h, g):
+        """
+        Same as openfermion's get_active_space_integrals for packed two-body integrals:
+        only the blocks with frozen orbitals are read and the active space integrals stay packed
+        """
+        occupied = self._active_space.frozen_reference_orbitals
+        occupied = [] if occupied is None else list(occupied)
+        active = self._active_space.active_orbitals
+        g = g.reorder(to="openfermion")
+
+        h_active = numpy.copy(h[numpy.ix_(active, active)])
+        if len(occupied) > 0:
+            g_occ = g.sub_lists([occupied] * 4)
+            c += 2 * numpy.sum(h[occupied, occupied]) + 2 * numpy.einsum("ijji", g_occ) - numpy.einsum("ijij", g_occ)
+            h_active += 2 * numpy.einsum("iuvi -> uv", g.sub_lists([occupied, active, active, occupied])) \
+                        - numpy.einsum("iuiv -> uv", g.sub_lists([occupied, active, occupied, active]))
+        return c, h_active, g.sub_tensor(active)
+
     def verify_orbital_coefficients(self, orbital_coefficients, tolerance=1.e-5):
         """
         Verify if orbital coefficients are valid (i.e. if they define a orthonormal set of orbitals)
@@ -175,9 +175,6 @@ class ExplicitCorrelationCorrection:
         if self.n_ri is None:
             self.n_ri = n_ri_max
         self.size_check(n_ri_max=n_ri_max)
-        # This assumes a f12-operator of the kind -1/gamma*exp(-gamma*r12), adjust your integrals if necessary
-        r = NBodyTensor(elems=r_elems, ordering=self.external_info["ordering"], active_indices=self.active, size_full=self.n_ri)
-        r.reorder(to="phys")
 
         # # Load coulomb-tensor elements
         # if "two_body_ordering" in self.mol.kwargs:
@@ -186,10 +183,19 @@ class ExplicitCorrelationCorrection:
         #     ordering = "openfermion"
         # g = NBodyTensor(elems=self.mol.molecule.two_body_integrals, ordering=ordering,
         #                 active_indices=self.active, size_full=self.n_ri)
+        # packed integrals of the molecule stay packed
         c,h,g = self.mol.integral_manager.get_integrals(ignore_active_space=True)
-        g = NBodyTensor(elems=g.elems, ordering=g.ordering, active_indices=self.active, size_full=self.n_ri)
+        g = NBodyTensor(elems=g.packed_elems if g.is_packed else g.elems, ordering=g.ordering, packed=g.is_packed,
+                        active_indices=self.active, size_full=self.n_ri)
         g.reorder(to="phys")
 
+        # This assumes a f12-operator of the kind -1/gamma*exp(-gamma*r12), adjust your integrals if necessary
+        # the f12-integrals have the same permutational symmetry and are packed along with the coulomb integrals
+        r = NBodyTensor(elems=r_elems, ordering=self.external_info["ordering"], active_indices=self.active,
+                        size_full=self.n_ri, packed=g.is_packed)
+        del r_elems
+        r.reorder(to="phys")
+
         # Load one-body tensor
         h = NBodyTensor(elems=h, active_indices=self.active, size_full=self.n_ri)
 
@@ -70,7 +70,7 @@ class ExplicitCorrelationCorrectionMadness(ExplicitCorrelationCorrection):
 
         h, g, r = super().setup_tensors_external()
         # Assuming a f12-operator of the kind exp(-gamma*r12)
-        r.elems *= -1 / self.gamma
+        r.scale(-1 / self.gamma)
 
         return h, g, r
 
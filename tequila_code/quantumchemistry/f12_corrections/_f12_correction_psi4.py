@@ -102,7 +102,7 @@ class ExplicitCorrelationCorrectionPsi4(ExplicitCorrelationCorrection):
         r_elems = numpy.asarray(mints.mo_f12(correlationFactor, C_RI, C_RI, C_RI, C_RI))
         r = NBodyTensor(elems=r_elems, ordering="chem", active_indices=self.active, size_full=self.n_ri)
         r.reorder(to="phys")
-        r.elems /= self.gamma  # ensure that f_12 = -1/gamma * exp(-gamma*r)
+        r.scale(1 / self.gamma)  # ensure that f_12 = -1/gamma * exp(-gamma*r)
 
         # Load Coulomb matrix elements
         if "two_body_ordering" in self.mol.kwargs:
@@ -261,7 +261,7 @@ class ExplicitCorrelationCorrectionPsi4(ExplicitCorrelationCorrection):
 
         r = NBodyTensor(elems=r_elems, ordering="chem", active_indices=self.active, size_full=self.n_ri)
         r.reorder(to="phys")
-        r.elems /= self.gamma  # ensure that f_12 = -1/gamma * exp(-gamma*r)
+        r.scale(1 / self.gamma)  # ensure that f_12 = -1/gamma * exp(-gamma*r)
 
         g = NBodyTensor(elems=g_elems, ordering="chem", active_indices=self.active, size_full=self.n_ri)
         g.reorder(to="phys")
@@ -87,7 +87,9 @@ class QuantumChemistryPySCF(QuantumChemistryBase):
         c, h1, h2 = self.get_integrals(ordering="chem")
         norb = self.n_orbitals
         nelec = self.n_electrons
-        e, fcivec = fci.direct_spin1.kernel(h1, h2.elems, norb, nelec, **kwargs)
+        # packed integrals are in the 8-fold symmetric layout of pyscf
+        eri = h2.packed_elems if h2.is_packed else h2.elems
+        e, fcivec = fci.direct_spin1.kernel(h1, eri, norb, nelec, **kwargs)
         return e + c
 
     def compute_energy(self, method: str, *args, **kwargs) -> float:
@@ -127,7 +129,7 @@ class QuantumChemistryPySCF(QuantumChemistryBase):
         hf = pyscf.scf.RHF(pyscf_mol)
         hf.get_hcore = lambda *args: h1
         hf.get_ovlp = lambda *args: numpy.eye(norb)
-        hf._eri = pyscf.ao2mo.restore(8, h2.elems, norb)
+        hf._eri = pyscf.ao2mo.restore(8, h2.packed_elems if h2.is_packed else h2.elems, norb)
 
         if do_not_solve:
             hf.mo_coeff = mo_coeff
@@ -499,6 +499,7 @@ class QuantumChemistryBase:
         - one_body_integrals as matrix
         - two_body_integrals as NBTensor of numpy.ndarray (four indices, openfermion ordering)
         - nuclear_repulsion (constant part of hamiltonian - optional)
+        - pack_integrals (store two_body_integrals in symmetry packed form - optional, assumes real orbitals)
 
         Method sets:
         - result of self.get_integrals()
@@ -524,6 +525,10 @@ class QuantumChemistryBase:
             two_body_integrals = NBodyTensor(two_body_integrals, ordering=ordering)
 
         two_body_integrals = two_body_integrals.reorder(to="chem")
+        if "pack_integrals" in kwargs:
+            if kwargs["pack_integrals"]:
+                two_body_integrals = two_body_integrals.pack()
+            kwargs.pop("pack_integrals")
 
         constant_part = 0.0
         if "constant_term" in kwargs:
@@ -636,7 +641,7 @@ class QuantumChemistryBase:
         molecule = MolecularData(**self.parameters.molecular_data_param)
 
         molecule.one_body_integrals = one_body_integrals
-        molecule.two_body_integrals = two_body_integrals.elems
+        molecule.two_body_integrals = two_body_integrals.to_dense()
         molecule.nuclear_repulsion = constant_term
         molecule.n_orbitals = n_orbitals
         if "n_electrons" in kwargs:
@@ -776,14 +781,11 @@ class QuantumChemistryBase:
         # integrate with QubitEncoding at some point
         n_orbitals = self.n_orbitals
         c, obt, tbt = self.get_integrals()
-        h = numpy.zeros(shape=[n_orbitals] * 2)
-        g = numpy.zeros(shape=[n_orbitals] * 2)
-        for p in range(n_orbitals):
-            h[p, p] += 2 * obt[p, p]
-            for q in range(n_orbitals):
-                h[p, q] += + tbt.elems[p, p, q, q]
-                if p != q:
-                    g[p, q] += 2 * tbt.elems[p, q, q, p] - tbt.elems[p, q, p, q]
+        # only the needed diagonals are read (works for dense and packed storage)
+        p, q = numpy.indices([n_orbitals, n_orbitals])
+        h = numpy.diag(2 * numpy.diag(obt)) + tbt.get_element(p, p, q, q)
+        g = 2 * tbt.get_element(p, q, q, p) - tbt.get_element(p, q, p, q)
+        numpy.fill_diagonal(g, 0.0)
 
         H = c
         for p in range(n_orbitals):
@@ -1582,7 +1584,7 @@ class QuantumChemistryBase:
                 tmp = h[k,l]
                 for ii in self.reference_orbitals:
                     i = ii.idx
-                    tmp += (2.0*g.elems[k, i, l, i] - g.elems[k, i, i, l])
+                    tmp += (2.0*g.get_element(k, i, l, i) - g.get_element(k, i, i, l))
                 F[k, l] = tmp
         return F
 
@@ -1611,7 +1613,9 @@ class QuantumChemistryBase:
         nocc = len(self.reference_orbitals)
         ei = fi[:nocc]
         ai = fi[nocc:]
-        abgij = g.elems[nocc:, nocc:, :nocc, :nocc]
+        occ = list(range(nocc))
+        virt = list(range(nocc, g.shape[0]))
+        abgij = g.sub_lists([virt, virt, occ, occ])
         amplitudes = abgij * 1.0 / (
                 ei.reshape(1, 1, -1, 1) + ei.reshape(1, 1, 1, -1) - ai.reshape(-1, 1, 1, 1) - ai.reshape(1, -1, 1, 1))
 
@@ -1644,7 +1648,6 @@ class QuantumChemistryBase:
         self.is_closed_shell(verify=True)
         c, h, g = self.get_integrals()
         g.reorder(to="openfermion")
-        g = g.elems
         fij = self.compute_fock_matrix()
         self.is_canonical(verify=True, fock_matrix=fij)
         fij = numpy.diag(fij)
@@ -1664,7 +1667,7 @@ class QuantumChemistryBase:
             for yy, y in enumerate(pairs):
                 b, j = y
                 delta = float(y == x)
-                gpart = 2.0 * g[a, i, b, j] - g[a, i, j, b]
+                gpart = 2.0 * g.get_element(a, i, b, j) - g.get_element(a, i, j, b)
                 M[xx, yy] = eia * delta + gpart
 
         omega, xvecs = numpy.linalg.eigh(M)
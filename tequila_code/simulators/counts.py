@@ -0,0 +1,259 @@
+"""
+Compact representation of sampling results
+
+The measured bitstrings are kept as integers (numpy uint64, first read out qubit is the most significant bit)
+in one array and their counts in a parallel array, instead of a QubitWaveFunction with one BitString per outcome.
+Expectationvalues of measured paulistrings are evaluated directly on the arrays.
+Sampling a circuit (BackendCircuit.sample, tq.simulate) converts the counts to a QubitWaveFunction,
+BackendCircuit.sample_counts returns them as they are.
+"""
+import typing
+import numpy
+
+from tequila.utils.exceptions import TequilaException
+from tequila.utils.bitstrings import BitNumbering, BitString
+from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
+
+
+def bit_parity(values: numpy.ndarray) -> numpy.ndarray:
+    """
+    parity of the set bits of non-negative integers (up to 64 bits)
+    """
+    values = values.copy()
+    for shift in [32, 16, 8, 4, 2, 1]:
+        values ^= values >> values.dtype.type(shift)
+    return values & values.dtype.type(1)
+
+
+def _reverse_bits(values: numpy.ndarray, n_bits: int) -> numpy.ndarray:
+    result = numpy.zeros_like(values)
+    for i in range(n_bits):
+        result |= ((values >> numpy.uint64(i)) & numpy.uint64(1)) << numpy.uint64(n_bits - 1 - i)
+    return result
+
+
+class Counts:
+    """
+    Counts of sampled bitstrings, stored as parallel arrays.
+
+    Used internally by the backends and expectationvalues, sampling a circuit (BackendCircuit.sample, tq.simulate)
+    still returns the QubitWaveFunction of counts created by to_wavefunction.
+    Reading access works like for that QubitWaveFunction (items, indexing, printing),
+    all other public attributes are taken from it.
+
+    Attributes
+    ----------
+    outcomes:
+        the measured bitstrings as sorted unique integers (most significant bit is the first read out qubit)
+    counts:
+        how often each outcome was measured
+    n_qubits:
+        the number of measured qubits (bits of the outcomes)
+
+    Methods
+    -------
+    from_samples:
+        count the rows of an array of measured bits.
+    from_dict:
+        count from a dictionary of binary strings or integers.
+    from_wavefunction:
+        convert a QubitWaveFunction of counts.
+    select:
+        the counts of a subset of the bits.
+    expectation:
+        the average parity of some bits, the expectationvalue of the Pauli-Z operators on them.
+    to_wavefunction:
+        the counts as QubitWaveFunction.
+    """
+
+    def __init__(self, outcomes, counts, n_qubits: int, numbering: BitNumbering = BitNumbering.MSB):
+        """
+        Parameters
+        ----------
+        outcomes:
+            the measured bitstrings as integers, can contain duplicates.
+        counts:
+            how often each outcome was measured.
+        n_qubits:
+            the number of measured qubits.
+        numbering:
+            the bit order of outcomes, LSB integers are reversed.
+        """
+        if n_qubits > 64:
+            raise TequilaException("Counts can only store outcomes of up to 64 qubits, received {}".format(n_qubits))
+        outcomes = numpy.asarray(outcomes, dtype=numpy.uint64).reshape([-1])
+        counts = numpy.asarray(counts, dtype=numpy.int64).reshape([-1])
+        if numbering == BitNumbering.LSB:
+            outcomes = _reverse_bits(outcomes, n_qubits)
+        outcomes, inverse = numpy.unique(outcomes, return_inverse=True)
+        summed = numpy.zeros(len(outcomes), dtype=numpy.int64)
+        numpy.add.at(summed, inverse.reshape([-1]), counts)
+        nonzero = summed != 0
+        self.outcomes = outcomes[nonzero]
+        self.counts = summed[nonzero]
+        self.n_qubits = int(n_qubits)
+        self._wavefunction = None
+
+    @classmethod
+    def from_samples(cls, samples: numpy.ndarray, numbering: BitNumbering = BitNumbering.MSB):
+        """
+        Count measured bits.
+
+        Parameters
+        ----------
+        samples:
+            array of shape (shots, qubits), one row of measured bits per shot.
+        numbering:
+            the bit order of the rows (MSB: the first column is the first qubit).
+        """
+        samples = numpy.asarray(samples).astype(numpy.uint64)
+        if samples.ndim == 1:
+            samples = samples.reshape([-1, 1])
+        n_qubits = samples.shape[1]
+        outcomes = numpy.zeros(samples.shape[0], dtype=numpy.uint64)
+        for j in range(n_qubits):
+            outcomes = (outcomes << numpy.uint64(1)) | samples[:, j]
+        return cls(outcomes=outcomes, counts=numpy.ones(samples.shape[0], dtype=numpy.int64), n_qubits=n_qubits,
+                   numbering=numbering)
+
+    @classmethod
+    def from_dict(cls, counts: dict, n_qubits: int = None, numbering: BitNumbering = BitNumbering.MSB):
+        """
+        Counts from a dictionary with binary strings (like '0110') or integers as keys.
+
+        Parameters
+        ----------
+        counts:
+            the dictionary outcome: count.
+        n_qubits:
+            the number of measured qubits, default is the length of the binary strings.
+        numbering:
+            the bit order of the keys.
+        """
+        keys = [k.replace(" ", "") if isinstance(k, str) else k for k in counts.keys()]
+        if n_qubits is None:
+            n_qubits = max([len(k) for k in keys if isinstance(k, str)], default=0)
+        outcomes = [int(k, 2) if isinstance(k, str) else int(k) for k in keys]
+        return cls(outcomes=outcomes, counts=list(counts.values()), n_qubits=n_qubits, numbering=numbering)
+
+    @classmethod
+    def from_wavefunction(cls, wfn, n_qubits: int = None):
+        """
+        Counts from a QubitWaveFunction (or dictionary) with BitString keys and counts as values.
+        """
+        if isinstance(wfn, Counts):
+            return wfn
+        keys = [BitString.from_bitstring(other=k) for k, v in wfn.items()]
+        if n_qubits is None:
+            n_qubits = max([k.nbits for k in keys], default=0)
+        return cls(outcomes=[k.integer for k in keys], counts=[int(v.real) if hasattr(v, "real") else int(v)
+                                                                for k, v in wfn.items()], n_qubits=n_qubits)
+
+    @property
+    def samples(self) -> int:
+        """
+        total number of samples
+        """
+        return int(numpy.sum(self.counts))
+
+    def mask(self, positions: typing.Iterable[int]) -> int:
+        """
+        integer with the bits at the given positions set (position 0 is the first qubit)
+        """
+        mask = 0
+        for p in positions:
+            mask |= 1 << (self.n_qubits - 1 - p)
+        return mask
+
+    def select(self, positions: typing.List[int], n_qubits: int = None):
+        """
+        The counts of some of the bits (the key map of a register to a subregister).
+
+        Parameters
+        ----------
+        positions:
+            the positions of the bits to keep, in the order of the new bits.
+        n_qubits:
+            interpret the outcomes as integers with this number of bits, default is self.n_qubits.
+
+        Returns
+        -------
+        Counts:
+            with len(positions) qubits.
+        """
+        if n_qubits is None:
+            n_qubits = self.n_qubits
+        outcomes = numpy.zeros_like(self.outcomes)
+        for p in positions:
+            bit = (self.outcomes >> numpy.uint64(n_qubits - 1 - p)) & numpy.uint64(1)
+            outcomes = (outcomes << numpy.uint64(1)) | bit
+        return Counts(outcomes=outcomes, counts=self.counts, n_qubits=len(positions))
+
+    def expectation(self, positions: typing.Iterable[int] = None) -> float:
+        """
+        The average parity (+1 or -1) of the bits at the given positions,
+        the expectationvalue of the product of Pauli-Z operators on these qubits.
+
+        Parameters
+        ----------
+        positions:
+            the positions of the bits (0 is the first qubit), default are all bits.
+        """
+        if positions is None:
+            positions = range(self.n_qubits)
+        mask = numpy.uint64(self.mask(positions))
+        signs = 1 - 2 * bit_parity(self.outcomes & mask).astype(numpy.int64)
+        return float(numpy.sum(signs * self.counts)) / self.samples
+
+    def to_wavefunction(self) -> QubitWaveFunction:
+        """
+        The counts as QubitWaveFunction with BitString keys, created on the first call.
+        """
+        if self._wavefunction is None:
+            wfn = QubitWaveFunction()
+            for key, count in self.items():
+                wfn._state[key] = count
+            self._wavefunction = wfn
+        return self._wavefunction
+
+    def items(self):
+        for outcome, count in zip(self.outcomes, self.counts):
+            yield BitString.from_int(integer=int(outcome), nbits=self.n_qubits), int(count)
+
+    def keys(self):
+        return [key for key, count in self.items()]
+
+    def values(self):
+        return [int(count) for count in self.counts]
+
+    def __getitem__(self, key) -> int:
+        if hasattr(key, "integer"):
+            key = BitString.from_bitstring(other=key).integer
+        i = numpy.searchsorted(self.outcomes, numpy.uint64(key))
+        if i < len(self.outcomes) and self.outcomes[i] == key:
+            return int(self.counts[i])
+        return 0
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, Counts):
+            return self.n_qubits == other.n_qubits and numpy.array_equal(self.outcomes, other.outcomes) \
+                and numpy.array_equal(self.counts, other.counts)
+        return self.to_wavefunction() == other
+
+    def __getattr__(self, name):
+        # everything else is taken from the QubitWaveFunction
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.to_wavefunction(), name)
+
+    def __str__(self):
+        return str(self.to_wavefunction())
+
+    def __repr__(self):
+        return "Counts({} qubits, {} samples, {} outcomes)".format(self.n_qubits, self.samples, len(self))
@@ -0,0 +1,307 @@
+"""
+Process pool execution of independent compiled expectation values
+
+The expectation values of a compiled objective (or of all entries of a QTensor) are distributed once
+over a set of persistent worker processes. Every worker compiles its expectation values when it is started,
+afterwards only the variables are sent for each evaluation.
+"""
+import multiprocessing
+import time
+import traceback
+import typing
+import numpy
+
+from tequila.utils.exceptions import TequilaException
+from tequila.objective import format_variable_dictionary
+from tequila.simulators.simulator_base import BackendExpectationValue
+
+
+def _pool_worker(connection, expectationvalues: dict):
+    """
+    Main loop of a worker process
+
+    Parameters
+    ----------
+    connection:
+        worker end of the pipe to the pool
+    expectationvalues:
+        dictionary with index: (BackendExpectationValue type, abstract expectationvalue, compile arguments)
+    """
+    try:
+        start = time.perf_counter()
+        compiled = {}
+        for i, (ExpValueType, E, input_args) in expectationvalues.items():
+            compiled[i] = ExpValueType(E, **input_args)
+        connection.send(("ready", time.perf_counter() - start))
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+        return
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        variables, samples, kwargs = message
+        try:
+            results = {}
+            timings = {}
+            for i, E in compiled.items():
+                start = time.perf_counter()
+                results[i] = E(variables=variables, samples=samples, **kwargs)
+                timings[i] = time.perf_counter() - start
+            connection.send(("result", results, timings))
+        except Exception:
+            connection.send(("error", traceback.format_exc()))
+    connection.close()
+
+
+class ExpectationValuePool:
+    """
+    Persistent process pool for independent compiled expectation values
+
+    The expectation values are assigned to the workers once (balanced by an estimate of their cost)
+    and compiled in the workers on startup. Evaluations only ship the variables,
+    results are always returned in the order of the expectation values given on initialization.
+
+    Attributes
+    ----------
+    expectationvalues:
+        the compiled expectation values handled by the pool
+    n_workers:
+        number of worker processes
+    assignment:
+        list with the indices of the expectation values handled by each worker
+    """
+
+    def __init__(self, expectationvalues: typing.List[BackendExpectationValue], n_workers: int = None,
+                 context: str = None):
+        """
+        Parameters
+        ----------
+        expectationvalues:
+            list of compiled expectation values (BackendExpectationValue)
+        n_workers:
+            number of worker processes, default is the number of cpus (at most one per expectation value)
+        context:
+            multiprocessing start method ('fork', 'spawn', 'forkserver'), default is 'fork' where available
+            other start methods need picklable circuits and hamiltonians (no lambdas in the transformations)
+        """
+        for E in expectationvalues:
+            if not isinstance(E, BackendExpectationValue):
+                raise TequilaException(
+                    "ExpectationValuePool needs compiled expectation values, received {}".format(type(E)))
+        self.expectationvalues = list(expectationvalues)
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        self.n_workers = max(1, min(n_workers, len(self.expectationvalues)))
+
+        # greedy balancing: most expensive expectation values first, each to the least loaded worker
+        costs = [self.estimate_cost(E) for E in self.expectationvalues]
+        loads = [0.0] * self.n_workers
+        self.assignment = [[] for _ in range(self.n_workers)]
+        for i in sorted(range(len(costs)), key=lambda x: -costs[x]):
+            worker = loads.index(min(loads))
+            self.assignment[worker].append(i)
+            loads[worker] += costs[i]
+
+        if context is None and "fork" in multiprocessing.get_all_start_methods():
+            context = "fork"
+        ctx = multiprocessing.get_context(context)
+        self._connections = []
+        self._processes = []
+        self._statistics = []
+        for indices in self.assignment:
+            payload = {i: (type(self.expectationvalues[i]), self.expectationvalues[i].abstract_expectationvalue,
+                           self.expectationvalues[i]._input_args) for i in indices}
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_pool_worker, args=(child, payload), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+            self._statistics.append({"expectationvalues": list(indices), "compile_time": None, "calls": 0,
+                                     "time": 0.0, "times": {i: 0.0 for i in indices}})
+
+        for k, connection in enumerate(self._connections):
+            message = connection.recv()
+            if message[0] == "error":
+                self.close()
+                raise TequilaException("ExpectationValuePool: worker {} failed to compile:\n{}".format(k, message[1]))
+            self._statistics[k]["compile_time"] = message[1]
+
+    @staticmethod
+    def estimate_cost(E: BackendExpectationValue) -> float:
+        """
+        rough cost estimate of an expectation value: number of gates times number of hamiltonian terms
+        """
+        abstract = E.abstract_expectationvalue
+        n_terms = sum([len(H) for H in abstract.H])
+        return float(max(1, len(abstract.U.gates)) * max(1, n_terms))
+
+    def __call__(self, variables, samples: int = None, *args, **kwargs) -> list:
+        """
+        Evaluate all expectation values in parallel
+
+        Parameters
+        ----------
+        variables:
+            the variables for the evaluation
+        samples:
+            number of samples (None for full wavefunction simulation)
+        kwargs:
+            passed down to the individual expectation values
+
+        Returns
+        -------
+            list of results in the order of self.expectationvalues
+        """
+        if self._connections is None:
+            raise TequilaException("ExpectationValuePool was already closed")
+        variables = format_variable_dictionary(variables)
+        for connection in self._connections:
+            connection.send((variables, samples, kwargs))
+
+        results = [None] * len(self.expectationvalues)
+        errors = []
+        for k, connection in enumerate(self._connections):
+            message = connection.recv()
+            if message[0] == "error":
+                errors.append("worker {}:\n{}".format(k, message[1]))
+                continue
+            statistics = self._statistics[k]
+            statistics["calls"] += 1
+            for i, value in message[1].items():
+                results[i] = value
+                statistics["times"][i] += message[2][i]
+                statistics["time"] += message[2][i]
+        if len(errors) > 0:
+            raise TequilaException("ExpectationValuePool: evaluation failed in\n{}".format("\n".join(errors)))
+        return results
+
+    @property
+    def statistics(self) -> typing.List[dict]:
+        """
+        per worker statistics: assigned expectation values, compile time, number of calls,
+        accumulated evaluation time (total and per expectation value)
+        """
+        return self._statistics
+
+    def print_statistics(self):
+        for k, s in enumerate(self._statistics):
+            print("worker {:3} : {:4} expectation values, compiled in {:8.4f}s, {:6} calls, {:10.4f}s evaluating".format(
+                k, len(s["expectationvalues"]), s["compile_time"], s["calls"], s["time"]))
+
+    def close(self):
+        if self._connections is None:
+            return
+        for connection in self._connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        self._connections = None
+        self._processes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ParallelObjective:
+    """
+    Evaluates a compiled objective (or an array of compiled objectives like a QTensor)
+    with all of its distinct expectation values computed in parallel by an ExpectationValuePool
+
+    Attributes
+    ----------
+    objectives:
+        flat list of the compiled objectives
+    pool:
+        the ExpectationValuePool evaluating the distinct expectation values
+    """
+
+    def __init__(self, objective, n_workers: int = None, context: str = None):
+        """
+        Parameters
+        ----------
+        objective:
+            compiled Objective or array (QTensor) of compiled Objectives
+        n_workers:
+            number of worker processes, see ExpectationValuePool
+        context:
+            multiprocessing start method, see ExpectationValuePool
+        """
+        self._shape = None
+        if hasattr(objective, "shape") and not hasattr(objective, "args"):
+            self._shape = numpy.shape(objective)
+            self.objectives = list(numpy.asarray(objective).reshape([-1]))
+        else:
+            self.objectives = [objective]
+
+        # distinct expectation values over all objectives
+        expectationvalues = []
+        index = {}
+        for objective in self.objectives:
+            for arg in objective.args:
+                if isinstance(arg, BackendExpectationValue) and id(arg) not in index:
+                    index[id(arg)] = len(expectationvalues)
+                    expectationvalues.append(arg)
+                elif hasattr(arg, "U") and not isinstance(arg, BackendExpectationValue):
+                    raise TequilaException("ParallelObjective needs a compiled objective, use tq.compile first")
+        self._index = index
+        self.pool = ExpectationValuePool(expectationvalues=expectationvalues, n_workers=n_workers, context=context)
+
+    def extract_variables(self):
+        variables = []
+        for objective in self.objectives:
+            variables += [v for v in objective.extract_variables() if v not in variables]
+        return variables
+
+    def __call__(self, variables=None, samples: int = None, *args, **kwargs):
+        variables = format_variable_dictionary(variables)
+        expvals = self.pool(variables=variables, samples=samples, *args, **kwargs)
+
+        results = []
+        for objective in self.objectives:
+            evaluated = []
+            for arg in objective.args:
+                if id(arg) in self._index:
+                    evaluated.append(expvals[self._index[id(arg)]])
+                else:
+                    evaluated.append(arg(variables=variables))
+            result = numpy.asarray(objective.transformation(*evaluated))
+            if result.shape == ():
+                result = float(result)
+            elif len(result) == 1:
+                result = result[0]
+            results.append(result)
+
+        if self._shape is None:
+            return results[0]
+        return numpy.asarray(results).reshape(self._shape)
+
+    @property
+    def statistics(self):
+        return self.pool.statistics
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,152 @@
+"""
+Variance aware distribution of a shot budget over the measurements of an expectation value
+
+Pass a ShotAllocator as samples, e.g. tq.simulate(E, variables, samples=ShotAllocator(total_samples=10000)).
+Every measurement (a paulistring, or a group of commuting paulistrings measured together) gets shots
+proportional to its standard deviation, which minimizes the variance of the estimated energy for the given budget.
+The standard deviations are estimated from the results of previous evaluations (e.g. optimization iterations).
+"""
+import typing
+import numpy
+
+from tequila.utils.exceptions import TequilaException
+
+
+class ShotAllocator:
+    """
+    Distributes a total number of samples over the measurements of expectation values.
+
+    A measurement of norm L (sum of the absolute coefficients of the measured paulistrings) and mean E
+    has a variance of at most L^2 - E^2, which is exact for single paulistrings and used as estimate for groups.
+    Measurements which were not evaluated yet are assigned the largest variance L^2.
+    Before estimating the variance, a mean sampled with n shots is shrunk to E n / (n + 2) (rule of succession,
+    a flat prior blended in by the number of shots): a measurement whose shots all agreed keeps a variance
+    of about 4 L^2 / n, so it is not starved at min_samples and the predicted standard error does not vanish.
+    Allocator state is kept per expectation value, so one allocator can be used for a whole objective,
+    each expectation value receives the full budget.
+
+    Attributes
+    ----------
+    total_samples:
+        the number of samples distributed over the measurements of one expectation value.
+    min_samples:
+        the smallest number of samples for a measurement.
+    memory:
+        weight of the previous variance estimates when updating them (0.0 only uses the latest evaluation).
+    standard_error:
+        the predicted standard error of the last evaluated expectation value.
+    history:
+        list of the predicted standard errors of all evaluations.
+    """
+
+    def __init__(self, total_samples: int, min_samples: int = 1, memory: float = 0.0):
+        """
+        Parameters
+        ----------
+        total_samples:
+            the number of samples for each expectation value.
+        min_samples:
+            the smallest number of samples for a measurement.
+        memory:
+            weight of previous variance estimates, between 0.0 and 1.0.
+        """
+        if min_samples < 1:
+            raise TequilaException("ShotAllocator needs min_samples >= 1, received {}".format(min_samples))
+        if not 0.0 <= memory < 1.0:
+            raise TequilaException("ShotAllocator needs 0 <= memory < 1, received {}".format(memory))
+        self.total_samples = int(total_samples)
+        self.min_samples = int(min_samples)
+        self.memory = memory
+        self.standard_error = None
+        self.history = []
+        self._variances = {}
+
+    def variances(self, key, norms: typing.List[float]) -> numpy.ndarray:
+        """
+        The current variance estimates of the measurements of an expectation value.
+
+        Parameters
+        ----------
+        key:
+            identifies the expectation value.
+        norms:
+            the norm of each measurement (sum of the absolute coefficients).
+
+        Returns
+        -------
+        numpy.ndarray:
+            the variance estimate of each measurement.
+        """
+        norms = numpy.asarray(norms, dtype=float)
+        if key not in self._variances or len(self._variances[key]) != len(norms):
+            return norms ** 2
+        return self._variances[key]
+
+    def allocate(self, key, norms: typing.List[float]) -> typing.List[int]:
+        """
+        Distribute total_samples proportional to the standard deviations of the measurements.
+
+        Parameters
+        ----------
+        key:
+            identifies the expectation value.
+        norms:
+            the norm of each measurement (sum of the absolute coefficients).
+
+        Returns
+        -------
+        list:
+            the number of samples of each measurement, they sum up to total_samples.
+        """
+        n = len(norms)
+        if n == 0:
+            return []
+        free = self.total_samples - n * self.min_samples
+        if free < 0:
+            raise TequilaException("ShotAllocator: {} samples do not suffice for {} measurements with min_samples={}"
+                                   .format(self.total_samples, n, self.min_samples))
+        weights = numpy.sqrt(self.variances(key, norms))
+        if numpy.sum(weights) == 0.0:
+            weights = numpy.ones(n)
+        shares = free * weights / numpy.sum(weights)
+        samples = numpy.floor(shares).astype(int)
+        # largest remainders get the rest
+        rest = free - numpy.sum(samples)
+        samples[numpy.argsort(samples - shares)[:rest]] += 1
+        return [int(s) + self.min_samples for s in samples]
+
+    def update(self, key, norms: typing.List[float], values: typing.List[float],
+               samples: typing.List[int]) -> float:
+        """
+        Update the variance estimates with the results of an evaluation.
+
+        Parameters
+        ----------
+        key:
+            identifies the expectation value.
+        norms:
+            the norm of each measurement (sum of the absolute coefficients).
+        values:
+            the sampled mean of each measurement.
+        samples:
+            the number of samples of each measurement.
+
+        Returns
+        -------
+        float:
+            the predicted standard error of the expectation value.
+        """
+        norms = numpy.asarray(norms, dtype=float)
+        samples = numpy.asarray(samples, dtype=float)
+        values = numpy.asarray(values, dtype=float) * samples / (samples + 2.0)
+        measured = numpy.maximum(norms ** 2 - values ** 2, 0.0)
+        if key in self._variances and len(self._variances[key]) == len(norms):
+            measured = self.memory * self._variances[key] + (1.0 - self.memory) * measured
+        self._variances[key] = measured
+        self.standard_error = float(numpy.sqrt(numpy.sum(measured / samples)))
+        self.history.append(self.standard_error)
+        return self.standard_error
+
+    def __str__(self):
+        return "ShotAllocator with {} samples, predicted standard error {}".format(self.total_samples,
+                                                                                 self.standard_error)
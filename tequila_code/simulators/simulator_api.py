@@ -10,8 +10,8 @@ from tequila.utils.exceptions import TequilaException, TequilaWarning
 from tequila.simulators.simulator_base import BackendCircuit, BackendExpectationValue
 from tequila.circuit.noise import NoiseModel
 
-SUPPORTED_BACKENDS = ["qulacs_gpu", "qulacs",'qibo', "qiskit", "cirq", "pyquil", "symbolic", "qlm"]
-SUPPORTED_NOISE_BACKENDS = ["qiskit", 'cirq', 'pyquil'] # qulacs removed in v.1.9
+SUPPORTED_BACKENDS = ["qulacs_gpu", "qulacs",'qibo', "qiskit", "cirq", "pyquil", "symbolic", "qlm", "density_matrix"]
+SUPPORTED_NOISE_BACKENDS = ["qiskit", 'cirq', 'pyquil', "density_matrix"] # qulacs removed in v.1.9
 BackendTypes = namedtuple('BackendTypes', 'CircType ExpValueType')
 INSTALLED_SIMULATORS = {}
 INSTALLED_SAMPLERS = {}
@@ -125,6 +125,18 @@ INSTALLED_SIMULATORS["symbolic"] = BackendTypes(CircType=BackendCircuitSymbolic,
                                                 ExpValueType=BackendExpectationValueSymbolic)
 HAS_SYMBOLIC = True
 
+# pure numpy, always available; the only backend computing noisy expectationvalues without samples
+from tequila.simulators.simulator_density_matrix import BackendCircuitDensityMatrix, \
+    BackendExpectationValueDensityMatrix
+
+INSTALLED_SIMULATORS["density_matrix"] = BackendTypes(CircType=BackendCircuitDensityMatrix,
+                                                      ExpValueType=BackendExpectationValueDensityMatrix)
+INSTALLED_SAMPLERS["density_matrix"] = BackendTypes(CircType=BackendCircuitDensityMatrix,
+                                                    ExpValueType=BackendExpectationValueDensityMatrix)
+INSTALLED_NOISE_SAMPLERS["density_matrix"] = BackendTypes(CircType=BackendCircuitDensityMatrix,
+                                                          ExpValueType=BackendExpectationValueDensityMatrix)
+HAS_DENSITY_MATRIX = True
+
 
 def show_available_simulators():
     """ """
@@ -182,10 +194,11 @@ def pick_backend(backend: str = None, samples: int = None, noise: NoiseModel = N
                     return f
         else:
             if samples is None:
-                raise TequilaException(
-                    "Noise requires sampling; please provide a positive, integer value for samples")
+                # exact noisy simulation
+                return "density_matrix"
             for f in SUPPORTED_NOISE_BACKENDS:
-                return f
+                if f in INSTALLED_NOISE_SAMPLERS:
+                    return f
             raise TequilaException(
                             'Could not find any installed sampler!')
 
@@ -242,7 +255,8 @@ def compile_objective(objective: typing.Union['Objective'],
     backend: str, optional:
         the backend to compile the objective to.
     samples: int, optional:
-        only matters if not None; compile the objective for sampling/verify backend can do so
+        only matters if not None; compile the objective for sampling/verify backend can do so,
+        the measurement circuits of the expectationvalues are built right away
     device: optional:
         the device on which the objective should (perhaps emulatedly) sample.
     noise: str or NoiseModel, optional:
@@ -286,7 +300,8 @@ def compile_objective(objective: typing.Union['Objective'],
         for arg in argset:
             if hasattr(arg, "H") and hasattr(arg, "U") and not isinstance(arg, BackendExpectationValue):
                 if arg not in expectationvalues:
-                    compiled_expval = ExpValueType(arg, variables=variables, noise=noise, device=device, *args, **kwargs)
+                    compiled_expval = ExpValueType(arg, variables=variables, noise=noise, device=device,
+                                                   samples=samples, *args, **kwargs)
                     expectationvalues[arg] = compiled_expval
                 else:
                     compiled_expval = expectationvalues[arg]
@@ -511,6 +526,9 @@ def compile(objective: typing.Union['Objective', 'QCircuit', 'QTensor'],
         the noise model to apply to the objective or QCircuit.
     device: optional:
         a device on which (or in emulation of which) to sample the circuit.
+    n_workers: int, optional:
+        only for objectives and QTensors: evaluate the distinct expectation values in parallel
+        on a persistent pool of n_workers processes (see tequila.simulators.execution_pool.ParallelObjective)
     Returns
     -------
     simulators.BackendCircuit or Objective
@@ -518,6 +536,14 @@ def compile(objective: typing.Union['Objective', 'QCircuit', 'QTensor'],
 
     """
 
+    if "n_workers" in kwargs:
+        n_workers = kwargs.pop("n_workers")
+        compiled = compile(objective, variables, samples, backend, noise, device, *args, **kwargs)
+        if n_workers is None or not (isinstance(objective, QTensor) or hasattr(objective, "args")):
+            return compiled
+        from tequila.simulators.execution_pool import ParallelObjective
+        return ParallelObjective(objective=compiled, n_workers=n_workers)
+
     backend = pick_backend(backend=backend, noise=noise, samples=samples, device=device)
 
     if variables is not None:
@@ -7,6 +7,8 @@ from tequila.circuit.compiler import change_basis
 from tequila import BitString
 from tequila.objective.objective import Variable, format_variable_dictionary
 from tequila.circuit import compiler
+from tequila.simulators.shot_allocation import ShotAllocator
+from tequila.simulators.counts import Counts
 
 import numbers, typing, numpy, copy, warnings
 
@@ -18,6 +20,9 @@ Todo: Classes are now immutable:
        - Maybe only keep paulistrings and not full hamiltonian types
 """
 
+# backend noise channels (channel objects, kraus tensors) shared by all circuits, see BackendCircuit.noise_channel
+_noise_channels = {}
+
 
 class BackendCircuit():
     """
@@ -37,6 +42,8 @@ class BackendCircuit():
         dictionary of arguments for compilation needed for chosen backend. Overwritten by inheritors.
     device:
         instantiated device (or None) for executing circuits.
+    measurement_circuits:
+        cache of the measurement circuits, built once per basis change, see measurement_circuit.
     n_qubits:
         the number of qubits this circuit operates on.
     noise:
@@ -69,12 +76,26 @@ class BackendCircuit():
         overwrite the saved values of variables for backend execution.
     simulate:
         perform simulation, simulated sampling, or execute the circuit, e.g. with some hamiltonian for measurement.
+    simulate_sweep:
+        simulate the circuit for a list of variable assignments.
     sample_paulistring:
         sample a circuit with one paulistring of a larger hamiltonian
+    sample_paulistrings:
+        sample a circuit with several paulistrings, the measurement circuits are passed to do_sample_batch at once.
+    measurement_circuit:
+        the backend circuit measuring one paulistring (basis change and measurement).
+    compile_measurements:
+        build the measurement circuits of several paulistrings in advance.
+    basis_change:
+        the abstract circuit rotating the measured axes of a paulistring to Z.
     sample:
         sample a circuit, measuring an entire hamiltonian.
+    sample_sweep:
+        sample a circuit for a list of variable assignments.
     do_sample:
         subroutine for sampling. must be overwritten by inheritors.
+    do_sample_batch:
+        subroutine for sampling several circuits, override to submit them in a single backend call.
     do_simulate:
         subroutine for wavefunction simulation. must be overwritten by inheritors.
     convert_measurements:
@@ -83,6 +104,8 @@ class BackendCircuit():
         create a dictionary to map the tequila qubit ordering to the backend qubits.
     optimize_circuit:
         use backend features to improve circuit depth.
+    noise_channel:
+        the backend channel of a noise, built once and shared by all circuits with the same noise.
     extract_variables:
         return a list of the variables in the abstract tequila circuit this backend circuit corresponds to.
     """
@@ -159,6 +182,7 @@ class BackendCircuit():
 
         self.no_translation = False
         self._variables = tuple(abstract_circuit.extract_variables())
+        self.measurement_circuits = {}
 
         compiler_arguments = self.compiler_arguments
         if noise is not None:
@@ -321,6 +345,31 @@ class BackendCircuit():
     def initialize_circuit(self, *args, **kwargs):
         raise TequilaException("Backend Handler needs to be overwritten for supported simulators")
 
+    def noise_channel(self, noise, build: typing.Callable, *args):
+        """
+        The backend representation of a noise (channel objects, kraus tensors, ...).
+        It is built once for each backend type, noise (name, probs, level) and further arguments,
+        and reused by all circuits compiled with the same noise (e.g. all circuits of a gradient).
+        Only cache immutable objects or objects the backend copies when they are added to a circuit.
+
+        Parameters
+        ----------
+        noise:
+            the QuantumNoise (or NoiseModel), identified by its key.
+        build: typing.Callable:
+            called as build(noise, *args) if the channel is not cached yet.
+        args:
+            hashable further arguments of build, part of the key (e.g. the qubit of a channel).
+
+        Returns
+        -------
+            the (cached) result of build
+        """
+        key = (type(self).__name__, noise.key) + tuple(args)
+        if key not in _noise_channels:
+            _noise_channels[key] = build(noise, *args)
+        return _noise_channels[key]
+
     def update_variables(self, variables):
         """
         This is the default, which just translates the circuit again.
@@ -375,9 +424,33 @@ class BackendCircuit():
 
         return result
 
-    def sample(self, variables, samples, read_out_qubits=None, circuit=None, *args, **kwargs):
+    def simulate_sweep(self, variables: list, initial_state=0, *args, **kwargs) -> typing.List[QubitWaveFunction]:
+        """
+        simulate the circuit for several variable assignments.
+        The default simulates them one after the other,
+        backends supporting parameter sweeps override this to share the circuit preparation.
+
+        Parameters
+        ----------
+        variables: list:
+            the variable assignments (dictionaries) to simulate the circuit with.
+        initial_state: Default = 0:
+            the initial state, see simulate.
+        args
+        kwargs
+
+        Returns
+        -------
+        list:
+            the wavefunction for each of the variable assignments.
+        """
+        return [self.simulate(variables=v, initial_state=initial_state, *args, **kwargs) for v in variables]
+
+    def sample(self, variables, samples, read_out_qubits=None, circuit=None, *args, **kwargs) -> QubitWaveFunction:
         """
         Sample the circuit. If circuit natively equips paulistrings, sample therefrom.
+        The counts are converted to a QubitWaveFunction right away,
+        use sample_counts to keep the compact Counts (e.g. for many distinct outcomes).
         Parameters
         ----------
         variables:
@@ -392,7 +465,21 @@ class BackendCircuit():
         Returns
         -------
         QubitWaveFunction
-            The result of sampling, a recreated QubitWaveFunction in the sampled basis.
+            The result of sampling, the counts of the measured bitstrings.
+
+        """
+        return self.sample_counts(variables=variables, samples=samples, read_out_qubits=read_out_qubits,
+                                  circuit=circuit, *args, **kwargs).to_wavefunction()
+
+    def sample_counts(self, variables, samples, read_out_qubits=None, circuit=None, *args, **kwargs) -> Counts:
+        """
+        Sample the circuit, see sample.
+        The counts are kept in the compact Counts container, used by the expectationvalues.
+
+        Returns
+        -------
+        Counts
+            The result of sampling, counts of the measured bitstrings.
 
         """
         self.update_variables(variables)
@@ -408,6 +495,57 @@ class BackendCircuit():
             circuit = self.add_measurement(circuit=circuit, target_qubits=read_out_qubits)
         return self.do_sample(samples=samples, circuit=circuit, read_out_qubits=read_out_qubits, *args, **kwargs)
 
+    def sample_sweep(self, variables: list, samples, read_out_qubits=None, *args,
+                     **kwargs) -> typing.List[QubitWaveFunction]:
+        """
+        Sample the circuit for several variable assignments.
+
+        Parameters
+        ----------
+        variables: list:
+            the variable assignments (dictionaries) to sample the circuit with.
+        samples: int:
+            the number of samples to take for each assignment.
+        read_out_qubits: optional:
+            target qubits to measure (default is all)
+        args
+        kwargs
+
+        Returns
+        -------
+        list:
+            the counts for each of the variable assignments, as QubitWaveFunction.
+        """
+        return [counts.to_wavefunction() for counts in self.sample_counts_sweep(variables=variables, samples=samples,
+                                                                                read_out_qubits=read_out_qubits,
+                                                                                *args, **kwargs)]
+
+    def sample_counts_sweep(self, variables: list, samples, read_out_qubits=None, *args,
+                            **kwargs) -> typing.List[Counts]:
+        """
+        Sample the circuit for several variable assignments, see sample_sweep.
+        The default samples them one after the other,
+        backends supporting parameter sweeps override this to share the circuit preparation.
+
+        Parameters
+        ----------
+        variables: list:
+            the variable assignments (dictionaries) to sample the circuit with.
+        samples: int:
+            the number of samples to take for each assignment.
+        read_out_qubits: optional:
+            target qubits to measure (default is all)
+        args
+        kwargs
+
+        Returns
+        -------
+        list:
+            the counts for each of the variable assignments.
+        """
+        return [self.sample_counts(variables=v, samples=samples, read_out_qubits=read_out_qubits, *args, **kwargs)
+                for v in variables]
+
     def sample_all_z_hamiltonian(self, samples: int, hamiltonian, variables, *args, **kwargs):
         """
         Sample from a Hamiltonian which only consists of Pauli-Z and unit operators
@@ -435,29 +573,51 @@ class BackendCircuit():
                                                                                                  self.n_qubits))
 
         # run simulators
-        counts = self.sample(samples=samples, read_out_qubits=abstract_qubits_H, variables=variables, *args, **kwargs)
-        read_out_map = {q: i for i, q in enumerate(abstract_qubits_H)}
+        counts = self.sample_counts(samples=samples, read_out_qubits=abstract_qubits_H, variables=variables,
+                                    *args, **kwargs)
+        return self.evaluate_all_z_counts(counts=counts, hamiltonian=hamiltonian, samples=samples)
+
+    @staticmethod
+    def evaluate_all_z_counts(counts, hamiltonian, samples: int) -> numbers.Real:
+        """
+        Evaluate a Hamiltonian of Pauli-Z and unit operators from the counts of measuring all of its qubits
+
+        Parameters
+        ----------
+        counts:
+            the result of sampling with read_out_qubits=hamiltonian.qubits
+        hamiltonian:
+            the tequila hamiltonian
+        samples:
+            the number of samples taken
+
+        Returns
+        -------
+            the estimate of the expectationvalue
+        """
+        read_out_map = {q: i for i, q in enumerate(hamiltonian.qubits)}
+        counts = Counts.from_wavefunction(counts, n_qubits=len(read_out_map))
+        # small failsafe
+        assert counts.samples == samples
 
         # compute energy
         E = 0.0
         for paulistring in hamiltonian.paulistrings:
-            n_samples = 0
-            Etmp = 0.0
-            for key, count in counts.items():
-                # get all the non-trivial qubits of the current PauliString (meaning all Z operators)
-                # and mapp them to the backend qubits
-                mapped_ps_support = [read_out_map[i] for i in paulistring._data.keys()]
-                # count all measurements that resulted in |1> for those qubits
-                parity = [k for i, k in enumerate(key.array) if i in mapped_ps_support].count(1)
-                # evaluate the PauliString
-                sign = (-1) ** parity
-                Etmp += sign * count
-                n_samples += count
-            E += (Etmp / samples) * paulistring.coeff
-            # small failsafe
-            assert n_samples == samples
+            # the non-trivial qubits of the current PauliString (meaning all Z operators) as positions of the read out
+            mapped_ps_support = [read_out_map[i] for i in paulistring._data.keys()]
+            E += counts.expectation(positions=mapped_ps_support) * paulistring.coeff
         return E
 
+    @staticmethod
+    def evaluate_parity_counts(counts, samples: int) -> numbers.Real:
+        """
+        The average parity (+1 or -1) of sampled bitstrings, the expectationvalue of a measured paulistring
+        without its coefficient.
+        """
+        counts = Counts.from_wavefunction(counts)
+        assert counts.samples == samples
+        return counts.expectation()
+
     def sample_paulistring(self, samples: int, paulistring, variables, *args,
                            **kwargs) -> numbers.Real:
         """
@@ -476,42 +636,163 @@ class BackendCircuit():
         float:
             the average result of sampling the chosen paulistring
         """
+        return self.sample_paulistrings(samples=samples, paulistrings=[paulistring], variables=variables,
+                                        *args, **kwargs)[0]
+
+    def sample_paulistrings(self, samples: int, paulistrings: list, variables, *args, **kwargs) -> list:
+        """
+        Sample several pauli words (pauli strings) and return the average result of each.
+        The measurement circuits of all paulistrings are handed to do_sample_batch together,
+        so that backends can execute them as a single job.
 
-        not_in_u = [q for q in paulistring.qubits if q not in self.abstract_qubits]
-        reduced_ps = paulistring.trace_out_qubits(qubits=not_in_u)
-        if reduced_ps.coeff == 0.0:
-            return 0.0
-        if len(reduced_ps._data.keys()) == 0:
-            return reduced_ps.coeff
+        Parameters
+        ----------
+        samples: int or list:
+            how many samples to evaluate for each paulistring (one number for all, or a list).
+        paulistrings: list:
+            the paulistrings to be sampled.
+        variables:
+            the variables of the circuit.
+        args
+        kwargs
 
-        # make basis change and translate to backend
+        Returns
+        -------
+        list:
+            the average results of sampling the paulistrings, in the same order
+        """
+        self.update_variables(variables)
+        results, measured, keys = self.measurement_keys(paulistrings)
+        if len(keys) == 0:
+            return results
+        if isinstance(samples, numbers.Integral):
+            samples = [samples] * len(paulistrings)
+        # circuits with the same number of samples are sampled in one batch
+        batches = {}
+        for i, key in zip(measured, keys):
+            batches.setdefault(samples[i], []).append((i, key))
+        for n, batch in batches.items():
+            batch_keys = [key for i, key in batch]
+            circuits = [self.measurement_circuit(key=key, variables=variables, *args, **kwargs) for key in batch_keys]
+            read_out_qubits = [[idx for idx, p in key] for key in batch_keys]
+            all_counts = self.do_sample_batch(samples=n, circuits=circuits, read_out_qubits=read_out_qubits,
+                                              keys=batch_keys, *args, **kwargs)
+            for (i, key), counts in zip(batch, all_counts):
+                results[i] = self.evaluate_parity_counts(counts=counts, samples=n) * paulistrings[i].coeff
+        return results
+
+    def measurement_keys(self, paulistrings: list) -> tuple:
+        """
+        Reduce paulistrings to the qubits of the circuit and sort out those which need no measurement
+
+        Parameters
+        ----------
+        paulistrings: list:
+            the paulistrings to be sampled.
+
+        Returns
+        -------
+        tuple:
+            the values of the paulistrings without measurement (0.0 for the others),
+            the indices of the paulistrings which need to be measured and their keys for measurement_circuit.
+        """
+        results = [0.0] * len(paulistrings)
+        measured = []
+        keys = []
+        for i, paulistring in enumerate(paulistrings):
+            not_in_u = [q for q in paulistring.qubits if q not in self.abstract_qubits]
+            reduced_ps = paulistring.trace_out_qubits(qubits=not_in_u)
+            if reduced_ps.coeff == 0.0:
+                continue
+            if len(reduced_ps._data.keys()) == 0:
+                results[i] = reduced_ps.coeff
+                continue
+            measured.append(i)
+            keys.append(tuple(sorted(reduced_ps.items())))
+        return results, measured, keys
+
+    def measurement_circuit(self, key: tuple, variables=None, *args, **kwargs):
+        """
+        The backend circuit measuring a paulistring: self.circuit, basis change and measurement.
+        It is built on the first call for each basis change and cached in self.measurement_circuits,
+        the variables are bound when the circuit is executed (see update_variables).
+
+        Parameters
+        ----------
+        key: tuple:
+            the paulistring (traced to the qubits of the circuit) as sorted tuple of (qubit, axis).
+        variables: optional:
+            the current variables, for backends which can not keep their circuits parametrized.
+
+        Returns
+        -------
+            the measurement circuit in the backend language
+        """
+        if key not in self.measurement_circuits:
+            # add basis change to the circuit
+            # deepcopy is necessary to avoid changing the circuits, it is only done once per basis change
+            circuit = self.create_circuit(circuit=copy.deepcopy(self.circuit), abstract_circuit=self.basis_change(key),
+                                          variables=variables)
+            self.measurement_circuits[key] = self.add_measurement(circuit=circuit,
+                                                                  target_qubits=[idx for idx, p in key])
+        return self.measurement_circuits[key]
+
+    def compile_measurements(self, paulistrings: list, variables=None, *args, **kwargs):
+        """
+        Build the measurement circuits of paulistrings in advance (e.g. when an expectationvalue is compiled
+        for sampling), so that sampling them only binds the variables.
+        Paulistrings with the same basis change share one circuit.
+
+        Parameters
+        ----------
+        paulistrings: list:
+            the paulistrings which will be sampled.
+        variables: optional:
+            the variables of the circuit.
+        """
+        results, measured, keys = self.measurement_keys(paulistrings)
+        for key in set(keys):
+            self.measurement_circuit(key=key, variables=variables, *args, **kwargs)
+
+    @staticmethod
+    def basis_change(key: tuple) -> QCircuit:
+        """
+        The abstract circuit rotating the measured axes of a paulistring, given as key of measurement_circuit, to Z.
+        """
         basis_change = QCircuit()
-        qubits = []
-        for idx, p in reduced_ps.items():
-            qubits.append(idx)
+        for idx, p in key:
             basis_change += change_basis(target=idx, axis=p)
+        return basis_change
 
-        # add basis change to the circuit
-        # deepcopy is necessary to avoid changing the circuits
-        # can be circumvented by optimizing the measurements
-        # on construction: tq.ExpectationValue(H=H, U=U, optimize_measurements=True)
-        circuit = self.create_circuit(circuit=copy.deepcopy(self.circuit), abstract_circuit=basis_change)
-        # run simulators
-        counts = self.sample(samples=samples, circuit=circuit, read_out_qubits=qubits, variables=variables, *args,
-                             **kwargs)
-        # compute energy
-        E = 0.0
-        n_samples = 0
-        for key, count in counts.items():
-            parity = key.array.count(1)
-            sign = (-1) ** parity
-            E += sign * count
-            n_samples += count
-        assert n_samples == samples
-        E = E / samples * paulistring.coeff
-        return E
+    def do_sample_batch(self, samples, circuits: list, read_out_qubits: list, keys: list = None,
+                        *args, **kwargs) -> typing.List[Counts]:
+        """
+        helper function for sampling several circuits with measurements.
+        The default samples them one after the other with do_sample,
+        backends override this to submit all circuits in one call.
+
+        Parameters
+        ----------
+        samples: int:
+            the number of samples to take for each circuit
+        circuits: list:
+            the circuits (including measurements) to sample from.
+        read_out_qubits: list:
+            the measured abstract qubits of each circuit.
+        keys: list, optional:
+            keys identifying the circuits, see measurement_circuit.
+        args
+        kwargs
+
+        Returns
+        -------
+        list:
+            the Counts of sampling each circuit.
+        """
+        return [self.do_sample(samples=samples, circuit=circuit, read_out_qubits=qubits, *args, **kwargs)
+                for circuit, qubits in zip(circuits, read_out_qubits)]
 
-    def do_sample(self, samples, circuit, noise, abstract_qubits=None, *args, **kwargs) -> QubitWaveFunction:
+    def do_sample(self, samples, circuit, noise, abstract_qubits=None, *args, **kwargs) -> Counts:
         """
         helper function for sampling. MUST be overwritten by inheritors.
 
@@ -532,7 +813,7 @@ class BackendCircuit():
 
         Returns
         -------
-        QubitWaveFunction:
+        Counts:
             the result of sampling.
 
         """
@@ -559,7 +840,7 @@ class BackendCircuit():
         """
         raise TequilaException("Backend Handler needs to be overwritten for supported simulators")
 
-    def convert_measurements(self, backend_result) -> QubitWaveFunction:
+    def convert_measurements(self, backend_result) -> Counts:
         raise TequilaException("Backend Handler needs to be overwritten for supported simulators")
 
     def initialize_qubit(self, number: int):
@@ -686,6 +967,8 @@ class BackendExpectationValue:
         how many qubits appear in the expectationvalue.
     U:
         the underlying BackendCircuit of the expectationvalue.
+    measurements:
+        the measurements needed for sampling H, with the norms used for shot allocation.
 
     Methods
     -------
@@ -701,6 +984,10 @@ class BackendExpectationValue:
         sample the unitary to measure H
     sample_paulistring
         sample a single term from H
+    compile_measurements
+        build the measurement circuits for sampling H in advance.
+    sweep:
+        evaluate the expectationvalue for a list of variable assignments.
     update_variables
         wrapper over the update_variables of BackendCircuit.
 
@@ -739,7 +1026,7 @@ class BackendExpectationValue:
             result = self.U.extract_variables()
         return result
 
-    def __init__(self, E, variables, noise, device, *args, **kwargs):
+    def __init__(self, E, variables, noise, device, samples=None, *args, **kwargs):
         """
 
         Parameters
@@ -752,17 +1039,24 @@ class BackendExpectationValue:
             noisemodel for compilation of circuit
         device:
             device for compilation of circuit
+        samples: optional:
+            if not None the expectationvalue is compiled for sampling
+            and the measurement circuits of its paulistrings are built right away, see compile_measurements
         """
         self.abstract_expectationvalue = E
-        self._input_args = {"variables": variables, "device": device, "noise": noise, **kwargs}
+        self._input_args = {"variables": variables, "device": device, "noise": noise, "samples": samples, **kwargs}
         self._U = self.initialize_unitary(E.U, variables=variables, noise=noise, device=device, **kwargs)
         self._reduced_hamiltonians = self.reduce_hamiltonians(self.abstract_expectationvalue.H)
         self._H = self.initialize_hamiltonian(self._reduced_hamiltonians)
+        self._measurements = None
 
         self._variables = E.extract_variables()
         self._contraction = E._contraction
         self._shape = E._shape
 
+        if samples is not None:
+            self.compile_measurements(variables=variables)
+
     def __copy__(self):
         return self.__deepcopy__()
 
@@ -771,18 +1065,53 @@ class BackendExpectationValue:
 
     def __call__(self, variables, samples: int = None, *args, **kwargs):
 
+        variables = self.check_variables(variables)
+        
+        if samples is None:
+            data = self.simulate(variables=variables, *args, **kwargs)
+        else:
+            data = self.sample(variables=variables, samples=samples, *args, **kwargs)
+
+        return self.contract_data(data)
+
+    def sweep(self, variables: list, samples: int = None, *args, **kwargs) -> list:
+        """
+        Evaluate the expectationvalue for several variable assignments.
+        The default evaluates them one after the other,
+        backends supporting parameter sweeps override this to evaluate them in one call.
+
+        Parameters
+        ----------
+        variables: list:
+            the variable assignments (dictionaries).
+        samples: int, optional:
+            number of samples for each assignment, None for simulation.
+        args
+        kwargs
+
+        Returns
+        -------
+        list:
+            the value for each assignment, as returned by __call__
+        """
+        return [self(variables=v, samples=samples, *args, **kwargs) for v in variables]
+
+    def check_variables(self, variables) -> dict:
+        """
+        format the variables and make sure that all variables of the circuit are given.
+        """
         variables = format_variable_dictionary(variables=variables)
         if self._variables is not None and len(self._variables) > 0:
             if variables is None or (not set(self._variables) <= set(variables.keys())):
                 raise TequilaException(
                     "BackendExpectationValue received not all variables. Circuit depends on variables {}, you gave {}".format(
                         self._variables, variables))
-        
-        if samples is None:
-            data = self.simulate(variables=variables, *args, **kwargs)
-        else:
-            data = self.sample(variables=variables, samples=samples, *args, **kwargs)
+        return variables
 
+    def contract_data(self, data: numpy.ndarray):
+        """
+        bring the values of the individual hamiltonians into the shape of the expectationvalue (or contract them).
+        """
         if self._shape is None and self._contraction is None:
             # this is the default
             return numpy.sum(data)
@@ -807,9 +1136,10 @@ class BackendExpectationValue:
         -------
             reduces Hamiltonians where the qubits that are not defined in self.U are traced out
         """
-        abstract_qubits_of_u = self.U.qubit_map.keys()
+        abstract_qubits_of_u = set(self.U.qubit_map.keys())
         reduced = []
         for H in abstract_hamiltonians:
+            # reductions are memoized by the Hamiltonian for each set of traced out qubits
             abstract_qubits_of_h = H.qubits
             not_in_u = [q for q in abstract_qubits_of_h if q not in abstract_qubits_of_u]
             reduced.append(H.trace_out_qubits(qubits=not_in_u))
@@ -838,7 +1168,8 @@ class BackendExpectationValue:
         variables: dict:
             variables to supply to the unitary.
         samples: int:
-            number of samples to perform.
+            number of samples to perform for each measurement,
+            or a ShotAllocator distributing a total number of samples over the measurements.
         args
         kwargs
 
@@ -862,20 +1193,79 @@ class BackendExpectationValue:
 
         self.update_variables(variables)
 
-        result = []
-        for H in self._reduced_hamiltonians:
-            E = 0.0
-            if len(H.qubits) == 0:
-                E = sum([ps.coeff for ps in H.paulistrings])
-            elif H.is_all_z():
-                E = self.U.sample_all_z_hamiltonian(samples=samples, hamiltonian=H, variables=variables, *args,
-                                                    **kwargs)
+        # measurements are all-Z hamiltonians (measured at once) and the paulistrings of the other hamiltonians
+        allocator = None
+        if isinstance(samples, ShotAllocator):
+            allocator = samples
+            norms = [norm for i, ps, norm, constant in self.measurements]
+            samples = allocator.allocate(key=self, norms=norms)
+        else:
+            samples = [samples] * len(self.measurements)
+
+        result = [0.0] * len(self._reduced_hamiltonians)
+        values = [0.0] * len(self.measurements)
+        # paulistrings of all hamiltonians are sampled in one batch
+        terms = []
+        for k, (i, ps, norm, constant) in enumerate(self.measurements):
+            if ps is None:
+                H = self._reduced_hamiltonians[i]
+                values[k] = self.U.sample_all_z_hamiltonian(samples=samples[k], hamiltonian=H, variables=variables,
+                                                            *args, **kwargs)
             else:
-                for ps in H.paulistrings:
-                    E += self.U.sample_paulistring(samples=samples, paulistring=ps, variables=variables, *args,
-                                                   **kwargs)
-            result.append(to_float(E))
-        return numpy.asarray(result)
+                terms.append(k)
+        if len(terms) > 0:
+            sampled = self.U.sample_paulistrings(samples=[samples[k] for k in terms],
+                                                 paulistrings=[self.measurements[k][1] for k in terms],
+                                                 variables=variables, *args, **kwargs)
+            for k, value in zip(terms, sampled):
+                values[k] = value
+        for (i, ps, norm, constant), value in zip(self.measurements, values):
+            result[i] += value
+
+        if allocator is not None:
+            # constants do not fluctuate, only the measured part enters the variance estimate
+            allocator.update(key=self, norms=norms, samples=samples,
+                             values=[to_float(v) - m[3] for v, m in zip(values, self.measurements)])
+        # unit paulistrings (and hamiltonians without qubits) are constants
+        for i, H in enumerate(self._reduced_hamiltonians):
+            if len(H.qubits) == 0:
+                result[i] = sum([ps.coeff for ps in H.paulistrings])
+            elif not H.is_all_z():
+                result[i] += sum([ps.coeff for ps in H.paulistrings if len(ps.qubits) == 0])
+        return numpy.asarray([to_float(E) for E in result])
+
+    @property
+    def measurements(self) -> list:
+        """
+        The measurements needed for sampling: (index of the hamiltonian, paulistring, norm, constant)
+        with paulistring None for all-Z hamiltonians which are measured at once,
+        the norm is the sum of the absolute coefficients of the measured paulistrings
+        and constant the part of the result which is not measured (unit paulistrings).
+        Hamiltonians without qubits and unit paulistrings of the others need no measurement.
+        """
+        if self._measurements is None:
+            measurements = []
+            for i, H in enumerate(self._reduced_hamiltonians):
+                if len(H.qubits) == 0:
+                    continue
+                elif H.is_all_z():
+                    norm = sum([abs(ps.coeff) for ps in H.paulistrings if len(ps.qubits) > 0])
+                    constant = sum([ps.coeff for ps in H.paulistrings if len(ps.qubits) == 0])
+                    measurements.append((i, None, to_float(norm), to_float(constant)))
+                else:
+                    measurements += [(i, ps, to_float(abs(ps.coeff)), 0.0) for ps in H.paulistrings
+                                     if len(ps.qubits) > 0]
+            self._measurements = measurements
+        return self._measurements
+
+    def compile_measurements(self, variables=None):
+        """
+        Build the measurement circuits of all paulistrings which are sampled individually,
+        evaluations then only bind the variables to the cached circuits of the unitary.
+        """
+        paulistrings = [ps for i, ps, norm, constant in self.measurements if ps is not None]
+        if len(paulistrings) > 0:
+            self.U.compile_measurements(paulistrings=paulistrings, variables=variables)
 
     def simulate(self, variables, *args, **kwargs):
         """
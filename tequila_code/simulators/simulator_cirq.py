@@ -1,7 +1,9 @@
 from tequila.simulators.simulator_base import QCircuit, BackendCircuit, BackendExpectationValue
 from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
+from tequila.simulators.counts import Counts
 from tequila import TequilaException
 from tequila import BitString, BitNumbering
+from tequila.utils.keymap import KeyMapSubregisterToRegister
 import sympy
 from tequila.utils import to_float
 
@@ -67,6 +69,8 @@ class BackendCircuitCirq(BackendCircuit):
         supports.
     build_noisy_circuit:
         apply a tequila NoiseModel to a cirq circuit, by translating the NoiseModel's instructions into noise channels.
+    simulate_sweep, sample_sweep, sample_paulistrings_sweep:
+        execute the circuit for a list of variable assignments with a single cirq sweep.
 
     """
 
@@ -175,9 +179,9 @@ class BackendCircuitCirq(BackendCircuit):
                                             initial_state=initial_state)
         return QubitWaveFunction.from_array(arr=backend_result.final_state_vector, numbering=self.numbering)
 
-    def convert_measurements(self, backend_result: cirq.Result) -> QubitWaveFunction:
+    def convert_measurements(self, backend_result: cirq.Result) -> Counts:
         """
-        Take the results of a cirq measurement and translate them to teuqila QubitWaveFunction.
+        Take the results of a cirq measurement and count them.
         Parameters
         ----------
         backend_result: cirq.Result:
@@ -185,22 +189,15 @@ class BackendCircuitCirq(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction:
-            the result of sampling, as a tequila QubitWavefunction.
+        Counts:
+            the result of sampling, counted from the array of measured bits.
 
         """
         assert (len(backend_result.measurements) == 1)
         for key, value in backend_result.measurements.items():
-            counter = QubitWaveFunction()
-            for sample in value:
-                binary = BitString.from_array(array=sample.astype(int))
-                if binary in counter._state:
-                    counter._state[binary] += 1
-                else:
-                    counter._state[binary] = 1
-            return counter
+            return Counts.from_samples(value)
 
-    def do_sample(self, samples, circuit, *args, **kwargs) -> QubitWaveFunction:
+    def do_sample(self, samples, circuit, *args, **kwargs) -> Counts:
         """
         Helper function, sampling an individual circuit.
 
@@ -215,11 +212,111 @@ class BackendCircuitCirq(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction:
-            the result of sampled measurement, as a tequila wavefunction.
+        Counts:
+            the result of sampled measurement.
         """
         return self.convert_measurements(cirq.sample(program=circuit, param_resolver=self.resolver, repetitions=samples))
 
+    def do_sample_batch(self, samples, circuits: list, read_out_qubits: list, keys: list = None,
+                        *args, **kwargs) -> typing.List[Counts]:
+        """
+        Helper function, sampling several circuits with a single run_batch call of the cirq simulator.
+        See BackendCircuit.do_sample_batch.
+        """
+        results = self.sampler().run_batch(programs=circuits, params_list=[self.resolver] * len(circuits),
+                                           repetitions=samples)
+        return [self.convert_measurements(result[0]) for result in results]
+
+    def sampler(self) -> cirq.Sampler:
+        """
+        the cirq simulator used for sampling, density matrices are needed for noisy circuits.
+        """
+        if self.noise is None:
+            return cirq.Simulator()
+        else:
+            return cirq.DensityMatrixSimulator()
+
+    def simulate_sweep(self, variables: list, initial_state=0, *args, **kwargs) -> typing.List[QubitWaveFunction]:
+        """
+        Simulate the circuit for several variable assignments with one simulate_sweep call of the cirq simulator.
+        See BackendCircuit.simulate_sweep.
+        """
+        if isinstance(initial_state, BitString):
+            initial_state = initial_state.integer
+        if isinstance(initial_state, QubitWaveFunction):
+            if len(initial_state.keys()) != 1:
+                raise TequilaException("only product states as initial states accepted")
+            initial_state = list(initial_state.keys())[0].integer
+
+        all_qubits = list(range(self.abstract_circuit.n_qubits))
+        active_qubits = self.qubit_map.keys()
+        keymap = None
+        if sorted(active_qubits) != all_qubits:
+            # maps from reduced register to full register
+            keymap = KeyMapSubregisterToRegister(subregister=active_qubits, register=all_qubits)
+        mapped_initial_state = keymap.inverted(initial_state).integer if keymap is not None else int(initial_state)
+
+        results = cirq.Simulator().simulate_sweep(program=self.circuit, params=self.make_resolvers(variables),
+                                                  initial_state=mapped_initial_state)
+        wfns = []
+        for backend_result in results:
+            wfn = QubitWaveFunction.from_array(arr=backend_result.final_state_vector, numbering=self.numbering)
+            if keymap is not None:
+                wfn.apply_keymap(keymap=keymap, initial_state=initial_state)
+            wfns.append(wfn)
+        return wfns
+
+    def sample_counts_sweep(self, variables: list, samples, read_out_qubits=None, *args,
+                            **kwargs) -> typing.List[Counts]:
+        """
+        Sample the circuit for several variable assignments with one run_sweep call.
+        See BackendCircuit.sample_counts_sweep.
+        """
+        if read_out_qubits is None:
+            read_out_qubits = self.abstract_qubits
+        if len(read_out_qubits) == 0:
+            raise Exception("read_out_qubits are empty")
+        circuit = self.add_measurement(circuit=self.circuit, target_qubits=read_out_qubits)
+        results = self.sampler().run_sweep(program=circuit, params=self.make_resolvers(variables),
+                                           repetitions=samples)
+        return [self.convert_measurements(result) for result in results]
+
+    def sample_paulistrings_sweep(self, samples: int, paulistrings: list, variables: list, *args,
+                                  **kwargs) -> typing.List[list]:
+        """
+        Sample several paulistrings for several variable assignments.
+        All measurement circuits are run for all assignments with one run_batch call.
+
+        Parameters
+        ----------
+        samples: int:
+            how many samples to evaluate for each paulistring and assignment.
+        paulistrings: list:
+            the paulistrings to be sampled.
+        variables: list:
+            the variable assignments (dictionaries).
+        args
+        kwargs
+
+        Returns
+        -------
+        list:
+            for each assignment, the list of the average results of the paulistrings (see sample_paulistrings)
+        """
+        constants, measured, keys = self.measurement_keys(paulistrings)
+        results = [list(constants) for v in variables]
+        if len(keys) == 0:
+            return results
+        circuits = [self.measurement_circuit(key=key, *args, **kwargs) for key in keys]
+        resolvers = self.make_resolvers(variables)
+        batch = self.sampler().run_batch(programs=circuits, params_list=[resolvers] * len(circuits),
+                                         repetitions=samples)
+        for i, circuit_results in zip(measured, batch):
+            for j, result in enumerate(circuit_results):
+                counts = self.convert_measurements(result)
+                results[j][i] = self.evaluate_parity_counts(counts=counts, samples=samples) * paulistrings[i].coeff
+        return results
+
     def no_translation(self, abstract_circuit):
         return isinstance(abstract_circuit, cirq.Circuit)
 
@@ -391,16 +488,23 @@ class BackendCircuitCirq(BackendCircuit):
 
         """
         c = self.circuit
-        n = noise
+        levels = noise.resolve_levels()
         new_ops = []
         for op in c.all_operations():
             new_ops.append(op)
-            for noise in n.noises:
-                if qubit_satisfier(op, noise.level):
-                    for i, channel in enumerate(self.noise_lookup[noise.name]):
-                        new_ops.append(channel(noise.probs[i]).on_each([q for q in op.qubits]))
+            for noise in levels.get(len(op.qubits), []):
+                for i in range(len(self.noise_lookup[noise.name])):
+                    # cirq channels are immutable, the same channel is put on all gates
+                    channel = self.noise_channel(noise, self.build_noise_channel, i)
+                    new_ops.append(channel.on_each([q for q in op.qubits]))
         return cirq.Circuit(*new_ops)
 
+    def build_noise_channel(self, noise, i):
+        """
+        the i-th cirq channel of a tequila noise
+        """
+        return self.noise_lookup[noise.name][i](noise.probs[i])
+
     def update_variables(self, variables):
         """
         Update the variables of the circuit by modifying the cirq.ParameterResolver sent to simulator at runtime.
@@ -413,15 +517,28 @@ class BackendCircuitCirq(BackendCircuit):
         -------
         None
 
+        """
+        self.resolver = self.make_resolver(variables)
+
+    def make_resolver(self, variables) -> cirq.ParamResolver:
+        """
+        the cirq.ParamResolver of the circuit parameters for the given variables (None for unparametrized circuits).
         """
         # this is here because cirq cant take numpy arrays correctly
         if isinstance(variables, dict):
             variables = {k: to_float(v) for k, v in variables.items()}
 
         if self.sympy_to_tq is not None:
-            self.resolver = cirq.ParamResolver({k: v(variables) for k, v in self.sympy_to_tq.items()})
+            return cirq.ParamResolver({k: v(variables) for k, v in self.sympy_to_tq.items()})
         else:
-            self.resolver = None
+            return None
+
+    def make_resolvers(self, variables: list) -> typing.List[cirq.ParamResolver]:
+        """
+        the cirq.ParamResolvers for a list of variable assignments, usable as cirq sweep.
+        """
+        resolvers = [self.make_resolver(v) for v in variables]
+        return [cirq.ParamResolver() if r is None else r for r in resolvers]
 
     def retrieve_device(self, device):
         """
@@ -475,3 +592,39 @@ class BackendExpectationValueCirq(BackendExpectationValue):
     See BackendExpectationValue for details.
     """
     BackendCircuitType = BackendCircuitCirq
+
+    def sweep(self, variables: list, samples: int = None, *args, **kwargs) -> list:
+        """
+        Evaluate the expectationvalue for several variable assignments,
+        every circuit is executed for all assignments with a single cirq sweep.
+        See BackendExpectationValue.sweep.
+        """
+        if hasattr(samples, "lower"):
+            return super().sweep(variables=variables, samples=samples, *args, **kwargs)
+        variables = [self.check_variables(v) for v in variables]
+
+        if samples is None:
+            wfns = self.U.simulate_sweep(variables=variables, *args, **kwargs)
+            data = [np.asarray([to_float(wfn.compute_expectationvalue(operator=H)) for H in self.H])
+                    for wfn in wfns]
+            return [self.contract_data(d) for d in data]
+
+        data = np.zeros(shape=[len(variables), len(self._reduced_hamiltonians)])
+        terms = []
+        for i, H in enumerate(self._reduced_hamiltonians):
+            if len(H.qubits) == 0:
+                data[:, i] = sum([ps.coeff for ps in H.paulistrings])
+            elif H.is_all_z():
+                all_counts = self.U.sample_counts_sweep(variables=variables, samples=samples,
+                                                        read_out_qubits=H.qubits, *args, **kwargs)
+                data[:, i] = [to_float(self.U.evaluate_all_z_counts(counts=counts, hamiltonian=H, samples=samples))
+                              for counts in all_counts]
+            else:
+                terms += [(i, ps) for ps in H.paulistrings]
+        if len(terms) > 0:
+            values = self.U.sample_paulistrings_sweep(samples=samples, paulistrings=[ps for i, ps in terms],
+                                                      variables=variables, *args, **kwargs)
+            for j, point in enumerate(values):
+                for (i, ps), value in zip(terms, point):
+                    data[j, i] += to_float(value)
+        return [self.contract_data(d) for d in data]
@@ -0,0 +1,479 @@
+"""
+Pure numpy density matrix simulator
+
+Gates and the kraus maps of tequila NoiseModels are applied in place to a preallocated
+density matrix (stored as tensor with one row and one column axis per qubit),
+so that noisy expectationvalues are computed exactly, without shot noise.
+Without noise the same code acts on a statevector.
+"""
+from tequila.simulators.simulator_base import QCircuit, BackendCircuit, BackendExpectationValue
+from tequila.simulators.counts import Counts, bit_parity
+from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
+from tequila import TequilaException
+from tequila import BitNumbering
+from tequila.utils import to_float
+import numpy
+
+
+class TequilaDensityMatrixException(TequilaException):
+    def __str__(self):
+        return "Error in density matrix backend:" + self.message
+
+
+_fixed_gates = {
+    "X": numpy.array([[0.0, 1.0], [1.0, 0.0]], dtype=complex),
+    "Y": numpy.array([[0.0, -1.0j], [1.0j, 0.0]], dtype=complex),
+    "Z": numpy.array([[1.0, 0.0], [0.0, -1.0]], dtype=complex),
+    "H": numpy.array([[1.0, 1.0], [1.0, -1.0]], dtype=complex) / numpy.sqrt(2.0),
+}
+
+
+def _rx(angle):
+    c, s = numpy.cos(angle / 2), numpy.sin(angle / 2)
+    return numpy.array([[c, -1.0j * s], [-1.0j * s, c]], dtype=complex)
+
+
+def _ry(angle):
+    c, s = numpy.cos(angle / 2), numpy.sin(angle / 2)
+    return numpy.array([[c, -s], [s, c]], dtype=complex)
+
+
+def _rz(angle):
+    return numpy.diag([numpy.exp(-0.5j * angle), numpy.exp(0.5j * angle)])
+
+
+def _phase(angle):
+    return numpy.diag([1.0, numpy.exp(1.0j * angle)])
+
+
+_parametrized_gates = {"Rx": _rx, "Ry": _ry, "Rz": _rz, "Phase": _phase}
+
+# single qubit kraus operators of the tequila noises, the NoiseModel applies them to each qubit of a gate
+# conventions as in the other backends, phase-amplitude damp takes (amplitude damping, phase damping)
+_kraus_maps = {
+    "bit flip": lambda p: [numpy.sqrt(1 - p) * numpy.eye(2), numpy.sqrt(p) * _fixed_gates["X"]],
+    "phase flip": lambda p: [numpy.sqrt(1 - p) * numpy.eye(2), numpy.sqrt(p) * _fixed_gates["Z"]],
+    "phase damp": lambda p: [numpy.diag([1.0, numpy.sqrt(1 - p)]), numpy.diag([0.0, numpy.sqrt(p)])],
+    "amplitude damp": lambda p: [numpy.diag([1.0, numpy.sqrt(1 - p)]),
+                                 numpy.array([[0.0, numpy.sqrt(p)], [0.0, 0.0]])],
+    "phase-amplitude damp": lambda a, b: [numpy.diag([1.0, numpy.sqrt(1 - a - b)]),
+                                          numpy.array([[0.0, numpy.sqrt(a)], [0.0, 0.0]]),
+                                          numpy.diag([0.0, numpy.sqrt(b)])],
+    "depolarizing": lambda p: [numpy.sqrt(1 - 3 * p / 4) * numpy.eye(2)] + [numpy.sqrt(p / 4) * _fixed_gates[k]
+                                                                             for k in ["X", "Y", "Z"]],
+}
+
+
+def _superoperator_blocks(kraus: list) -> list:
+    """
+    The superoperator sum_K K (x) K^* of a single qubit channel, acting on the vectorized
+    2x2 block (rho_00, rho_01, rho_10, rho_11), split into blocks of elements which are only mixed among themselves.
+
+    Returns
+    -------
+    list:
+        tuples of (indices into the vectorized block, matrix acting on them)
+    """
+    S = sum(numpy.kron(K, K.conj()) for K in kraus)
+    blocks = []
+    remaining = [0, 1, 2, 3]
+    while len(remaining) > 0:
+        indices = [remaining[0]]
+        for i in indices:
+            for j in remaining:
+                if j not in indices and (S[i, j] != 0.0 or S[j, i] != 0.0):
+                    indices.append(j)
+        remaining = [i for i in remaining if i not in indices]
+        indices = sorted(indices)
+        blocks.append((tuple(indices), S[numpy.ix_(indices, indices)]))
+    return blocks
+
+
+def _mix(views: list, matrix: numpy.ndarray):
+    """
+    in place: views[i] <- sum_j matrix[i,j] views[j]
+    """
+    diagonal = numpy.diagonal(matrix)
+    if not numpy.any(matrix - numpy.diag(diagonal)):
+        for view, d in zip(views, diagonal):
+            if d != 1.0:
+                view *= d
+        return
+    old = [view.copy() for view in views]
+    for view, row in zip(views, matrix):
+        view[...] = 0.0
+        for value, o in zip(row, old):
+            if value != 0.0:
+                view += value * o
+
+
+def _apply_matrix(tensor: numpy.ndarray, matrix: numpy.ndarray, target: int, controls: tuple):
+    """
+    apply a (controlled) single qubit matrix in place to the given axes of a tensor with dimension 2 per axis.
+    """
+    index = [slice(None)] * tensor.ndim
+    for c in controls:
+        index[c] = 1
+    views = []
+    for i in range(2):
+        index[target] = i
+        # the ellipsis keeps fully indexed tensors a (0-d) view
+        views.append(tensor[tuple(index) + (Ellipsis,)])
+    _mix(views, matrix)
+
+
+class BackendCircuitDensityMatrix(BackendCircuit):
+    """
+    Class representing circuits simulated with numpy density matrices (or statevectors, without noise).
+    See BackendCircuit for documentation of features and methods inherited therefrom
+
+    The backend circuit is a list of instructions: ("gate", matrix or (name, parameter), target, controls)
+    and ("channel", superoperator blocks, qubit, kraus operators), with backend qubit numbers.
+
+    Attributes
+    ----------
+    variables:
+        the current variables, set with update_variables.
+    generator:
+        numpy random generator used for sampling.
+
+    Methods
+    -------
+    state_vector:
+        simulate the noiseless circuit, the state as tensor with one axis per qubit.
+    density_matrix:
+        simulate the noisy circuit, the density matrix as tensor with one row and one column axis per qubit.
+    """
+
+    compiler_arguments = {
+        "trotterized": True,
+        "swap": True,
+        "multitarget": True,
+        "controlled_rotation": False,
+        "generalized_rotation": True,
+        "exponential_pauli": True,
+        "controlled_exponential_pauli": True,
+        "phase": False,
+        "power": True,
+        "hadamard_power": True,
+        "controlled_power": True,
+        "controlled_phase": False,
+        "toffoli": False,
+        "phase_to_z": False,
+        "cc_max": False
+    }
+
+    numbering: BitNumbering = BitNumbering.MSB
+
+    def __init__(self, abstract_circuit: QCircuit, variables, noise=None, device=None, seed=None, *args, **kwargs):
+        """
+
+        Parameters
+        ----------
+        abstract_circuit: QCircuit:
+            the circuit to simulate.
+        variables: dict:
+            variables to compile the circuit with
+        noise: NoiseModel, optional:
+            noise to apply to the circuit, simulated exactly with kraus maps.
+        device:
+            needs to be None.
+        seed: optional:
+            seed for the random generator used in sampling.
+        args
+        kwargs
+        """
+        self.variables = variables
+        self.generator = numpy.random.default_rng(seed)
+        self._state = None
+        self._noise_levels = None
+        super().__init__(abstract_circuit=abstract_circuit, variables=variables, noise=noise, device=device,
+                         *args, **kwargs)
+        self._input_args["seed"] = seed
+
+    def initialize_circuit(self, *args, **kwargs) -> list:
+        return []
+
+    def add_basic_gate(self, gate, circuit, noiseless: bool = False, *args, **kwargs):
+        if gate.name not in _fixed_gates or len(gate.target) != 1:
+            raise TequilaDensityMatrixException("gate {} is not supported".format(gate))
+        self.add_instruction(circuit=circuit, gate=gate, data=_fixed_gates[gate.name], noiseless=noiseless)
+
+    def add_parametrized_gate(self, gate, circuit, noiseless: bool = False, *args, **kwargs):
+        if gate.name not in _parametrized_gates or len(gate.target) != 1:
+            raise TequilaDensityMatrixException("gate {} is not supported".format(gate))
+        self.add_instruction(circuit=circuit, gate=gate, data=(gate.name, gate.parameter), noiseless=noiseless)
+
+    def add_instruction(self, circuit: list, gate, data, noiseless: bool = False):
+        """
+        append a gate to the instruction list, followed by the channels of the noise model for its qubits
+        (unless noiseless is set).
+        """
+        target = self.qubit_map[gate.target[0]].number
+        controls = tuple(self.qubit_map[c].number for c in gate.control)
+        circuit.append(("gate", data, target, controls))
+        if self.noise is None or noiseless:
+            return
+        qubits = (target,) + controls
+        if self._noise_levels is None:
+            self._noise_levels = self.noise.resolve_levels()
+        for noise in self._noise_levels.get(len(qubits), []):
+            blocks, kraus = self.noise_channel(noise, self.build_channel)
+            for q in qubits:
+                circuit.append(("channel", blocks, q, kraus))
+
+    @staticmethod
+    def build_channel(noise) -> tuple:
+        """
+        superoperator blocks and kraus operators of a single qubit noise channel
+        """
+        if noise.name not in _kraus_maps:
+            raise TequilaDensityMatrixException("noise {} is not supported".format(noise.name))
+        kraus = _kraus_maps[noise.name](*noise.probs)
+        return _superoperator_blocks(kraus), kraus
+
+    def add_measurement(self, circuit, target_qubits, *args, **kwargs):
+        # all probabilities are known after simulation, the read out qubits are passed to do_sample
+        return circuit
+
+    def measurement_circuit(self, key: tuple, variables=None, *args, **kwargs) -> list:
+        """
+        The instructions measuring a paulistring, see BackendCircuit.measurement_circuit:
+        the noisy self.circuit followed by the basis change without noise,
+        the measurement is ideal like in BackendExpectationValueDensityMatrix.simulate.
+        """
+        if key not in self.measurement_circuits:
+            self.measurement_circuits[key] = self.create_circuit(circuit=list(self.circuit),
+                                                                 abstract_circuit=self.basis_change(key),
+                                                                 variables=variables, noiseless=True)
+        return self.measurement_circuits[key]
+
+    def update_variables(self, variables):
+        self.variables = variables
+
+    def matrix(self, data) -> numpy.ndarray:
+        """
+        the 2x2 matrix of a gate instruction for the current variables
+        """
+        if isinstance(data, numpy.ndarray):
+            return data
+        name, parameter = data
+        return _parametrized_gates[name](to_float(parameter(self.variables)))
+
+    def state_vector(self, circuit: list = None, initial_state: int = 0) -> numpy.ndarray:
+        """
+        simulate the circuit on a statevector (channels are not allowed).
+
+        Parameters
+        ----------
+        circuit: list, optional:
+            the instructions to apply, default is self.circuit.
+        initial_state: int:
+            the initial basis state.
+
+        Returns
+        -------
+        numpy.ndarray:
+            the state as tensor with one axis per qubit.
+        """
+        if circuit is None:
+            circuit = self.circuit
+        n = self.n_qubits
+        state = self._preallocated([2] * n)
+        state.reshape([-1])[initial_state] = 1.0
+        for instruction in circuit:
+            if instruction[0] != "gate":
+                raise TequilaDensityMatrixException("noise channels can not be applied to a statevector")
+            kind, data, target, controls = instruction
+            _apply_matrix(state, self.matrix(data), target, controls)
+        return state
+
+    def density_matrix(self, circuit: list = None, initial_state: int = 0) -> numpy.ndarray:
+        """
+        simulate the circuit on a density matrix.
+
+        Parameters
+        ----------
+        circuit: list, optional:
+            the instructions to apply, default is self.circuit.
+        initial_state: int:
+            the initial basis state.
+
+        Returns
+        -------
+        numpy.ndarray:
+            the density matrix as tensor with one row and one column axis per qubit (rows first).
+        """
+        if circuit is None:
+            circuit = self.circuit
+        n = self.n_qubits
+        rho = self._preallocated([2] * (2 * n))
+        rho.reshape([2 ** n, 2 ** n])[initial_state, initial_state] = 1.0
+        for instruction in circuit:
+            if instruction[0] == "gate":
+                kind, data, target, controls = instruction
+                matrix = self.matrix(data)
+                _apply_matrix(rho, matrix, target, controls)
+                _apply_matrix(rho, matrix.conj(), n + target, tuple(n + c for c in controls))
+            else:
+                kind, blocks, q, kraus = instruction
+                index = [slice(None)] * (2 * n)
+                views = []
+                for a in range(2):
+                    for b in range(2):
+                        index[q] = a
+                        index[n + q] = b
+                        views.append(rho[tuple(index) + (Ellipsis,)])
+                for indices, matrix in blocks:
+                    _mix([views[i] for i in indices], matrix)
+        return rho
+
+    def _preallocated(self, shape: list) -> numpy.ndarray:
+        """
+        the zeroed array for the state, memory is reused between simulations
+        """
+        if self._state is None or list(self._state.shape) != list(shape):
+            self._state = numpy.zeros(shape, dtype=complex)
+        else:
+            self._state.fill(0.0)
+        return self._state
+
+    def probabilities(self, circuit: list = None) -> numpy.ndarray:
+        """
+        the probabilities of the computational basis states as tensor with one axis per qubit
+        """
+        if self.noise is None:
+            return numpy.abs(self.state_vector(circuit=circuit)) ** 2
+        n = self.n_qubits
+        rho = self.density_matrix(circuit=circuit).reshape([2 ** n, 2 ** n])
+        return numpy.diagonal(rho).real.reshape([2] * n).copy()
+
+    def do_simulate(self, variables, initial_state=0, *args, **kwargs) -> QubitWaveFunction:
+        """
+        Simulate the noiseless circuit.
+
+        Parameters
+        ----------
+        variables:
+            the variables of the circuit.
+        initial_state: int:
+            the initial basis state.
+        args
+        kwargs
+
+        Returns
+        -------
+        QubitWaveFunction:
+            the wavefunction of the final state.
+        """
+        if self.noise is not None:
+            raise TequilaDensityMatrixException("noisy circuits have no wavefunction, use density_matrix "
+                                                "or expectationvalues")
+        self.update_variables(variables)
+        state = self.state_vector(initial_state=initial_state)
+        return QubitWaveFunction.from_array(arr=state.reshape([-1]).copy(), numbering=self.numbering)
+
+    def do_sample(self, samples, circuit, read_out_qubits=None, *args, **kwargs) -> Counts:
+        """
+        Sample the read out qubits from the exact probabilities.
+
+        Parameters
+        ----------
+        samples: int:
+            the number of samples to take.
+        circuit: list:
+            the instructions to sample from.
+        read_out_qubits: list:
+            the abstract qubits to measure, the bits of the result follow their sorted order.
+        args
+        kwargs
+
+        Returns
+        -------
+        Counts:
+            the counts of the measured bitstrings.
+        """
+        if read_out_qubits is None:
+            read_out_qubits = self.abstract_qubits
+        read_out_qubits = sorted(read_out_qubits)
+        axes = [self.qubit_map[q].number for q in read_out_qubits]
+        probabilities = self.probabilities(circuit=circuit)
+        others = tuple(i for i in range(probabilities.ndim) if i not in axes)
+        marginal = numpy.transpose(probabilities.sum(axis=others, keepdims=True),
+                                   axes + list(others)).reshape([-1])
+        marginal = numpy.maximum(marginal, 0.0)
+        counts = self.generator.multinomial(samples, marginal / numpy.sum(marginal))
+        outcomes = numpy.flatnonzero(counts)
+        return Counts(outcomes=outcomes, counts=counts[outcomes], n_qubits=len(axes))
+
+
+class BackendExpectationValueDensityMatrix(BackendExpectationValue):
+    """
+    Expectationvalues simulated with the density matrix backend.
+    Without samples, noisy expectationvalues are computed exactly from the density matrix.
+    See BackendExpectationValue for details.
+    """
+    BackendCircuitType = BackendCircuitDensityMatrix
+
+    def initialize_hamiltonian(self, hamiltonians: tuple) -> tuple:
+        """
+        Convert the reduced hamiltonians to lists of (coefficient, x mask, z mask, number of Y)
+        of their paulistrings, masks are bitmasks of the flattened state index.
+        """
+        n = self.U.n_qubits
+        result = []
+        for H in hamiltonians:
+            terms = []
+            for ps in H.paulistrings:
+                xmask = 0
+                zmask = 0
+                n_y = 0
+                for k, v in ps.items():
+                    bit = 1 << (n - 1 - self.U.qubit_map[k].number)
+                    if v.upper() in ["X", "Y"]:
+                        xmask |= bit
+                    if v.upper() in ["Z", "Y"]:
+                        zmask |= bit
+                    if v.upper() == "Y":
+                        n_y += 1
+                terms.append((ps.coeff, xmask, zmask, n_y))
+            result.append(terms)
+        return tuple(result)
+
+    def simulate(self, variables, *args, **kwargs) -> numpy.ndarray:
+        """
+        Simulate the expectationvalue, exactly also for noisy circuits.
+
+        Parameters
+        ----------
+        variables:
+            variables to supply to the unitary.
+        args
+        kwargs
+
+        Returns
+        -------
+        numpy.ndarray:
+            the values of the hamiltonians.
+        """
+        self.update_variables(variables)
+        n = self.U.n_qubits
+        index = numpy.arange(2 ** n, dtype=numpy.int64)
+        if self.U.noise is None:
+            state = self.U.state_vector().reshape([-1])
+        else:
+            rho = self.U.density_matrix().reshape([2 ** n, 2 ** n])
+
+        result = []
+        for terms in self.H:
+            E = 0.0
+            for coeff, xmask, zmask, n_y in terms:
+                # P|a> = i^n_y (-1)^parity(a & z) |a ^ x>
+                sign = 1 - 2 * bit_parity(index & zmask)
+                if self.U.noise is None:
+                    value = numpy.sum(state[index ^ xmask].conj() * sign * state)
+                else:
+                    value = numpy.sum(rho[index, index ^ xmask] * sign)
+                E += coeff * (1.0j ** n_y) * value
+            result.append(to_float(E))
+        return numpy.asarray(result)
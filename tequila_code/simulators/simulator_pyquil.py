@@ -1,5 +1,6 @@
 from tequila.simulators.simulator_base import QCircuit, TequilaException, BackendCircuit, BackendExpectationValue
 from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
+from tequila.simulators.counts import Counts
 from tequila import BitString, BitNumbering
 import numpy as np
 import pyquil
@@ -441,7 +442,7 @@ class BackendCircuitPyquil(BackendCircuit):
         backend_result = simulator.wavefunction(iprep + self.circuit, memory_map=self.resolver)
         return QubitWaveFunction.from_array(arr=backend_result.amplitudes, numbering=self.numbering)
 
-    def do_sample(self, samples, circuit, *args, **kwargs) -> QubitWaveFunction:
+    def do_sample(self, samples, circuit, *args, **kwargs) -> Counts:
         """
         Helper function, sampling an individual circuit.
 
@@ -456,8 +457,8 @@ class BackendCircuitPyquil(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction:
-            the result of sampled measurement, as a tequila wavefunction.
+        Counts:
+            the result of sampled measurement.
         """
 
         n_qubits = self.n_qubits
@@ -473,40 +474,21 @@ class BackendCircuitPyquil(BackendCircuit):
         stacked = qc.run(p, memory_map=self.resolver)
         return self.convert_measurements(stacked)
 
-    def convert_measurements(self, backend_result) -> QubitWaveFunction:
+    def convert_measurements(self, backend_result) -> Counts:
         """
         convert measurements from backend.
 
         Parameters
         ----------
         backend_result: list of ints:
-            the result of measurement in pyquil.
+            the result of measurement in pyquil, one row of measured bits per shot.
 
         Returns
         -------
-        QubitWaveFunction:
-            measurement results translated into a QubitWaveFunction.
+        Counts:
+            measurement results translated into tequila Counts.
         """
-
-        def string_to_array(s):
-            listing = []
-            for letter in s:
-                if letter not in [',', ' ', '[', ']', '.']:
-                    listing.append(int(letter))
-            return listing
-
-        result = QubitWaveFunction()
-        bit_dict = {}
-        for b in backend_result:
-            try:
-                bit_dict[str(b)] += 1
-            except:
-                bit_dict[str(b)] = 1
-
-        for k, v in bit_dict.items():
-            arr = string_to_array(k)
-            result._state[BitString.from_array(arr)] = v
-        return result
+        return Counts.from_samples(np.asarray(backend_result))
 
     def no_translation(self, abstract_circuit):
         return isinstance(abstract_circuit, pyquil.Program)
@@ -630,13 +612,7 @@ class BackendCircuitPyquil(BackendCircuit):
         """
         prog = py_prog
         new = pyquil.Program()
-        collected = {}
-        for noise in noise_model.noises:
-            try:
-                collected[str(noise.level)] = combine_kraus_maps(self.noise_lookup[noise.name](*noise.probs),
-                                                                 collected[str(noise.level)])
-            except:
-                collected[str(noise.level)] = self.noise_lookup[noise.name](*noise.probs)
+        collected = self.noise_channel(noise_model, self.combine_noise_kraus)
         done = []
         for gate in prog:
             new.inst(gate)
@@ -648,15 +624,16 @@ class BackendCircuitPyquil(BackendCircuit):
                         if ['parametrized', gate.qubits] not in done:
                             new.define_noisy_gate('I',
                                                   gate.qubits,
-                                                  append_kraus_to_gate(collected[level], np.eye(2), int(level)))
+                                                  self.noise_channel(noise_model, self.build_noisy_gate, 'I',
+                                                                     int(level)))
                             done.append(['parametrized', 1, gate.qubits])
 
                     else:
                         if [gate.name, len(gate.qubits), gate.qubits] not in done:
-                            k = unitary_maker(gate)
                             new.define_noisy_gate(gate.name,
                                                   gate.qubits,
-                                                  append_kraus_to_gate(collected[level], k, int(level)))
+                                                  self.noise_channel(noise_model, self.build_noisy_gate, gate.name,
+                                                                     int(level)))
                             done.append([gate.name, len(gate.qubits), gate.qubits])
                 else:
                     pass
@@ -664,6 +641,33 @@ class BackendCircuitPyquil(BackendCircuit):
                 pass
         return new
 
+    def combine_noise_kraus(self, noise_model) -> dict:
+        """
+        the kraus maps of a NoiseModel, all noises of the same level combined.
+
+        Returns
+        -------
+        dict:
+            level (as string): list of kraus operators
+        """
+        collected = {}
+        for noise in noise_model.noises:
+            try:
+                collected[str(noise.level)] = combine_kraus_maps(self.noise_lookup[noise.name](*noise.probs),
+                                                                 collected[str(noise.level)])
+            except:
+                collected[str(noise.level)] = self.noise_lookup[noise.name](*noise.probs)
+        return collected
+
+    def build_noisy_gate(self, noise_model, name, level) -> list:
+        """
+        the kraus operators of a gate followed by the noise on its level ('I' for the identity).
+        """
+        kraus = self.noise_channel(noise_model, self.combine_noise_kraus)[str(level)]
+        if name == 'I':
+            return append_kraus_to_gate(kraus, np.eye(2), level)
+        return append_kraus_to_gate(kraus, add_controls(name_unitary_dict[name], level), level)
+
     def update_variables(self, variables):
         """
         Update the variables for resolution in simulation or sampling.
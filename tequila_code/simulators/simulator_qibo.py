@@ -1,9 +1,9 @@
 from tequila.simulators.simulator_base import QCircuit, BackendCircuit, BackendExpectationValue
+from tequila.simulators.counts import Counts
 from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
 from tequila import TequilaException
 from tequila import BitString, BitNumbering, BitStringLSB
-from tequila.utils.keymap import KeyMapRegisterToSubregister, KeyMapSubregisterToRegister
-from tequila.circuit.compiler import change_basis
+from tequila.utils.keymap import KeyMapSubregisterToRegister
 import copy
 
 
@@ -195,11 +195,14 @@ class BackendCircuitQibo(BackendCircuit):
     has_noise:
         whether or not the circuit is noisy. needed by the expectationvalue to do sampling properly.
     noise_lookup: dict:
-        dict mapping strings to lists of constructors for cirq noise channel objects.
+        dict mapping strings to functions returning the kraus maps of qibo noise channels.
     op_lookup: dict:
         dictionary mapping strings (tequila gate names) to cirq.ops objects.
     variables: list:
         a list of the qulacs variables of the circuit.
+    measurement_circuits: dict:
+        cache of the measured circuits, built once per read out qubits or basis change.
+        values are (backend circuit holding the parameters, qibo circuit with measurements).
 
     Methods
     -------
@@ -269,15 +272,15 @@ class BackendCircuitQibo(BackendCircuit):
         super().__init__(abstract_circuit=abstract_circuit, noise=noise,device=device, *args, **kwargs)
 
         if noise is not None:
-            # a lookup table from tequila QuantumNoise to NoiseChannel qibo objects. See each function
+            # a lookup table from tequila QuantumNoise to the kraus maps of qibo GeneralChannels. See each function
             # for reference
             self.noise_lookup = {
-                'bit flip': lambda qs,px: gates.GeneralChannel(bit_flip_map(qs,px)),
-                'phase flip': lambda qs,px: gates.GeneralChannel(phase_flip_map(qs,px)),
-                'phase damp': lambda qs, p: gates.GeneralChannel(phase_damp_map(qs,p)),
-                'amplitude damp': lambda qs, p: gates.GeneralChannel(amp_damp_map(qs,p)),
-                'phase-amplitude damp': lambda qs,a,b: gates.GeneralChannel(phase_amp_damp_map(qs,a,b)),
-                'depolarizing': lambda qs,p: gates.GeneralChannel(depolarizing_map(qs,p))
+                'bit flip': bit_flip_map,
+                'phase flip': phase_flip_map,
+                'phase damp': phase_damp_map,
+                'amplitude damp': amp_damp_map,
+                'phase-amplitude damp': phase_amp_damp_map,
+                'depolarizing': depolarizing_map
             }
             self.circuit = self.add_noise_to_circuit(noise) # see this function for details
         self.baseline_variables = self.variables
@@ -412,9 +415,9 @@ class BackendCircuitQibo(BackendCircuit):
                                   **kwargs)
         return result
 
-    def convert_measurements(self, backend_result, target_qubits=None) -> QubitWaveFunction:
+    def convert_measurements(self, backend_result, target_qubits=None) -> Counts:
         """
-        Transform backend evaluation results into QubitWaveFunction
+        Transform backend evaluation results into Counts
         Parameters
         ----------
         backend_result:
@@ -422,37 +425,29 @@ class BackendCircuitQibo(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction
-            results transformed to tequila native QubitWaveFunction
+        Counts
+            results transformed to tequila native Counts
         """
 
-        result = QubitWaveFunction()
-        # todo there are faster ways
-
-        for k, v in backend_result.frequencies(binary=True).items():
-            converted_key = BitString.from_bitstring(other=BitString.from_binary(binary=k))
-            result._state[converted_key] = v
-
+        result = Counts.from_dict(backend_result.frequencies(binary=True))
 
         if target_qubits is not None:
             mapped_target = [self.qubit_map[q].number for q in target_qubits]
             mapped_full = [self.qubit_map[q].number for q in self.abstract_qubits]
-            keymap = KeyMapRegisterToSubregister(subregister=mapped_target, register=mapped_full)
-            result = result.apply_keymap(keymap=keymap)
+            result = result.select(positions=sorted(mapped_target), n_qubits=len(mapped_full))
 
         return result
 
-    def sample_paulistring(self, samples: int, paulistring, variables, *args,
-                           **kwargs):
+    def measurement_circuit(self, key: tuple, variables=None, *args, **kwargs):
         """
-        Has to be rewritten because of the pro-scription in qibo against calling already executed circuits.
+        Has to be rewritten because of the pro-scription in qibo against calling already executed circuits:
+        the circuit is rebuilt with the basis change.
+        This is done once per basis change, later calls only set the parameters of the cached circuit.
 
         Parameters
         ----------
-        samples: int:
-            how many samples to take.
-        paulistring: QubitHamiltonian:
-            the paulistring to sample.
+        key: tuple:
+            the paulistring to measure, as sorted tuple of (qubit, axis).
         variables: dict:
             the variables to instantiate upon sampling.
         args
@@ -460,43 +455,20 @@ class BackendCircuitQibo(BackendCircuit):
 
         Returns
         -------
-
+            the qibo circuit with basis change and measurement
         """
-        not_in_u = [q for q in paulistring.qubits if q not in self.abstract_qubits]
-        reduced_ps = paulistring.trace_out_qubits(qubits=not_in_u)
-        if reduced_ps.coeff == 0.0:
-            return 0.0
-        if len(reduced_ps._data.keys()) == 0:
-            return reduced_ps.coeff
-
-        # make basis change and translate to backend
-        basis_change = QCircuit()
-        qubits = []
-        for idx, p in reduced_ps.items():
-            qubits.append(idx)
-            basis_change += change_basis(target=idx, axis=p)
-
-        highest_qubit = max(paulistring.qubits)
-        new=self.rebuild_for_sample(abstract_circuit=basis_change,variables=variables,highest_qubit=highest_qubit)
-
-        # run simulators
-        counts = new.sample(samples=samples, circuit=new.circuit, read_out_qubits=qubits, variables=variables, *args,
-                             **kwargs)
-        # compute energy
-        E = 0.0
-        n_samples = 0
-        #print('printing the counts')
-        #print(counts)
-        for key, count in counts.items():
-            parity = key.array.count(1)
-            sign = (-1) ** parity
-            E += sign * count
-            n_samples += count
-        assert n_samples == samples
-        E = E / samples * paulistring.coeff
-        return E
-
-    def do_sample(self, samples, circuit, noise_model=None, initial_state=None, *args, **kwargs) -> QubitWaveFunction:
+        if key not in self.measurement_circuits:
+            # make basis change and translate to backend
+            qubits = [idx for idx, p in key]
+            new = self.rebuild_for_sample(abstract_circuit=self.basis_change(key), variables=variables,
+                                          highest_qubit=max(qubits))
+            # the rebuilt circuit was never executed, measurements can be added directly
+            self.measurement_circuits[key] = (new, new.add_measurement(circuit=new.circuit, target_qubits=qubits))
+        new, circuit = self.measurement_circuits[key]
+        new.update_variables(variables, circuit=circuit)
+        return circuit
+
+    def do_sample(self, samples, circuit, noise_model=None, initial_state=None, *args, **kwargs) -> Counts:
         """
         Helper function for performing sampling.
 
@@ -515,8 +487,8 @@ class BackendCircuitQibo(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction:
-            the results of sampling, as a Qubit Wave Function.
+        Counts:
+            the results of sampling.
         """
         n_qubits = max(self.highest_qubit + 1, self.n_qubits, self.abstract_circuit.max_qubit() + 1)
         if initial_state is not None:
@@ -539,9 +511,9 @@ class BackendCircuitQibo(BackendCircuit):
         back = self.convert_measurements(backend_result=result)
         return back
 
-    def sample(self, variables, samples, read_out_qubits=None, circuit=None, *args, **kwargs):
+    def sample_counts(self, variables, samples, read_out_qubits=None, circuit=None, *args, **kwargs) -> Counts:
         """
-        Sample the circuit. If circuit natively equips paulistrings, sample therefrom.
+        Sample the circuit, see BackendCircuit.sample.
         Parameters
         ----------
         variables:
@@ -555,19 +527,27 @@ class BackendCircuitQibo(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction
-            The result of sampling, a recreated QubitWaveFunction in the sampled basis.
+        Counts
+            The result of sampling, the counts of the measured bitstrings in the sampled basis.
 
         """
         self.update_variables(variables)
         if read_out_qubits is None:
             read_out_qubits = self.abstract_qubits
+        # the bits of the result follow the sorted qubits, and so does the measurement
+        read_out_qubits = sorted(read_out_qubits)
 
         if len(read_out_qubits) == 0:
             raise Exception("read_out_qubits are empty")
 
         if circuit is None:
-            circuit = self.add_measurement(circuit=self.circuit.copy(deep=True), target_qubits=read_out_qubits)
+            # the measured copy is cached per read out qubits and only receives the new parameters
+            key = tuple(read_out_qubits)
+            if key not in self.measurement_circuits:
+                measured = self.add_measurement(circuit=self.circuit.copy(deep=True), target_qubits=read_out_qubits)
+                self.measurement_circuits[key] = (self, measured)
+            circuit = self.measurement_circuits[key][1]
+            self.update_variables(variables, circuit=circuit)
         else:
             circuit = self.add_measurement(circuit=circuit.copy(deep=True), target_qubits=read_out_qubits)
         return self.do_sample(samples=samples, circuit=circuit, read_out_qubits=read_out_qubits, *args, **kwargs)
@@ -699,24 +679,28 @@ class BackendCircuitQibo(BackendCircuit):
         qibo.tensorflow.circuit.TensorflowCircuit
             self.circuit, with noise added on.
         """
-        n = noise_model
+        levels = noise_model.resolve_levels()
         new=self.initialize_circuit()
         temp_list = []
         for g in self.inst_list:
             new.add(g)
             qubits=g.qubits
-            for noise in n.noises:
-                if len(qubits) == noise.level:
-                    ch = (self.noise_lookup[noise.name])
-                    chargs = [qubits]
-                    for p in noise.probs:
-                        chargs.append(p)
-                    chan = ch(*chargs)
-                    temp_list.append(copy.deepcopy(chan))
-                    new.add(chan)
+            for noise in levels.get(len(qubits), []):
+                # the kraus tensors only depend on the noise, channels are bound to their circuit
+                kraus = self.noise_channel(noise, self.build_kraus_tensor)
+                chan = gates.GeneralChannel([(tuple(qubits), mat) for mat in kraus])
+                temp_list.append(copy.deepcopy(chan))
+                new.add(chan)
         self.inst_list.extend(temp_list)
         return new
 
+    def build_kraus_tensor(self, noise):
+        """
+        the kraus operators of a tequila noise, tensored over the noise level
+        """
+        qs = tuple(range(noise.level))
+        return [mat for q, mat in self.noise_lookup[noise.name](qs, *noise.probs)]
+
     def rebuild_for_sample(self,abstract_circuit=None,variables=None,highest_qubit=None):
         """
         restructures the compiled circuit to that necessary for sampling
@@ -1,10 +1,10 @@
 from tequila.simulators.simulator_base import BackendCircuit, QCircuit, BackendExpectationValue
 from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
+from tequila.simulators.counts import Counts
 from tequila import TequilaException, TequilaWarning
 from tequila import BitString, BitNumbering, BitStringLSB
-from tequila.utils.keymap import KeyMapRegisterToSubregister
 from tequila.utils import to_float
-import qiskit, numpy, warnings
+import qiskit, numpy, warnings, typing
 
 HAS_NOISE=True
 try:
@@ -118,11 +118,18 @@ class BackendCircuitQiskit(BackendCircuit):
 
     tq_to_pars: dict:
         dictionary mapping tequila Variables and Objectives to qiskit.Parameters, for parameter resolution.
+    transpile_once: bool:
+        if true, the parametrized measurement circuit of every basis change is transpiled only once
+        (per device and optimization_level) and cached, evaluations only bind the parameters.
+    templates: dict:
+        the cached transpiled circuits, keys are (basis change, optimization_level).
 
     Methods
     -------
     noise_model_converter:
         transform a tequila NoiseModel into a qiskit noise model.
+    do_sample_batch:
+        sample several circuits with a single qiskit job.
 
     """
     compiler_arguments = {
@@ -147,7 +154,7 @@ class BackendCircuitQiskit(BackendCircuit):
     numbering = BitNumbering.LSB
             
     def __init__(self, abstract_circuit: QCircuit, variables, qubit_map=None, noise=None,
-                 device=None, *args, **kwargs):
+                 device=None, transpile_once: bool = False, *args, **kwargs):
         """
 
         Parameters
@@ -165,9 +172,13 @@ class BackendCircuitQiskit(BackendCircuit):
             noise to apply to the circuit.
         device:
             device on which to (perhaps, via emulation) execute the circuit.
+        transpile_once: bool: Default = False:
+            transpile the parametrized measurement circuits once and only bind parameters in later evaluations.
         args
         kwargs
         """
+        self.transpile_once = transpile_once
+        self.templates = {}
         self.op_lookup = {
             'I': (lambda c: c.iden),
             'X': (lambda c: c.x, lambda c: c.cx, lambda c: c.ccx),
@@ -198,6 +209,7 @@ class BackendCircuitQiskit(BackendCircuit):
 
         super().__init__(abstract_circuit=abstract_circuit, variables=variables, noise=noise, device=device,
                          qubit_map=qubit_map, *args, **kwargs)
+        self._input_args["transpile_once"] = transpile_once
 
         self.classical_map = self.make_classical_map(qubit_map=self.qubit_map)
 
@@ -294,7 +306,74 @@ class BackendCircuitQiskit(BackendCircuit):
         backend_result = qiskit_job.result()
         return QubitWaveFunction.from_array(arr=backend_result.get_statevector(circuit), numbering=self.numbering)
 
-    def do_sample(self, circuit: qiskit.QuantumCircuit, samples: int, read_out_qubits, *args, **kwargs) -> QubitWaveFunction:
+    def sampling_target(self, optimization_level: int = 1) -> tuple:
+        """
+        Resolve where and how circuits are sampled.
+
+        Parameters
+        ----------
+        optimization_level: int: Default = 1:
+            qiskit transpiler optimization level.
+
+        Returns
+        -------
+        tuple:
+            the qiskit backend to run on, the keyword arguments for qiskit.transpile
+            and the keyword arguments for the run call.
+        """
+        if self.device is None:
+            qiskit_backend = self.retrieve_device('aer_simulator')
+        else:
+            qiskit_backend = self.retrieve_device(self.device)
+
+        if HAS_IBMQ and isinstance(qiskit_backend, IBMQBackend):
+            if self.noise_model is not None:
+                raise TequilaException('Cannot combine backend {} with custom noise models.'.format(str(qiskit_backend)))
+            return qiskit_backend, {"backend": qiskit_backend}, {"optimization_level": optimization_level}
+        elif isinstance(qiskit_backend, qiskit.test.mock.FakeBackend):
+            coupling_map = qiskit_backend.configuration().coupling_map
+            from_back = qiskitnoise.NoiseModel.from_backend(qiskit_backend)
+            if self.noise_model is not None:
+                from_back = self.noise_model
+            use_backend = self.retrieve_device('aer_simulator')
+            use_backend.set_options(noise_model=from_back)
+            return qiskit_backend, {"backend": use_backend, "basis_gates": from_back.basis_gates,
+                                    "coupling_map": coupling_map, "optimization_level": optimization_level}, {}
+        else:
+            if self.noise_model is not None:
+                qiskit_backend.set_options(noise_model=self.noise_model)  # fits better with our methodology.
+                use_basis = full_basis
+            else:
+                use_basis = qiskit_backend.configuration().basis_gates
+            return qiskit_backend, {"backend": qiskit_backend, "basis_gates": use_basis,
+                                    "optimization_level": optimization_level}, {}
+
+    def bind(self, circuit: qiskit.QuantumCircuit) -> qiskit.QuantumCircuit:
+        """
+        bind the current values of the parameters (see update_variables) to a circuit.
+        Parameters the transpiler removed from the circuit are skipped.
+        """
+        if not self.resolver:
+            return circuit
+        resolver = {k: v for k, v in self.resolver.items() if k in circuit.parameters}
+        return circuit.bind_parameters(resolver)  # this is necessary -- see qiskit-aer issue 1346
+
+    def transpile(self, circuit: qiskit.QuantumCircuit, transpile_options: dict, key=None,
+                  optimization_level: int = 1) -> qiskit.QuantumCircuit:
+        """
+        bind and transpile a circuit.
+        With transpile_once and a key, the unbound circuit is transpiled only on the first call with that key
+        (and optimization_level) and the cached template is bound afterwards.
+        """
+        if not self.transpile_once or key is None:
+            return qiskit.transpile(self.bind(circuit), **transpile_options)
+        key = (key, optimization_level)
+        if key not in self.templates:
+            self.templates[key] = qiskit.transpile(circuit, **transpile_options)
+        return self.bind(self.templates[key])
+
+    def do_sample(self, circuit: qiskit.QuantumCircuit, samples: int, read_out_qubits, template=None,
+                  *args, **kwargs) -> Counts:
         """
         Helper function for performing sampling.
         Parameters
@@ -303,87 +382,85 @@ class BackendCircuitQiskit(BackendCircuit):
             the circuit from which to sample.
         samples:
             the number of samples to take.
+        template: optional:
+            hashable key identifying the (parametrized) circuit, used to cache its transpilation.
         args
         kwargs
 
         Returns
         -------
-        QubitWaveFunction:
+        Counts:
             the result of sampling.
         """
         optimization_level = 1
         if 'optimization_level' in kwargs:
             optimization_level = kwargs['optimization_level']
-        if self.device is None:
-            qiskit_backend = self.retrieve_device('aer_simulator')
-        else:
-            qiskit_backend = self.retrieve_device(self.device)
-
-        if isinstance(qiskit_backend,IBMQBackend):
-            if self.noise_model is not None:
-                raise TequilaException('Cannot combine backend {} with custom noise models.'.format(str(qiskit_backend)))
-            circuit = circuit.bind_parameters(self.resolver)  # this is necessary in spite of qiskit "fixing" it
-            circuit = qiskit.transpile(circuit, qiskit_backend)
-            return self.convert_measurements(qiskit_backend.run(circuit,shots=samples,
-                                                            optimization_level=optimization_level),
-                                             target_qubits=read_out_qubits)
-        else:
-            if isinstance(qiskit_backend, qiskit.test.mock.FakeBackend):
-                circuit = circuit.bind_parameters(self.resolver)  # this is necessary in spite of qiskit "fixing" it
-                coupling_map = qiskit_backend.configuration().coupling_map
-                from_back = qiskitnoise.NoiseModel.from_backend(qiskit_backend)
-                if self.noise_model is not None:
-                    from_back = self.noise_model
-                basis = from_back.basis_gates
-                use_backend = self.retrieve_device('aer_simulator')
-                use_backend.set_options(noise_model=from_back)
-                circuit = qiskit.transpile(circuit, backend=use_backend,
-                                           basis_gates=basis,
-                                           coupling_map=coupling_map,
-                                           optimization_level=optimization_level
-                                           )
-
-                job=qiskit_backend.run(circuit, shots=samples)
-                return self.convert_measurements(job,target_qubits=read_out_qubits)
-            else:
-                if self.noise_model is not None:
-                    qiskit_backend.set_options(noise_model=self.noise_model)  # fits better with our methodology.
-                    use_basis = full_basis
-                else:
-                    use_basis = qiskit_backend.configuration().basis_gates
-                circuit = circuit.bind_parameters(self.resolver)  # this is necessary -- see qiskit-aer issue 1346
-                circuit = qiskit.transpile(circuit, backend=qiskit_backend,
-                                           basis_gates=use_basis,
-                                           optimization_level=optimization_level
-                                           )
-
-                job = qiskit_backend.run(circuit, shots=samples)
-                return self.convert_measurements(job,
-                                                 target_qubits=read_out_qubits)
+        qiskit_backend, transpile_options, run_options = self.sampling_target(optimization_level)
+        circuit = self.transpile(circuit, transpile_options, key=template, optimization_level=optimization_level)
+        return self.convert_measurements(qiskit_backend.run(circuit, shots=samples, **run_options),
+                                         target_qubits=read_out_qubits)
+
+    def sample_counts(self, variables, samples, read_out_qubits=None, circuit=None, *args, **kwargs) -> Counts:
+        if self.transpile_once and circuit is None and "template" not in kwargs:
+            # measurement of the plain circuit, identified by the measured qubits
+            qubits = self.abstract_qubits if read_out_qubits is None else read_out_qubits
+            kwargs["template"] = tuple(sorted(qubits))
+        return super().sample_counts(variables=variables, samples=samples, read_out_qubits=read_out_qubits,
+                                     circuit=circuit, *args, **kwargs)
+
+    def measurement_circuit(self, key: tuple, variables=None, *args, **kwargs):
+        """
+        See BackendCircuit.measurement_circuit.
+        With transpile_once, an already transpiled template is returned instead of building the circuit again.
+        """
+        optimization_level = kwargs.get('optimization_level', 1)
+        if self.transpile_once and (key, optimization_level) in self.templates:
+            return self.templates[(key, optimization_level)]
+        return super().measurement_circuit(key=key, variables=variables, *args, **kwargs)
 
-    def convert_measurements(self, backend_result, target_qubits=None) -> QubitWaveFunction:
+    def do_sample_batch(self, samples, circuits: list, read_out_qubits: list, keys: list = None,
+                        *args, **kwargs) -> typing.List[Counts]:
         """
-        map backend results to QubitWaveFunction
+        Sample several circuits, all of them are run as a single qiskit job.
+        See BackendCircuit.do_sample_batch, the keys identify the circuits for transpile_once.
+        """
+        optimization_level = 1
+        if 'optimization_level' in kwargs:
+            optimization_level = kwargs['optimization_level']
+        if keys is None:
+            keys = [None] * len(circuits)
+        qiskit_backend, transpile_options, run_options = self.sampling_target(optimization_level)
+        circuits = [self.transpile(circuit, transpile_options, key=key, optimization_level=optimization_level)
+                    for circuit, key in zip(circuits, keys)]
+        counts = qiskit_backend.run(circuits, shots=samples, **run_options).result().get_counts()
+        if len(circuits) == 1:
+            counts = [counts]
+        return [self.convert_counts(c, target_qubits=qubits) for c, qubits in zip(counts, read_out_qubits)]
+
+    def convert_measurements(self, backend_result, target_qubits=None) -> Counts:
+        """
+        map backend results to Counts
         Parameters
         ----------
         backend_result:
             the result returned directly qiskit simulation.
         Returns
         -------
-        QubitWaveFunction:
-            measurements converted into wave function form.
-        """
-        qiskit_counts = backend_result.result().get_counts()
-        result = QubitWaveFunction()
-        # todo there are faster ways
-        for k, v in qiskit_counts.items():
-            converted_key = BitString.from_bitstring(other=BitStringLSB.from_binary(binary=k))
-            result._state[converted_key] = v
+        Counts:
+            the counts of the measured bitstrings.
+        """
+        return self.convert_counts(backend_result.result().get_counts(), target_qubits=target_qubits)
+
+    def convert_counts(self, qiskit_counts: dict, target_qubits=None) -> Counts:
+        """
+        map the counts of one qiskit circuit to Counts, see convert_measurements
+        """
+        # qiskit keys are binary strings with the first qubit last
+        result = Counts.from_dict(qiskit_counts, numbering=BitNumbering.LSB)
         if target_qubits is not None:
             mapped_target = [self.qubit_map[q].number for q in target_qubits]
             mapped_full = [self.qubit_map[q].number for q in self.abstract_qubits]
-            keymap = KeyMapRegisterToSubregister(subregister=mapped_target, register=mapped_full)
-            result = result.apply_keymap(keymap=keymap)
+            result = result.select(positions=sorted(mapped_target), n_qubits=len(mapped_full))
 
         return result
 
@@ -510,6 +587,13 @@ class BackendCircuitQiskit(BackendCircuit):
         """
         if nm is None:
             return None
+        # the qiskit model only depends on the tequila noises, it is shared by all circuits with the same noise
+        return self.noise_channel(nm, self.build_noise_model)
+
+    def build_noise_model(self, nm):
+        """
+        Build the qiskit noise model of a tequila NoiseModel, see noise_model_converter.
+        """
         basis_gates = full_basis
         qnoise = qiskitnoise.NoiseModel(basis_gates)
         for noise in nm.noises:
@@ -7,9 +7,10 @@ from qat.lang.AQASM import (PH, RX, RY, RZ, SWAP, AbstractGate, H, I, Program,
 from qat.lang.AQASM.qint import QInt
 from tequila.circuit._gates_impl import QGateImpl
 from tequila.circuit.circuit import QCircuit
+from tequila.simulators.counts import Counts
 from tequila.simulators.simulator_base import (BackendCircuit,
                                                BackendExpectationValue)
-from tequila.utils.bitstrings import BitNumbering, BitString
+from tequila.utils.bitstrings import BitNumbering
 from tequila.utils.exceptions import TequilaException
 from tequila.utils.misc import to_float
 from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
@@ -319,7 +320,7 @@ class BackendCircuitQLM(BackendCircuit):
         return circuit
 
     def do_sample(self, samples, circuit: RawCircuit, noise=None, abstract_qubits=None,
-                  initial_state=0, *args, **kwargs) -> QubitWaveFunction:
+                  initial_state=0, *args, **kwargs) -> Counts:
         """
         Helper function for performing sampling.
 
@@ -340,7 +341,7 @@ class BackendCircuitQLM(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction:
+        Counts:
             the result of sampling.
         """
         if not isinstance(initial_state, int):
@@ -418,9 +419,9 @@ class BackendCircuitQLM(BackendCircuit):
         else:
             self.pars_for_job = None
 
-    def convert_measurements(self, backend_result) -> QubitWaveFunction:
+    def convert_measurements(self, backend_result) -> Counts:
         """
-        map backend results to QubitWaveFunction
+        map backend results to Counts
 
         Parameters
         ----------
@@ -428,16 +429,13 @@ class BackendCircuitQLM(BackendCircuit):
             the result returned directly from a QLM simulation.
         Returns
         -------
-        QubitWaveFunction:
-            measurements converted into wave function form.
+        Counts:
+            measurements converted into Counts.
         """
-        result = QubitWaveFunction()
         shots = int(backend_result.meta_data["nbshots"])
         nbits = backend_result[0].qregs[0].length
-        for sample in backend_result:
-            converted_key = BitString.from_bitstring(other=BitString.from_int(integer=sample._state, nbits=nbits))
-            result._state[converted_key] = round(sample.probability * shots)
-        return result
+        return Counts(outcomes=[sample._state for sample in backend_result],
+                      counts=[round(sample.probability * shots) for sample in backend_result], n_qubits=nbits)
 
     def make_qubit_map(self, qubits: dict):
         """
@@ -5,8 +5,11 @@ import warnings
 from tequila import TequilaException, TequilaWarning
 from tequila.utils.bitstrings import BitNumbering, BitString, BitStringLSB
 from tequila.wavefunction.qubit_wavefunction import QubitWaveFunction
-from tequila.simulators.simulator_base import BackendCircuit, BackendExpectationValue, QCircuit, change_basis
-from tequila.utils.keymap import KeyMapRegisterToSubregister
+from tequila.simulators.simulator_base import BackendCircuit, BackendExpectationValue
+from tequila.simulators.simulator_density_matrix import BackendCircuitDensityMatrix
+from tequila.simulators.trajectory_sampler import TrajectorySampler
+from tequila.simulators.shot_allocation import ShotAllocator
+from tequila.simulators.counts import Counts
 
 """
 Developer Note:
@@ -156,9 +159,9 @@ class BackendCircuitQulacs(BackendCircuit):
         wfn = QubitWaveFunction.from_array(arr=state.get_vector(), numbering=self.numbering)
         return wfn
 
-    def convert_measurements(self, backend_result, target_qubits=None) -> QubitWaveFunction:
+    def convert_measurements(self, backend_result, target_qubits=None) -> Counts:
         """
-        Transform backend evaluation results into QubitWaveFunction
+        Transform backend evaluation results into Counts
         Parameters
         ----------
         backend_result:
@@ -166,30 +169,23 @@ class BackendCircuitQulacs(BackendCircuit):
 
         Returns
         -------
-        QubitWaveFunction
-            results transformed to tequila native QubitWaveFunction
+        Counts
+            results transformed to tequila native Counts
         """
 
-        result = QubitWaveFunction()
-        # todo there are faster ways
-
-
-        for k in backend_result:
-            converted_key = BitString.from_binary(BitStringLSB.from_int(integer=k, nbits=self.n_qubits).binary)
-            if converted_key in result._state:
-                result._state[converted_key] += 1
-            else:
-                result._state[converted_key] = 1
+        # qulacs samples are integers with the first qubit as least significant bit
+        result = Counts(outcomes=backend_result, counts=numpy.ones(len(backend_result), dtype=numpy.int64),
+                        n_qubits=self.n_qubits, numbering=BitNumbering.LSB)
 
         if target_qubits is not None:
             mapped_target = [self.qubit_map[q].number for q in target_qubits]
             mapped_full = [self.qubit_map[q].number for q in self.abstract_qubits]
-            keymap = KeyMapRegisterToSubregister(subregister=mapped_target, register=mapped_full)
-            result = result.apply_keymap(keymap=keymap)
+            result = result.select(positions=mapped_target, n_qubits=len(mapped_full))
 
         return result
 
-    def do_sample(self, samples, circuit, noise_model=None, initial_state=0, *args, **kwargs) -> QubitWaveFunction:
+    def do_sample(self, samples, circuit, noise_model=None, initial_state=0, read_out_qubits=None,
+                  *args, **kwargs) -> Counts:
         """
         Helper function for performing sampling.
 
@@ -203,20 +199,24 @@ class BackendCircuitQulacs(BackendCircuit):
             noise model to be applied to the circuit.
         initial_state:
             sampling supports initial states for qulacs. Indicates the initial state to which circuit is applied.
+        read_out_qubits: optional:
+            the measured abstract qubits, default are the qubits of the last add_measurement call.
         args
         kwargs
 
         Returns
         -------
-        QubitWaveFunction:
-            the results of sampling, as a Qubit Wave Function.
+        Counts:
+            the results of sampling.
         """
         state = self.initialize_state(self.n_qubits)
         lsb = BitStringLSB.from_int(initial_state, nbits=self.n_qubits)
         state.set_computational_basis(BitString.from_binary(lsb.binary).integer)
         circuit.update_quantum_state(state)
         sampled = state.sampling(samples)
-        return self.convert_measurements(backend_result=sampled, target_qubits=self.measurements)
+        if read_out_qubits is None:
+            read_out_qubits = self.measurements
+        return self.convert_measurements(backend_result=sampled, target_qubits=sorted(read_out_qubits))
 
     def no_translation(self, abstract_circuit):
         """
@@ -357,6 +357,22 @@ class BackendCircuitQulacs(BackendCircuit):
         self.measurements = sorted(target_qubits)
         return circuit
 
+    def measurement_circuit(self, key: tuple, variables=None, *args, **kwargs):
+        """
+        The cached measurement circuit of a paulistring, see BackendCircuit.measurement_circuit.
+        The circuit is a native copy of self.circuit with the basis change,
+        qulacs keeps the parameters in the circuit, the cached copy receives the current ones of self.circuit
+        (the basis change adds no parameters).
+        """
+        if key not in self.measurement_circuits:
+            circuit = self.create_circuit(circuit=self.circuit.copy(), abstract_circuit=self.basis_change(key),
+                                          variables=variables)
+            self.measurement_circuits[key] = self.add_measurement(circuit=circuit,
+                                                                  target_qubits=[idx for idx, p in key])
+        circuit = self.measurement_circuits[key]
+        for k in range(self.circuit.get_parameter_count()):
+            circuit.set_parameter(k, self.circuit.get_parameter(k))
+        return circuit
 
     def add_noise_to_circuit(self,noise_model):
         """
@@ -372,21 +388,27 @@ class BackendCircuitQulacs(BackendCircuit):
             self.circuit, with noise added on.
         """
         c=self.circuit
-        n=noise_model
+        levels=noise_model.resolve_levels()
         g_count=c.get_gate_count()
         new=self.initialize_circuit()
         for i in range(g_count):
             g=c.get_gate(i)
             new.add_gate(g)
             qubits=g.get_target_index_list() + g.get_control_index_list()
-            for noise in n.noises:
-                if len(qubits) == noise.level:
-                    for j,channel in enumerate(self.noise_lookup[noise.name]):
-                        for q in qubits:
-                            chan=channel(q,noise.probs[j])
-                            new.add_gate(chan)
+            for noise in levels.get(len(qubits), []):
+                for j in range(len(self.noise_lookup[noise.name])):
+                    for q in qubits:
+                        # add_gate copies the gate, the cached channels can be reused
+                        chan=self.noise_channel(noise, self.build_noise_gate, j, q)
+                        new.add_gate(chan)
         return new
 
+    def build_noise_gate(self, noise, j, q):
+        """
+        the j-th qulacs noise gate of a tequila noise, acting on qubit q
+        """
+        return self.noise_lookup[noise.name][j](q, noise.probs[j])
+
     def optimize_circuit(self, circuit, max_block_size: int = 4, silent: bool = True, *args, **kwargs):
         """
         reduce circuit depth using the native qulacs optimizer.
@@ -424,6 +446,14 @@ class BackendExpectationValueQulacs(BackendExpectationValue):
     use_mapping = True
     BackendCircuitType = BackendCircuitQulacs
 
+    def __init__(self, *args, **kwargs):
+        # built on the first noisy sample call (or by compile_measurements), see sample_trajectories
+        self.trajectory_circuit = None
+        self.trajectory_sampler = None
+        # qulacs circuits of the basis changes of the sampled paulistrings, see basis_change_circuit
+        self.basis_change_circuits = {}
+        super().__init__(*args, **kwargs)
+
     def simulate(self, variables, *args, **kwargs) -> numpy.array:
         """
         Perform simulation of this expectationvalue.
@@ -507,31 +537,29 @@ class BackendExpectationValueQulacs(BackendExpectationValue):
         numpy.ndarray:
             the result of sampling as a number.
         """
+        if isinstance(samples, ShotAllocator):
+            if self.U.has_noise:
+                raise TequilaQulacsException("shot allocation is not supported for noisy sampling with qulacs")
+            return super().sample(variables=variables, samples=samples, *args, **kwargs)
+        if self.U.has_noise:
+            return self.sample_trajectories(variables=variables, samples=samples, *args, **kwargs)
         self.update_variables(variables)
         state = self.U.initialize_state(self.n_qubits)
         self.U.circuit.update_quantum_state(state)
         result = []
         for H in self._reduced_hamiltonians: # those are the hamiltonians which where non-used qubits are already traced out
             E = 0.0
-            if H.is_all_z() and not self.U.has_noise:
+            if H.is_all_z():
                 E = super().sample(samples=samples, variables=variables, *args, **kwargs)
             else:
                 for ps in H.paulistrings:
                     # change basis, measurement is destructive so the state will be copied
-                    # to avoid recomputation (except when noise was required)
-                    bc = QCircuit()
-                    for idx, p in ps.items():
-                        bc += change_basis(target=idx, axis=p)
-                    qbc = self.U.create_circuit(abstract_circuit=bc, variables=None)
+                    # to avoid recomputation
+                    qbc = self.basis_change_circuit(ps)
                     Esamples = []
                     for sample in range(samples):
-                        if self.U.has_noise and sample>0:
-                            state = self.U.initialize_state(self.n_qubits)
-                            self.U.circuit.update_quantum_state(state)
-                            state_tmp = state
-                        else:
-                            state_tmp = state.copy()
-                        if len(bc.gates) > 0:  # otherwise there is no basis change (empty qulacs circuit does not work out)
+                        state_tmp = state.copy()
+                        if qbc is not None:
                             qbc.update_quantum_state(state_tmp)
                         ps_measure = 1.0
                         for idx in ps.keys():
@@ -544,3 +572,85 @@ class BackendExpectationValueQulacs(BackendExpectationValue):
                     E += ps.coeff * sum(Esamples) / len(Esamples)
             result.append(E)
         return numpy.asarray(result)
+
+    def initialize_trajectories(self, variables) -> BackendCircuitDensityMatrix:
+        """
+        The density matrix backend circuit (with the NoiseModel) sampled by sample_trajectories, built once.
+        """
+        if self.trajectory_circuit is None:
+            self.trajectory_circuit = BackendCircuitDensityMatrix(abstract_circuit=self.abstract_expectationvalue.U,
+                                                                  variables=variables, noise=self.U.noise)
+            self.trajectory_sampler = TrajectorySampler()
+        return self.trajectory_circuit
+
+    def basis_change_circuit(self, paulistring):
+        """
+        The qulacs circuit changing the basis for measuring a paulistring, built once per basis change.
+        None if there is no basis change (empty qulacs circuits do not work out).
+        """
+        key = tuple(sorted(paulistring.items()))
+        if key not in self.basis_change_circuits:
+            bc = self.U.basis_change(key)
+            qbc = None
+            if len(bc.gates) > 0:
+                qbc = self.U.create_circuit(abstract_circuit=bc, variables=None)
+            self.basis_change_circuits[key] = qbc
+        return self.basis_change_circuits[key]
+
+    def compile_measurements(self, variables=None):
+        """
+        Build the circuits for sampling in advance, see BackendExpectationValue.compile_measurements.
+        Qulacs samples the paulistrings on copies of the prepared state, so only their basis changes are needed,
+        noisy expectationvalues build the measurement circuits of the trajectory sampler.
+        The measurement circuits used with a ShotAllocator are built on first use.
+        """
+        if self.U.has_noise:
+            paulistrings = [ps for H in self._reduced_hamiltonians for ps in H.paulistrings if len(ps.qubits) > 0]
+            self.initialize_trajectories(variables=variables).compile_measurements(paulistrings=paulistrings,
+                                                                                   variables=variables)
+        else:
+            for H in self._reduced_hamiltonians:
+                if not H.is_all_z():
+                    for ps in H.paulistrings:
+                        self.basis_change_circuit(ps)
+
+    def sample_trajectories(self, variables, samples, *args, **kwargs) -> numpy.array:
+        """
+        Sample this Expectation Value with noise, using quantum trajectories.
+        Instead of preparing the noisy qulacs state again for every shot,
+        the paulistrings of all hamiltonians are sampled together by a TrajectorySampler
+        on the density matrix backend's translation of the circuit and the NoiseModel.
+        Parameters
+        ----------
+        variables:
+            variables, to supply to the underlying circuit.
+        samples: int:
+            the number of samples to take.
+        args
+        kwargs
+
+        Returns
+        -------
+        numpy.ndarray:
+            the result of sampling as a number.
+        """
+        U = self.initialize_trajectories(variables=variables)
+        U.update_variables(variables)
+
+        paulistrings = []
+        owners = []
+        for i, H in enumerate(self._reduced_hamiltonians):
+            paulistrings += H.paulistrings
+            owners += [i] * len(H.paulistrings)
+        values, measured, keys = U.measurement_keys(paulistrings)
+        circuits = [U.measurement_circuit(key=key, variables=variables) for key in keys]
+        read_out_qubits = [[idx for idx, p in key] for key in keys]
+        all_counts = self.trajectory_sampler.sample_batch(circuit=U, samples=samples, instructions=circuits,
+                                                          read_out_qubits=read_out_qubits)
+        for i, counts in zip(measured, all_counts):
+            values[i] = U.evaluate_parity_counts(counts=counts, samples=samples) * paulistrings[i].coeff
+
+        result = numpy.zeros(len(self._reduced_hamiltonians))
+        for i, value in zip(owners, values):
+            result[i] += value
+        return result
@@ -0,0 +1,266 @@
+"""
+Monte Carlo wavefunction (quantum trajectory) sampling of noisy circuits
+
+Every trajectory propagates a statevector through the circuit and, after each gate, picks one kraus operator
+of each noise channel with probability ||K psi||^2 (the channels are attached to the gates by the NoiseModel,
+according to the level of each noise, see BackendCircuitDensityMatrix).
+The final state of each trajectory is measured, the counts of all trajectories are the noisy samples.
+Trajectories are independent, they are distributed over a process pool with independent random streams.
+"""
+import multiprocessing
+import numpy
+
+from tequila.utils.exceptions import TequilaException
+from tequila.simulators.counts import Counts
+from tequila.simulators.simulator_density_matrix import BackendCircuitDensityMatrix, _apply_matrix
+
+
+def resolve_instructions(circuit: BackendCircuitDensityMatrix, instructions: list = None) -> list:
+    """
+    Bind the current variables of a density matrix backend circuit
+
+    Parameters
+    ----------
+    circuit:
+        the backend circuit, providing variables and gate matrices
+    instructions:
+        the instruction list to resolve, default is circuit.circuit
+
+    Returns
+    -------
+        list of ("gate", matrix, target, controls) and ("channel", kraus operators, qubit, K^dagger K of each kraus)
+        which only contains numpy arrays (and can be send to worker processes)
+    """
+    if instructions is None:
+        instructions = circuit.circuit
+    resolved = []
+    for instruction in instructions:
+        if instruction[0] == "gate":
+            kind, data, target, controls = instruction
+            resolved.append(("gate", circuit.matrix(data), target, controls))
+        else:
+            kind, blocks, q, kraus = instruction
+            effects = numpy.array([K.conj().T @ K for K in kraus])
+            resolved.append(("channel", kraus, q, effects))
+    return resolved
+
+
+def _apply_kraus_branch(state: numpy.ndarray, kraus: list, effects: numpy.ndarray, q: int, generator) -> int:
+    """
+    pick one kraus operator with probability ||K psi||^2 = <psi|K^dagger K|psi>, apply it and renormalize the state
+    (in place), the probabilities only need the overlaps of the two halves of the state, split at qubit q
+    """
+    index = [slice(None)] * state.ndim
+    views = []
+    for i in range(2):
+        index[q] = i
+        views.append(state[tuple(index) + (Ellipsis,)])
+    overlaps = numpy.array([[numpy.vdot(views[a], views[b]) for b in range(2)] for a in range(2)])
+    cumulative = numpy.cumsum(numpy.maximum(numpy.einsum("kab,ab->k", effects, overlaps).real, 0.0))
+    k = min(int(numpy.searchsorted(cumulative, generator.random() * cumulative[-1], side="right")), len(kraus) - 1)
+    _apply_matrix(state, kraus[k], q, ())
+    state /= numpy.linalg.norm(state)
+    return k
+
+
+def _run_trajectories(task: tuple) -> list:
+    """
+    Worker function: run a number of trajectories of one circuit
+
+    Parameters
+    ----------
+    task:
+        (resolved instructions, number of qubits, measured axes, number of shots, shots per trajectory,
+        number of checkpoints, seed sequence)
+
+    Returns
+    -------
+        list of (trajectories, cumulative counts over the measured bitstrings) at each checkpoint
+    """
+    instructions, n_qubits, axes, shots, shots_per_trajectory, checkpoints, seed = task
+    generator = numpy.random.default_rng(seed)
+    others = tuple(i for i in range(n_qubits) if i not in axes)
+    counts = numpy.zeros(2 ** len(axes), dtype=numpy.int64)
+    n_trajectories = -(-shots // shots_per_trajectory)
+    # one entry per checkpoint, also if there are less trajectories than checkpoints
+    marks = [int(numpy.ceil(n_trajectories * (c + 1) / checkpoints)) for c in range(checkpoints)]
+    history = [(0, counts.copy()) for mark in marks if mark == 0]
+    state = numpy.zeros([2] * n_qubits, dtype=complex)
+    remaining = shots
+    for trajectory in range(1, n_trajectories + 1):
+        state.fill(0.0)
+        state.reshape([-1])[0] = 1.0
+        for instruction in instructions:
+            if instruction[0] == "gate":
+                kind, matrix, target, controls = instruction
+                _apply_matrix(state, matrix, target, controls)
+            else:
+                kind, kraus, q, effects = instruction
+                _apply_kraus_branch(state, kraus, effects, q, generator)
+        probabilities = numpy.abs(state) ** 2
+        marginal = numpy.transpose(probabilities.sum(axis=others, keepdims=True), list(axes) + list(others))
+        marginal = marginal.reshape([-1])
+        n = min(shots_per_trajectory, remaining)
+        counts += generator.multinomial(n, marginal / numpy.sum(marginal))
+        remaining -= n
+        history += [(trajectory, counts.copy()) for mark in marks if mark == trajectory]
+    return history
+
+
+class TrajectorySampler:
+    """
+    Samples noisy circuits of the density matrix backend with quantum trajectories
+
+    The memory is the one of a statevector (instead of a density matrix), the noise is exact up to the
+    statistical error of the trajectories. Trajectories of all circuits given to sample_batch
+    are distributed together over a process pool, each part with its own random stream spawned from the seed.
+
+    Attributes
+    ----------
+    n_workers:
+        number of worker processes
+    shots_per_trajectory:
+        measurements taken from the final state of each trajectory (1 gives uncorrelated samples)
+    checkpoints:
+        number of intermediate results recorded for the convergence diagnostics
+    tolerance:
+        target standard error of the sampled probabilities, used to estimate the number of trajectories needed
+    diagnostics:
+        list with the convergence diagnostics of each circuit of the last call, see diagnose
+    """
+
+    # below this number of trajectories per worker the trajectories are not distributed
+    min_trajectories_per_worker = 64
+
+    def __init__(self, n_workers: int = None, seed: int = None, shots_per_trajectory: int = 1,
+                 checkpoints: int = 10, tolerance: float = 1.e-2, context: str = None):
+        """
+        Parameters
+        ----------
+        n_workers:
+            number of worker processes, default is the number of cpus
+        seed:
+            seed of the random streams, every call spawns new independent streams
+        shots_per_trajectory:
+            measurements taken from the final state of each trajectory
+        checkpoints:
+            number of intermediate results recorded for the convergence diagnostics
+        tolerance:
+            target standard error of the sampled probabilities
+        context:
+            multiprocessing start method, default is 'fork' where available
+        """
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        if shots_per_trajectory < 1:
+            raise TequilaException("TrajectorySampler needs at least one shot per trajectory")
+        self.n_workers = max(1, n_workers)
+        self.shots_per_trajectory = shots_per_trajectory
+        self.checkpoints = max(1, checkpoints)
+        self.tolerance = tolerance
+        self.diagnostics = []
+        self._seed_sequence = numpy.random.SeedSequence(seed)
+        if context is None and "fork" in multiprocessing.get_all_start_methods():
+            context = "fork"
+        self._context = context
+
+    def sample(self, circuit: BackendCircuitDensityMatrix, samples: int, instructions: list = None,
+               read_out_qubits: list = None) -> Counts:
+        """
+        Sample one circuit, see sample_batch
+        """
+        if instructions is None:
+            instructions = circuit.circuit
+        return self.sample_batch(circuit=circuit, samples=samples, instructions=[instructions],
+                                 read_out_qubits=[read_out_qubits])[0]
+
+    def sample_batch(self, circuit: BackendCircuitDensityMatrix, samples: int, instructions: list,
+                     read_out_qubits: list) -> list:
+        """
+        Sample several circuits with the current variables of a density matrix backend circuit
+
+        Parameters
+        ----------
+        circuit:
+            the backend circuit, providing variables, qubit map and gate matrices
+        samples:
+            number of samples for each circuit
+        instructions:
+            the instruction lists to sample (e.g. circuit.measurement_circuit for several paulistrings)
+        read_out_qubits:
+            the measured abstract qubits for each instruction list (None for all qubits)
+
+        Returns
+        -------
+            list with the Counts of each circuit
+        """
+        n_trajectories = -(-samples // self.shots_per_trajectory)
+        parts = min(self.n_workers, max(1, n_trajectories // self.min_trajectories_per_worker))
+
+        tasks = []
+        all_axes = []
+        seeds = self._seed_sequence.spawn(len(instructions) * parts)
+        for i, (circuit_instructions, qubits) in enumerate(zip(instructions, read_out_qubits)):
+            if qubits is None:
+                qubits = circuit.abstract_qubits
+            axes = tuple(circuit.qubit_map[q].number for q in qubits)
+            all_axes.append(axes)
+            resolved = resolve_instructions(circuit=circuit, instructions=circuit_instructions)
+            for part in range(parts):
+                shots = samples // parts + (1 if part < samples % parts else 0)
+                tasks.append((resolved, circuit.n_qubits, axes, shots, self.shots_per_trajectory,
+                              self.checkpoints, seeds[i * parts + part]))
+
+        if len(tasks) == 1 or n_trajectories * len(instructions) < 2 * self.min_trajectories_per_worker:
+            histories = [_run_trajectories(task) for task in tasks]
+        else:
+            ctx = multiprocessing.get_context(self._context)
+            with ctx.Pool(min(self.n_workers, len(tasks))) as pool:
+                histories = pool.map(_run_trajectories, tasks)
+
+        results = []
+        self.diagnostics = []
+        for i, axes in enumerate(all_axes):
+            # sum the parts of this circuit checkpoint by checkpoint
+            history = []
+            for checkpoint in zip(*histories[i * parts:(i + 1) * parts]):
+                history.append((sum(c[0] for c in checkpoint), sum(c[1] for c in checkpoint)))
+            counts = history[-1][1]
+            self.diagnostics.append(self.diagnose(history=history, samples=samples))
+            outcomes = numpy.flatnonzero(counts)
+            results.append(Counts(outcomes=outcomes, counts=counts[outcomes], n_qubits=len(axes)))
+        return results
+
+    def diagnose(self, history: list, samples: int) -> dict:
+        """
+        Convergence diagnostics of sampled counts
+
+        Parameters
+        ----------
+        history:
+            list of (trajectories, cumulative counts) at the checkpoints
+        samples:
+            the total number of samples
+
+        Returns
+        -------
+        dict with
+            trajectories: number of trajectories run
+            standard_error: largest standard error of the sampled probabilities
+            history: (trajectories, largest standard error, total variation distance to the final distribution)
+            at each checkpoint
+            needed: estimated number of trajectories for a standard error below self.tolerance
+        """
+        final = history[-1][1] / samples
+        records = []
+        for trajectories, counts in history:
+            n = numpy.sum(counts)
+            p = counts / n
+            error = numpy.sqrt(numpy.max(p * (1.0 - p)) / n)
+            distance = 0.5 * numpy.sum(numpy.abs(p - final))
+            records.append((trajectories, float(error), float(distance)))
+        # standard errors assume uncorrelated samples, which only holds for one shot per trajectory
+        variance = numpy.max(final * (1.0 - final))
+        needed = int(numpy.ceil(variance / self.tolerance ** 2 / self.shots_per_trajectory))
+        return {"trajectories": history[-1][0], "standard_error": records[-1][1], "history": records,
+                "needed": max(1, needed)}